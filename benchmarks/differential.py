@@ -0,0 +1,224 @@
+""" Check that the optimized render paths produce the same pixels as a simple reference implementation.
+Every frame of each file in the corpus (generated files, the files in benchmarks/corpus, and any files given on the
+command line) is rendered with the reference implementation and with each render path. The largest per-channel
+difference is reported for each color depth and blend mode, and the exit code is 1 if it is above the tolerance:
+
+    python benchmarks/differential.py
+    python benchmarks/differential.py --tolerance 1 --output differences.json path/to/file.aseprite
+"""
+import argparse
+import json
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable
+
+from PIL import Image, ImageChops
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from aseprite_reader import AsepriteFile  # noqa: E402
+from aseprite_reader import render  # noqa: E402
+from aseprite_reader import utils  # noqa: E402
+from aseprite_reader.composite import BLEND_MODES, blend_mode_name, composite  # noqa: E402
+from aseprite_reader.frame import Frame  # noqa: E402
+from aseprite_reader.incremental_render import IncrementalRenderer  # noqa: E402
+from synthetic import Scenario, generate  # noqa: E402
+
+CORPUS_DIR = ROOT / "benchmarks" / "corpus"
+
+# Small files covering each color depth, palette changes, opacity, linked cels, cels outside the canvas, and every blend
+# mode
+GENERATED_CORPUS = [
+    Scenario("rgba", 48, 40, frame_count=4, layer_count=6),
+    Scenario("grayscale", 48, 40, color_depth=16, frame_count=4, layer_count=6),
+    Scenario("indexed", 48, 40, color_depth=8, frame_count=4, layer_count=6),
+    Scenario("linked_cels", 32, 32, frame_count=6, layer_count=5, linked_cels=True),
+    Scenario("palette_changes", 32, 32, color_depth=8, frame_count=4, layer_count=3, palette_changes=True),
+    Scenario("blend_modes", 24, 24, frame_count=2, layer_count=len(BLEND_MODES) + 1,
+             blend_modes=tuple(range(len(BLEND_MODES)))),
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", type=Path, help="Extra Aseprite files to check.")
+    parser.add_argument("--tolerance", type=int, default=0, help="Largest allowed per-channel difference (0-255).")
+    parser.add_argument("--output", type=Path, help="Write the results to this JSON file.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        files = [generate(scenario, Path(temp_dir) / f"{scenario.name}.aseprite") for scenario in GENERATED_CORPUS]
+        files += sorted(CORPUS_DIR.glob("*.aseprite")) + args.files
+
+        results = {}
+        with ThreadPoolExecutor() as executor:
+            for file_path in files:
+                compare_file(AsepriteFile(file_path), executor, results)
+
+    failed = _print_results(results, args.tolerance)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+    sys.exit(1 if failed else 0)
+
+
+def render_paths(executor: ThreadPoolExecutor) -> dict[str, Callable[[AsepriteFile], Callable[[Frame], Image.Image]]]:
+    """ Get the render paths to check.
+    Each path is set up once per file (so paths that keep state between frames are checked as they are used), and
+    returns a function that renders a frame.
+    """
+    def _frame_to_image(aseprite_file: AsepriteFile) -> Callable[[Frame], Image.Image]:
+        return lambda frame: render.frame_to_image(aseprite_file, frame)
+
+    def _executor(aseprite_file: AsepriteFile) -> Callable[[Frame], Image.Image]:
+        return lambda frame: render.frame_to_image(aseprite_file, frame, executor=executor)
+
+    def _target(aseprite_file: AsepriteFile) -> Callable[[Frame], Image.Image]:
+        target = Image.new(mode="RGBA", size=(aseprite_file.header.width, aseprite_file.header.height))
+        return lambda frame: render.frame_to_image(aseprite_file, frame, target=target).copy()
+
+    def _incremental(aseprite_file: AsepriteFile) -> Callable[[Frame], Image.Image]:
+        return IncrementalRenderer(aseprite_file).render
+
+    def _region(aseprite_file: AsepriteFile) -> Callable[[Frame], Image.Image]:
+        box = (0, 0, aseprite_file.header.width, aseprite_file.header.height)
+        return lambda frame: aseprite_file.render_region(frame, box)
+
+    def _buffer(aseprite_file: AsepriteFile) -> Callable[[Frame], Image.Image]:
+        size = (aseprite_file.header.width, aseprite_file.header.height)
+        return lambda frame: Image.frombytes("RGBA", size, bytes(aseprite_file.render_to_buffer(frame)))
+
+    def _array(aseprite_file: AsepriteFile) -> Callable[[Frame], Image.Image]:
+        return lambda frame: Image.fromarray(aseprite_file.to_array([frame])[0], mode="RGBA")
+
+    paths = {
+        "frame_to_image": _frame_to_image,
+        "executor": _executor,
+        "target": _target,
+        "incremental": _incremental,
+        "buffer": _buffer,
+        "region": _region,
+    }
+    try:
+        import numpy  # noqa: F401
+        paths["array"] = _array
+    except ImportError:
+        pass
+
+    return paths
+
+
+def reference_frame_to_image(aseprite_file: AsepriteFile, frame: Frame) -> Image.Image:
+    """ Render a frame the simple way: decode every cel pixel by pixel onto a full canvas layer image, then composite
+    the layer images in order.
+    """
+    size = (aseprite_file.header.width, aseprite_file.header.height)
+    image = Image.new(mode="RGBA", size=size)
+
+    for layer in render.rendered_layers(aseprite_file):
+        if layer.layer_type != 0:
+            raise NotImplementedError(f"Layer type {layer.layer_type} is not implemented.")
+
+        cel = aseprite_file.cel(frame, layer)
+        if not cel:
+            continue
+
+        cel = aseprite_file.resolve_cel(cel)
+        if cel.cel_type != 2:
+            raise NotImplementedError(f"Cel type {cel.cel_type} is not implemented.")
+
+        layer_image = Image.new(mode="RGBA", size=size)
+        image_data = utils.decompress_image_data(cel.compressed_image_data)
+        pixels = utils.image_data_to_pixels(aseprite_file, image_data, aseprite_file.frame_number(frame))
+        for i, pixel in enumerate(pixels):
+            x = cel.x_position + i % cel.width
+            y = cel.y_position + i // cel.width
+            if 0 <= x < size[0] and 0 <= y < size[1]:
+                layer_image.putpixel((x, y), pixel)
+
+        image = composite(image, layer_image, layer.blend_mode, render.layer_opacity(aseprite_file, layer))
+
+    return image
+
+
+def compare_file(aseprite_file: AsepriteFile, executor: ThreadPoolExecutor, results: dict) -> None:
+    """ Compare every frame of a file, adding the differences to the results.
+    Results are keyed by "<color depth>/<blend mode>"; a frame counts towards each blend mode used by its layers.
+    """
+    paths = {name: setup(aseprite_file) for name, setup in render_paths(executor).items()}
+
+    for frame_number, frame in aseprite_file.iter_frames():
+        blend_modes = {
+            layer.blend_mode
+            for layer in render.rendered_layers(aseprite_file)
+            if aseprite_file.cel(frame, layer)
+        }
+        entries = [
+            results.setdefault(f"{aseprite_file.header.color_depth}bpp/{blend_mode_name(blend_mode)}", {
+                "frames": 0,
+                "not_implemented": 0,
+                "max_error": {},
+                "errors": [],
+            })
+            for blend_mode in sorted(blend_modes or {0})
+        ]
+
+        try:
+            expected = reference_frame_to_image(aseprite_file, frame)
+        except NotImplementedError:
+            for entry in entries:
+                entry["not_implemented"] += 1
+            continue
+
+        for entry in entries:
+            entry["frames"] += 1
+
+        for name, render_frame in paths.items():
+            try:
+                error = max_error(expected, render_frame(frame))
+            except Exception as e:
+                error = None
+                for entry in entries:
+                    entry["errors"].append(f"{aseprite_file.file_path.name} frame {frame_number}, {name}: {e!r}")
+
+            for entry in entries:
+                previous = entry["max_error"].get(name, 0)
+                entry["max_error"][name] = None if error is None or previous is None else max(previous, error)
+
+
+def max_error(expected: Image.Image, actual: Image.Image) -> int:
+    """ Get the largest difference between two RGBA images in any channel of any pixel. """
+    if actual.mode != "RGBA" or actual.size != expected.size:
+        raise RuntimeError(f"Expected an RGBA image of size {expected.size}, got {actual.mode} {actual.size}")
+
+    extrema = ImageChops.difference(expected, actual).getextrema()
+    return max(high for _, high in extrema)
+
+
+def _print_results(results: dict, tolerance: int) -> bool:
+    """ Print the results, and return True if any render path failed. """
+    failed = False
+    for key, entry in sorted(results.items()):
+        if not entry["frames"]:
+            print(f"{key}: not implemented ({entry['not_implemented']} frames)")
+            continue
+
+        errors = []
+        for name, error in entry["max_error"].items():
+            errors.append(f"{name}={'failed' if error is None else error}")
+            failed = failed or error is None or error > tolerance
+        print(f"{key}: {entry['frames']} frames, max error {', '.join(errors)}")
+
+        for error in entry["errors"]:
+            print(f"    {error}")
+
+    print("FAILED" if failed else f"OK (tolerance {tolerance})")
+    return failed
+
+
+if __name__ == "__main__":
+    main()
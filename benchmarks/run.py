@@ -0,0 +1,171 @@
+""" Benchmark the parse and render pipeline on synthetic Aseprite files.
+Each stage is timed separately, and the results are written as JSON so they can be compared across commits:
+
+    python benchmarks/run.py --output bench.json
+    python benchmarks/run.py --quick --scenario rgba --scenario indexed
+"""
+import argparse
+import io
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from pathlib import Path
+from typing import Callable
+
+import PIL
+from PIL import Image
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from aseprite_reader import AsepriteFile  # noqa: E402
+from aseprite_reader import render  # noqa: E402
+from aseprite_reader import utils  # noqa: E402
+from aseprite_reader.composite import composite_into  # noqa: E402
+from synthetic import SCENARIOS, Scenario, generate  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", type=Path, help="Write the results to this JSON file.")
+    parser.add_argument("--scenario", action="append", choices=[s.name for s in SCENARIOS],
+                        help="Only run these scenarios (can be repeated).")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of times to run each stage (the best is kept).")
+    parser.add_argument("--quick", action="store_true", help="Use smaller files.")
+    args = parser.parse_args()
+
+    scenarios = [s for s in SCENARIOS if not args.scenario or s.name in args.scenario]
+    if args.quick:
+        scenarios = [s.scaled(0.25) for s in scenarios]
+
+    results = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "pillow": PIL.__version__,
+        "repeat": args.repeat,
+        "quick": args.quick,
+        "scenarios": {},
+    }
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for scenario in scenarios:
+            path = generate(scenario, Path(temp_dir) / f"{scenario.name}.aseprite")
+            results["scenarios"][scenario.name] = run_scenario(scenario, path, args.repeat)
+            _print_scenario(scenario.name, results["scenarios"][scenario.name])
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+
+def run_scenario(scenario: Scenario, path: Path, repeat: int) -> dict:
+    """ Time each stage of the pipeline for one file.
+    Stages that aren't supported for the file (e.g. rendering tilemaps) are recorded as None.
+    """
+    result = {
+        "file_size": path.stat().st_size,
+        "width": scenario.width,
+        "height": scenario.height,
+        "color_depth": scenario.color_depth,
+        "frames": scenario.frame_count,
+        "layers": scenario.layer_count,
+        "stages": {},
+    }
+    stages = result["stages"]
+
+    # Parse: read the header, frames and chunks
+    stages["parse"] = _best_time(lambda: AsepriteFile(path), repeat)
+    aseprite_file = AsepriteFile(path)
+
+    if scenario.tilemap:
+        for stage in ("inflate", "pixel_conversion", "composite", "render", "png_encode"):
+            stages[stage] = None
+        return result
+
+    cels = _image_cels(aseprite_file)
+    result["cels"] = len(cels)
+    result["inflated_bytes"] = sum(len(zlib.decompress(cel.compressed_image_data)) for cel in cels)
+
+    # Inflate: decompress every distinct image cel
+    stages["inflate"] = _best_time(lambda: [zlib.decompress(cel.compressed_image_data) for cel in cels], repeat)
+    decompressed = {cel: zlib.decompress(cel.compressed_image_data) for cel in cels}
+
+    # Pixel conversion: turn decompressed cel data into RGBA images
+    def _convert() -> dict:
+        return {cel: utils.image_data_to_image(aseprite_file, cel.width, cel.height, data)
+                for cel, data in decompressed.items()}
+    stages["pixel_conversion"] = _best_time(_convert, repeat)
+    cel_images = _convert()
+
+    # Composite: blend the decoded cels of every frame
+    def _composite() -> None:
+        for frame in aseprite_file.frames:
+            frame_image = Image.new(mode="RGBA", size=(scenario.width, scenario.height))
+            for layer in render.rendered_layers(aseprite_file):
+                cel = aseprite_file.cel(frame, layer)
+                if cel:
+                    cel = aseprite_file.resolve_cel(cel)
+                    composite_into(frame_image, cel_images[cel], (cel.x_position, cel.y_position),
+                                   layer.blend_mode, render.layer_opacity(aseprite_file, layer))
+    stages["composite"] = _best_time(_composite, repeat)
+
+    # Render: the whole render path, from compressed cels to frame images
+    stages["render"] = _best_time(lambda: [render.frame_to_image(aseprite_file, f) for f in aseprite_file.frames],
+                                  repeat)
+    frame_images = [render.frame_to_image(aseprite_file, f) for f in aseprite_file.frames]
+
+    # PNG encode: save every rendered frame
+    stages["png_encode"] = _best_time(lambda: [image.save(io.BytesIO(), format="PNG") for image in frame_images],
+                                      repeat)
+
+    return result
+
+
+def _image_cels(aseprite_file: AsepriteFile) -> list:
+    """ Get every distinct compressed image cel in a file. """
+    cels = []
+    for frame in aseprite_file.frames:
+        for cel in frame.cels:
+            cel = aseprite_file.resolve_cel(cel)
+            if cel.cel_type == 2 and cel not in cels:
+                cels.append(cel)
+
+    return cels
+
+
+def _best_time(func: Callable, repeat: int) -> float:
+    """ Run a function several times, and return the shortest time (in seconds). """
+    times = []
+    for _ in range(max(repeat, 1)):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    return min(times)
+
+
+def _git_commit() -> str | None:
+    """ Get the current commit, if the benchmarks are run from a git checkout. """
+    try:
+        output = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+    return output.stdout.strip()
+
+
+def _print_scenario(name: str, result: dict) -> None:
+    """ Print the stage times of a scenario. """
+    stages = ", ".join(
+        f"{stage}={'n/a' if seconds is None else f'{seconds * 1000:.1f}ms'}"
+        for stage, seconds in result["stages"].items()
+    )
+    print(f"{name}: {stages}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+""" Generate synthetic Aseprite files for benchmarking.
+Only the standard library and Pillow are used, so files can be generated offline.
+"""
+import random
+import struct
+import zlib
+from pathlib import Path
+
+from PIL import Image
+
+
+class Scenario:
+    """ Settings for a synthetic Aseprite file. """
+    def __init__(
+            self,
+            name: str,
+            width: int,
+            height: int,
+            color_depth: int = 32,
+            frame_count: int = 8,
+            layer_count: int = 4,
+            linked_cels: bool = False,
+            tilemap: bool = False,
+            blend_modes: tuple[int, ...] = (0,),
+            palette_changes: bool = False,
+    ) -> None:
+        self.name = name
+        self.width = width
+        self.height = height
+        self.color_depth = color_depth
+        self.frame_count = frame_count
+        self.layer_count = layer_count
+        self.linked_cels = linked_cels
+        self.tilemap = tilemap
+        self.blend_modes = blend_modes
+        self.palette_changes = palette_changes
+
+    def __str__(self) -> str:
+        return f"Scenario({self.name})"
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    def scaled(self, factor: float) -> "Scenario":
+        """ A smaller (or larger) version of this scenario, for quick runs. """
+        return Scenario(
+            name=self.name,
+            width=max(int(self.width * factor), 16),
+            height=max(int(self.height * factor), 16),
+            color_depth=self.color_depth,
+            frame_count=max(int(self.frame_count * factor), 2),
+            layer_count=max(int(self.layer_count * factor), 2),
+            linked_cels=self.linked_cels,
+            tilemap=self.tilemap,
+            blend_modes=self.blend_modes,
+            palette_changes=self.palette_changes,
+        )
+
+
+SCENARIOS = [
+    Scenario("rgba", 256, 256),
+    Scenario("grayscale", 256, 256, color_depth=16),
+    Scenario("indexed", 256, 256, color_depth=8),
+    Scenario("many_frames", 128, 128, frame_count=240, layer_count=3),
+    Scenario("many_layers", 256, 256, frame_count=4, layer_count=64),
+    Scenario("linked_cels", 512, 512, frame_count=48, layer_count=6, linked_cels=True),
+    Scenario("tilemap", 256, 256, frame_count=8, layer_count=2, tilemap=True),
+    Scenario("large_canvas", 1920, 1080, frame_count=4, layer_count=4),
+]
+
+TILE_SIZE = 16
+TILE_COUNT = 32
+
+
+def generate(scenario: Scenario, path: Path, seed: int = 0) -> Path:
+    """ Write a synthetic Aseprite file for a scenario. """
+    rng = random.Random(seed)
+    frames = []
+
+    for frame_index in range(scenario.frame_count):
+        chunks = []
+
+        if frame_index == 0:
+            for layer_index in range(scenario.layer_count):
+                if scenario.tilemap and layer_index == 0:
+                    chunks.append(_layer_chunk("Tilemap", layer_type=2))
+                else:
+                    # Layers above the background cycle through the scenario's blend modes
+                    opacity = 255 if layer_index % 3 else 192
+                    blend_mode = scenario.blend_modes[(layer_index - 1) % len(scenario.blend_modes)] if layer_index else 0
+                    chunks.append(_layer_chunk(f"Layer {layer_index}", opacity=opacity, blend_mode=blend_mode))
+            if scenario.color_depth == 8:
+                chunks.append(_palette_chunk(rng))
+            if scenario.tilemap:
+                chunks.append(_tileset_chunk(scenario, rng))
+            chunks.append(_tags_chunk(scenario.frame_count))
+        elif scenario.palette_changes and scenario.color_depth == 8:
+            # Later frames replace part of the palette, starting after the transparent color
+            chunks.append(_palette_chunk(rng, 1, 64))
+
+        for layer_index in range(scenario.layer_count):
+            if scenario.tilemap and layer_index == 0:
+                chunks.append(_tilemap_cel_chunk(scenario, layer_index, rng))
+                continue
+
+            # The background layer links to the first frame. With linked cels, so does every layer except the top two.
+            linked = layer_index == 0 or (scenario.linked_cels and layer_index < scenario.layer_count - 2)
+            if frame_index > 0 and linked:
+                chunks.append(_linked_cel_chunk(layer_index, 0))
+            else:
+                chunks.append(_image_cel_chunk(scenario, layer_index, frame_index, rng))
+
+        frames.append(_frame(chunks, duration=100))
+
+    path.write_bytes(_file(scenario, frames))
+    return path
+
+
+def _string(value: str) -> bytes:
+    data = value.encode("utf-8")
+    return struct.pack('<H', len(data)) + data
+
+
+def _chunk(chunk_type: int, data: bytes) -> bytes:
+    return struct.pack('<IH', len(data) + 6, chunk_type) + data
+
+
+def _layer_chunk(name: str, layer_type: int = 0, opacity: int = 255, blend_mode: int = 0) -> bytes:
+    data = struct.pack('<HHHHHHB3x', 3, layer_type, 0, 0, 0, blend_mode, opacity) + _string(name)
+    if layer_type == 2:
+        data += struct.pack('<I', 0)
+    return _chunk(0x2004, data)
+
+
+def _palette_chunk(rng: random.Random, first: int = 0, last: int = 255) -> bytes:
+    data = struct.pack('<III8x', 256, first, last)
+    for _ in range(first, last + 1):
+        data += struct.pack('<H4B', 0, rng.randrange(256), rng.randrange(256), rng.randrange(256), 255)
+    return _chunk(0x2019, data)
+
+
+def _tags_chunk(frame_count: int) -> bytes:
+    middle = frame_count // 2
+    tags = [(0, middle - 1 if middle > 0 else 0, 0, "first"), (middle, frame_count - 1, 2, "second")]
+    data = struct.pack('<H8x', len(tags))
+    for from_frame, to_frame, direction, name in tags:
+        data += struct.pack('<HHBH6x3Bx', from_frame, to_frame, direction, 0, 0, 0, 0) + _string(name)
+    return _chunk(0x2018, data)
+
+
+def _tileset_chunk(scenario: Scenario, rng: random.Random) -> bytes:
+    tiles = _pixels(scenario.color_depth, TILE_SIZE, TILE_SIZE * TILE_COUNT, rng)
+    compressed = zlib.compress(tiles)
+    data = struct.pack('<IIIHHh14x', 0, 2 | 4, TILE_COUNT, TILE_SIZE, TILE_SIZE, 1) + _string("Tiles")
+    data += struct.pack('<I', len(compressed)) + compressed
+    return _chunk(0x2023, data)
+
+
+def _image_cel_chunk(scenario: Scenario, layer_index: int, frame_index: int, rng: random.Random) -> bytes:
+    if layer_index == 0:
+        # Full canvas background
+        x, y, width, height = 0, 0, scenario.width, scenario.height
+    else:
+        # Smaller cels that move around (and may stick out of the canvas)
+        width = max(scenario.width // 4, 1)
+        height = max(scenario.height // 4, 1)
+        x = rng.randrange(-width // 4, scenario.width - width // 2)
+        y = rng.randrange(-height // 4, scenario.height - height // 2)
+
+    pixels = _pixels(scenario.color_depth, width, height, rng)
+    data = struct.pack('<HhhBH7xHH', layer_index, x, y, 255, 2, width, height) + zlib.compress(pixels)
+    return _chunk(0x2005, data)
+
+
+def _linked_cel_chunk(layer_index: int, frame_position: int) -> bytes:
+    return _chunk(0x2005, struct.pack('<HhhBH7xH', layer_index, 0, 0, 255, 1, frame_position))
+
+
+def _tilemap_cel_chunk(scenario: Scenario, layer_index: int, rng: random.Random) -> bytes:
+    width_tiles = max(scenario.width // TILE_SIZE, 1)
+    height_tiles = max(scenario.height // TILE_SIZE, 1)
+    tiles = b"".join(struct.pack('<I', rng.randrange(TILE_COUNT)) for _ in range(width_tiles * height_tiles))
+    data = struct.pack('<HhhBH7xHHHIIII10x', layer_index, 0, 0, 255, 3, width_tiles, height_tiles, 32,
+                       0x1fffffff, 0x20000000, 0x40000000, 0x80000000)
+    return _chunk(0x2005, data + zlib.compress(tiles))
+
+
+def _pixels(color_depth: int, width: int, height: int, rng: random.Random) -> bytes:
+    """ Generate pixel data: a gradient with some noise and transparent areas, so it compresses like real art. """
+    gradient = Image.linear_gradient("L").resize((width, height)).rotate(rng.randrange(360))
+    noise = Image.frombytes("L", (width, height), rng.randbytes(width * height)).point(lambda v: v // 64 * 64)
+    alpha = Image.radial_gradient("L").resize((width, height)).point(lambda v: 0 if v > 180 else 255)
+
+    match color_depth:
+        case 32:
+            image = Image.merge("RGBA", (gradient, noise, gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT), alpha))
+            return image.tobytes()
+        case 16:
+            return Image.merge("LA", (gradient, alpha)).tobytes()
+        case 8:
+            # Index 0 is the transparent color
+            indexes = gradient.point(lambda v: v // 4 + 1)
+            indexes.paste(0, mask=alpha.point(lambda v: 255 - v))
+            return indexes.tobytes()
+        case _:
+            raise RuntimeError(f"Invalid color depth: {color_depth}")
+
+
+def _frame(chunks: list[bytes], duration: int) -> bytes:
+    body = b"".join(chunks)
+    return struct.pack('<IHHH2xI', len(body) + 16, 0xf1fa, min(len(chunks), 0xffff), duration, len(chunks)) + body
+
+
+def _file(scenario: Scenario, frames: list[bytes]) -> bytes:
+    body = b"".join(frames)
+    header = struct.pack('<IHHHHHIH8xB3xHBBhhHH84x', len(body) + 128, 0xa5e0, len(frames), scenario.width,
+                         scenario.height, scenario.color_depth, 1, 100, 0, 256, 1, 1, 0, 0, 16, 16)
+    return header + body
@@ -0,0 +1,56 @@
+from __future__ import annotations
+import asyncio
+import functools
+import os
+import weakref
+from concurrent.futures import Executor
+from typing import Any, Callable, Optional, TypeVar
+
+
+T = TypeVar("T")
+
+# Marks arguments of configure() that weren't given, so that None can still select the default executor
+_UNSET = object()
+
+_executor = None
+_max_concurrency = os.cpu_count() or 1
+_semaphores = weakref.WeakKeyDictionary()
+
+
+def configure(executor: Optional[Executor] | object = _UNSET, max_concurrency: Optional[int] = None) -> None:
+    """ Configure how blocking work is run by the asyncio API. Settings that aren't given are left as they are.
+    executor: The executor that parsing and rendering run on (None uses the event loop's default executor).
+    max_concurrency: The maximum number of blocking jobs that run at the same time, per event loop.
+    """
+    global _executor, _max_concurrency
+
+    if executor is not _UNSET:
+        _executor = executor
+    if max_concurrency is not None:
+        if max_concurrency < 1:
+            raise ValueError(f"max_concurrency must be at least 1 (got {max_concurrency}).")
+        _max_concurrency = max_concurrency
+        _semaphores.clear()
+
+
+async def run_blocking(func: Callable[..., T], *args: Any, executor: Optional[Executor] = None, **kwargs: Any) -> T:
+    """ Run a blocking function on an executor without blocking the event loop.
+    Jobs wait for a free slot (in the order they were submitted) before they start, so that long-running work, such
+    as rendering every frame of a large file, can't occupy every worker while other jobs wait.
+    """
+    loop = asyncio.get_running_loop()
+    if executor is None:
+        executor = _executor
+
+    async with _semaphore(loop):
+        return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+
+def _semaphore(loop: asyncio.AbstractEventLoop) -> asyncio.Semaphore:
+    """ Get the semaphore that limits concurrent jobs on an event loop. """
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(_max_concurrency)
+        _semaphores[loop] = semaphore
+
+    return semaphore
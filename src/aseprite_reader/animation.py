@@ -0,0 +1,328 @@
+from __future__ import annotations
+import io
+import struct
+import zlib
+from pathlib import Path
+from typing import IO, Optional, TYPE_CHECKING
+
+from PIL import Image
+
+from aseprite_reader import render
+from aseprite_reader import scaling
+from aseprite_reader.render_cache import frame_fingerprint
+
+if TYPE_CHECKING:
+    from aseprite_reader import AsepriteFile
+    from aseprite_reader.frame import Frame
+    from aseprite_reader.models import Tag
+
+
+ANIMATION_FORMATS = {
+    ".gif": "GIF",
+    ".png": "APNG",
+    ".apng": "APNG",
+    ".webp": "WEBP",
+}
+
+
+def animation_frames(aseprite_file: AsepriteFile, tag: Optional[Tag] = None) -> list[tuple[Frame, int]]:
+    """ Get the frames of an animation, in playback order, with their durations (in milliseconds).
+    If a tag is given, its frames are played according to its loop animation direction and repeat count; otherwise
+    every frame in the file is played forward.
+    Consecutive frames that render the same image are merged into one frame, with their durations added together.
+    """
+    if tag:
+        frames = [aseprite_file.frame(frame_index + 1) for frame_index in tag.frame_sequence()]
+    else:
+        frames = aseprite_file.frames
+
+    merged = []
+    previous_fingerprint = None
+    for frame in frames:
+        fingerprint = frame_fingerprint(aseprite_file, frame)
+        if merged and fingerprint == previous_fingerprint:
+            merged[-1] = (merged[-1][0], merged[-1][1] + frame.duration)
+        else:
+            merged.append((frame, frame.duration))
+        previous_fingerprint = fingerprint
+
+    return merged
+
+
+def export_animation(
+        aseprite_file: AsepriteFile,
+        output_file: Path,
+        tag: Optional[Tag] = None,
+        loop: int = 0,
+        prefetch: int = 2,
+        scale: int = 1,
+        correct_aspect: bool = False
+) -> None:
+    """ Export an animation as an animated GIF, APNG or WebP file (chosen by the output file extension).
+    Frames are rendered and written one at a time, so only a few rendered frames are held in memory, no matter how
+    long the animation is.
+    loop: Number of times the animation plays (0 means forever).
+    scale, correct_aspect: Scale each frame with nearest-neighbor sampling (see scaling.scale_image).
+    """
+    frame_format = ANIMATION_FORMATS.get(output_file.suffix.lower())
+    if not frame_format:
+        raise RuntimeError(f"Output file {output_file.as_posix()} must have one of these extensions: "
+                           f"{', '.join(ANIMATION_FORMATS)}")
+
+    frames = animation_frames(aseprite_file, tag)
+    factor_x, factor_y = scaling.scale_factors(aseprite_file, scale, correct_aspect)
+    size = (aseprite_file.header.width * factor_x, aseprite_file.header.height * factor_y)
+    images = render.iter_frame_images(aseprite_file, [frame for frame, _ in frames], prefetch=prefetch)
+
+    with output_file.open('wb') as f:
+        match frame_format:
+            case "GIF":
+                writer = GifWriter(f, size, loop)
+            case "APNG":
+                writer = ApngWriter(f, size, len(frames), loop)
+            case _:
+                writer = WebpWriter(f, size, loop)
+
+        for (_, duration), image in zip(frames, images):
+            writer.add_frame(scaling.scale_image(aseprite_file, image, scale, correct_aspect), duration)
+        writer.close()
+
+
+class GifWriter:
+    """ Writes an animated GIF one frame at a time.
+    Each frame is quantized to its own palette (stored as a local color table), with pixels that are less than half
+    opaque written as transparent.
+    'loop' is the number of times the animation plays (0 means forever), as for the APNG and WebP writers. GIF files
+    store the number of times it repeats after the first play instead, so it is converted.
+    """
+    def __init__(self, file: IO, size: tuple[int, int], loop: int = 0) -> None:
+        self._file = file
+        self._size = size
+
+        # Header and logical screen descriptor (without a global color table)
+        self._file.write(b"GIF89a" + struct.pack('<HHBBB', size[0], size[1], 0, 0, 0))
+
+        # Repeat count (NETSCAPE2.0 application extension), where 0 repeats forever. Animations that play once have no
+        # extension, because a repeat count of 0 would make them loop.
+        if loop != 1:
+            repeat = 0 if loop == 0 else loop - 1
+            self._file.write(b"\x21\xff\x0bNETSCAPE2.0" + struct.pack('<BBHB', 3, 1, repeat, 0))
+
+    def add_frame(self, image: Image.Image, duration: int) -> None:
+        """ Write a frame that is displayed for a duration (in milliseconds). """
+        # Quantize to 255 colors, and use the last palette entry for transparent pixels
+        transparent = image.getchannel("A").point(lambda a: 255 if a < 128 else 0, mode="1")
+        indexed = image.convert("RGB").quantize(colors=255)
+        palette = indexed.getpalette()[:255 * 3]
+        indexed.putpalette(palette + [0, 0, 0] * (256 - len(palette) // 3))
+        indexed.paste(255, mask=transparent)
+
+        # Let Pillow encode the frame as a single-frame GIF, then take the image data out of it
+        encoded = io.BytesIO()
+        indexed.save(encoded, format="GIF", transparency=255)
+        color_table, blocks = _split_gif(encoded.getvalue())
+
+        # Keep the transparent color from the graphic control extension, if Pillow wrote one
+        transparency_flag, transparent_index = 0, 0
+        for block in blocks:
+            if block[0] == 0x21 and block[1] == 0xf9:
+                transparency_flag, transparent_index = block[3] & 1, block[6]
+
+        # Graphic control extension: set the delay, and clear the frame before the next one is drawn
+        delay = min(round(duration / 10), 0xffff)
+        self._file.write(struct.pack('<BBBBHBB', 0x21, 0xf9, 4, (2 << 2) | transparency_flag, delay,
+                                     transparent_index, 0))
+
+        for block in blocks:
+            if block[0] == 0x2c:
+                # Image descriptor: move the global color table to a local color table
+                packed = block[9]
+                if color_table and not packed & 0x80:
+                    packed = 0x80 | (packed & 0x40) | ((len(color_table) // 3).bit_length() - 2)
+                    block = block[:9] + bytes([packed]) + color_table + block[10:]
+                self._file.write(block)
+
+    def close(self) -> None:
+        """ Finish the file. """
+        self._file.write(b"\x3b")
+
+
+class ApngWriter:
+    """ Writes an animated PNG one frame at a time.
+    The number of frames has to be known up front, because it is written before the first frame.
+    """
+    def __init__(self, file: IO, size: tuple[int, int], frame_count: int, loop: int = 0) -> None:
+        self._file = file
+        self._size = size
+        self._frame_count = frame_count
+        self._loop = loop
+        self._frames_written = 0
+        self._sequence_number = 0
+
+        self._file.write(b"\x89PNG\r\n\x1a\n")
+
+    def add_frame(self, image: Image.Image, duration: int) -> None:
+        """ Write a frame that is displayed for a duration (in milliseconds). """
+        if self._frames_written == self._frame_count:
+            raise RuntimeError(f"Can't add more than {self._frame_count} frames to this animation.")
+
+        # Let Pillow encode the frame as a PNG, then take the image data out of it
+        encoded = io.BytesIO()
+        image.save(encoded, format="PNG")
+        chunks = _split_png(encoded.getvalue())
+
+        if self._frames_written == 0:
+            self._write_chunk(b"IHDR", chunks[0][1])
+            self._write_chunk(b"acTL", struct.pack('>II', self._frame_count, self._loop))
+
+        # Frame control: replace the whole canvas with this frame
+        if duration <= 0xffff:
+            delay_numerator, delay_denominator = duration, 1000
+        else:
+            delay_numerator, delay_denominator = min(round(duration / 10), 0xffff), 100
+        self._write_chunk(b"fcTL", struct.pack('>IIIIIHHBB', self._next_sequence_number(), self._size[0],
+                                               self._size[1], 0, 0, delay_numerator, delay_denominator, 0, 0))
+
+        for chunk_type, data in chunks:
+            if chunk_type != b"IDAT":
+                continue
+            if self._frames_written == 0:
+                self._write_chunk(b"IDAT", data)
+            else:
+                self._write_chunk(b"fdAT", struct.pack('>I', self._next_sequence_number()) + data)
+
+        self._frames_written += 1
+
+    def close(self) -> None:
+        """ Finish the file. """
+        if self._frames_written != self._frame_count:
+            raise RuntimeError(f"Expected {self._frame_count} frames, but {self._frames_written} were added.")
+
+        self._write_chunk(b"IEND", b"")
+
+    def _next_sequence_number(self) -> int:
+        """ Get the sequence number for the next frame control or frame data chunk. """
+        sequence_number = self._sequence_number
+        self._sequence_number += 1
+        return sequence_number
+
+    def _write_chunk(self, chunk_type: bytes, data: bytes) -> None:
+        """ Write a PNG chunk. """
+        self._file.write(struct.pack('>I', len(data)) + chunk_type + data)
+        self._file.write(struct.pack('>I', zlib.crc32(chunk_type + data)))
+
+
+class WebpWriter:
+    """ Writes an animated WebP one frame at a time.
+    The file must be seekable, because the file size is written in the header once every frame has been added.
+    """
+    def __init__(self, file: IO, size: tuple[int, int], loop: int = 0, lossless: bool = True) -> None:
+        self._file = file
+        self._size = size
+        self._lossless = lossless
+        self._start = file.tell()
+
+        self._file.write(b"RIFF\0\0\0\0WEBP")
+
+        # Extended header with the animation and alpha flags set
+        self._write_chunk(b"VP8X", struct.pack('<B3x', 0x12) + _uint24(size[0] - 1) + _uint24(size[1] - 1))
+
+        # Transparent background color
+        self._write_chunk(b"ANIM", struct.pack('<IH', 0, loop))
+
+    def add_frame(self, image: Image.Image, duration: int) -> None:
+        """ Write a frame that is displayed for a duration (in milliseconds). """
+        # Let Pillow encode the frame as a still WebP image, then take the image data out of it
+        encoded = io.BytesIO()
+        image.save(encoded, format="WEBP", lossless=self._lossless, exact=True)
+        frame_data = b"".join(
+            _riff_chunk(chunk_type, data)
+            for chunk_type, data in _split_webp(encoded.getvalue())
+            if chunk_type in (b"ALPH", b"VP8 ", b"VP8L")
+        )
+
+        # Frame at (0, 0) covering the canvas, which replaces the canvas instead of blending with it
+        header = (_uint24(0) + _uint24(0) + _uint24(self._size[0] - 1) + _uint24(self._size[1] - 1)
+                  + _uint24(min(duration, 0xffffff)) + bytes([0x02]))
+        self._write_chunk(b"ANMF", header + frame_data)
+
+    def close(self) -> None:
+        """ Finish the file by writing its size into the header. """
+        end = self._file.tell()
+        self._file.seek(self._start + 4)
+        self._file.write(struct.pack('<I', end - self._start - 8))
+        self._file.seek(end)
+
+    def _write_chunk(self, chunk_type: bytes, data: bytes) -> None:
+        """ Write a RIFF chunk. """
+        self._file.write(_riff_chunk(chunk_type, data))
+
+
+def _split_gif(data: bytes) -> tuple[bytes, list[bytes]]:
+    """ Split a GIF file into its global color table and its blocks (extensions and images). """
+    packed = data[10]
+    position = 13
+    color_table = b""
+    if packed & 0x80:
+        color_table_size = 3 * 2 ** ((packed & 0x07) + 1)
+        color_table = data[position:position + color_table_size]
+        position += color_table_size
+
+    blocks = []
+    while data[position] != 0x3b:
+        start = position
+        if data[position] == 0x21:
+            # Extension: introducer, label, then data sub-blocks
+            position += 2
+        elif data[position] == 0x2c:
+            # Image: descriptor, optional local color table, LZW minimum code size, then data sub-blocks
+            image_packed = data[position + 9]
+            position += 10
+            if image_packed & 0x80:
+                position += 3 * 2 ** ((image_packed & 0x07) + 1)
+            position += 1
+        else:
+            raise RuntimeError(f"Invalid GIF block: {hex(data[position])}")
+
+        # Data sub-blocks, ending with an empty sub-block
+        while data[position] != 0:
+            position += data[position] + 1
+        position += 1
+        blocks.append(data[start:position])
+
+    return color_table, blocks
+
+
+def _split_png(data: bytes) -> list[tuple[bytes, bytes]]:
+    """ Split a PNG file into a list of (chunk_type, data). """
+    chunks = []
+    position = 8
+    while position < len(data):
+        length, chunk_type = struct.unpack('>I4s', data[position:position + 8])
+        chunks.append((chunk_type, data[position + 8:position + 8 + length]))
+        position += length + 12
+
+    return chunks
+
+
+def _split_webp(data: bytes) -> list[tuple[bytes, bytes]]:
+    """ Split a WebP file into a list of (chunk_type, data). """
+    chunks = []
+    position = 12
+    while position < len(data):
+        chunk_type, length = struct.unpack('<4sI', data[position:position + 8])
+        chunks.append((chunk_type, data[position + 8:position + 8 + length]))
+        position += 8 + length + (length & 1)
+
+    return chunks
+
+
+def _riff_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    """ Encode a RIFF chunk, padded to an even length. """
+    padding = b"\0" if len(data) & 1 else b""
+    return chunk_type + struct.pack('<I', len(data)) + data + padding
+
+
+def _uint24(value: int) -> bytes:
+    """ Encode a 24-bit unsigned little-endian integer. """
+    return struct.pack('<I', value)[:3]
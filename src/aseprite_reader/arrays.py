@@ -0,0 +1,206 @@
+from __future__ import annotations
+import zlib
+from typing import Iterable, Optional, TYPE_CHECKING
+
+from aseprite_reader import profiling
+from aseprite_reader import render
+from aseprite_reader import utils
+from aseprite_reader.composite import COMPOSITE_STAGES
+
+if TYPE_CHECKING:
+    import numpy as np
+    from aseprite_reader import AsepriteFile
+    from aseprite_reader.chunks import CelChunk, LayerChunk
+    from aseprite_reader.frame import Frame
+
+
+# Matches the fixed point precision of Pillow's alpha_composite, so both produce the same pixels
+_PRECISION_BITS = 7
+
+
+def frames_to_array(
+        aseprite_file: AsepriteFile,
+        frames: Optional[Iterable[Frame]] = None,
+        layers: Optional[Iterable[LayerChunk]] = None
+) -> np.ndarray:
+    """ Render frames into a contiguous (frames, height, width, 4) array of RGBA uint8 pixels.
+    By default, every frame is rendered with the layers that render.frame_to_image uses. If layers are given, only
+    those layers are composited (in file order).
+    Cels are decoded straight into the array and composited within their bounds, without creating an image per frame.
+    Group layers have no pixels of their own, so they are skipped (select the layers in a group to include them).
+    If a layer uses a blend mode other than normal, or is a tilemap, frames are rendered with render.frame_to_image
+    (with the same layers) and copied in.
+    """
+    np = _import_numpy()
+
+    frames = list(aseprite_file.frames if frames is None else frames)
+    layers = [layer for layer in _layers(aseprite_file, layers) if layer.layer_type != 1]
+    header = aseprite_file.header
+    array = np.zeros((len(frames), header.height, header.width, 4), dtype=np.uint8)
+    fall_back = any(layer.blend_mode != 0 or layer.layer_type != 0 for layer in layers)
+
+    decoded_cels = {}
+    for frame_index, frame in enumerate(frames):
+        if fall_back:
+            array[frame_index] = np.asarray(render.frame_to_image(aseprite_file, frame, layers=layers))
+            continue
+
+        with profiling.scope(aseprite_file, frame), profiling.stage(profiling.RENDER_FRAME):
+            for layer in layers:
+                cel = aseprite_file.cel(frame, layer)
+                if not cel:
+                    continue
+
+                cel = aseprite_file.resolve_cel(cel)
+                region = _cel_region(aseprite_file, cel)
+                if not region:
+                    continue
+
+                destination, source = region
+                pixels = _decode_cel(aseprite_file, frame, cel, decoded_cels)[source]
+                with profiling.stage(COMPOSITE_STAGES[0]):
+                    _composite_normal(array[frame_index][destination], pixels,
+                                      render.layer_opacity(aseprite_file, layer))
+
+    return array
+
+
+def layers_to_array(
+        aseprite_file: AsepriteFile,
+        frames: Optional[Iterable[Frame]] = None,
+        layers: Optional[Iterable[LayerChunk]] = None
+) -> np.ndarray:
+    """ Get the pixels of each layer on each frame as a contiguous (frames, layers, height, width, 4) array of RGBA
+    uint8 pixels.
+    By default, every frame and the layers that render.frame_to_image uses are included.
+    Each layer holds the pixels of its cel, without layer opacity or blending applied.
+    """
+    np = _import_numpy()
+
+    frames = list(aseprite_file.frames if frames is None else frames)
+    layers = _layers(aseprite_file, layers)
+    header = aseprite_file.header
+    array = np.zeros((len(frames), len(layers), header.height, header.width, 4), dtype=np.uint8)
+
+    decoded_cels = {}
+    for frame_index, frame in enumerate(frames):
+        for layer_index, layer in enumerate(layers):
+            if layer.layer_type != 0:
+                raise NotImplementedError(f"Layer type {layer.layer_type} can't be exported as an array.")
+
+            cel = aseprite_file.cel(frame, layer)
+            if not cel:
+                continue
+
+            cel = aseprite_file.resolve_cel(cel)
+            region = _cel_region(aseprite_file, cel)
+            if not region:
+                continue
+
+            destination, source = region
+            pixels = _decode_cel(aseprite_file, frame, cel, decoded_cels)[source]
+            array[frame_index, layer_index][destination] = pixels
+
+    return array
+
+
+def _import_numpy():
+    """ Import NumPy, which is an optional dependency. """
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("NumPy is required to export arrays (install with 'pip install aseprite-reader[numpy]').")
+
+    return numpy
+
+
+def _layers(aseprite_file: AsepriteFile, layers: Optional[Iterable[LayerChunk]]) -> list[LayerChunk]:
+    """ Get the layers to export, in file order. """
+    if layers is None:
+        return render.rendered_layers(aseprite_file)
+
+    layers = set(layers)
+    return [layer for layer in aseprite_file.layers if layer in layers]
+
+
+def _cel_region(aseprite_file: AsepriteFile, cel: CelChunk) -> Optional[tuple[tuple[slice, slice], tuple[slice, slice]]]:
+    """ Get the part of the canvas a cel covers, and the matching part of the cel.
+    A tuple of (canvas_slices, cel_slices) is returned, or None if the cel is outside the canvas.
+    """
+    if cel.cel_type != 2:
+        raise NotImplementedError(f"Cel type {cel.cel_type} can't be exported as an array.")
+
+    header = aseprite_file.header
+    left = max(cel.x_position, 0)
+    upper = max(cel.y_position, 0)
+    right = min(cel.x_position + cel.width, header.width)
+    lower = min(cel.y_position + cel.height, header.height)
+    if left >= right or upper >= lower:
+        return None
+
+    destination = (slice(upper, lower), slice(left, right))
+    source = (slice(upper - cel.y_position, lower - cel.y_position),
+              slice(left - cel.x_position, right - cel.x_position))
+    return destination, source
+
+
+def _decode_cel(aseprite_file: AsepriteFile, frame: Frame, cel: CelChunk, decoded_cels: dict) -> np.ndarray:
+    """ Decode a compressed image cel into a (height, width, 4) array of RGBA pixels.
+    Decoded cels are kept in 'decoded_cels', so cels shared by several frames are only decoded once (per palette, for
+    indexed cels). The palette lookup table of each palette version is kept there too.
+    """
+    key = render.decoded_cel_key(aseprite_file, frame, cel)
+    if key in decoded_cels:
+        return decoded_cels[key]
+
+    np = _import_numpy()
+    with profiling.stage(profiling.INFLATE) as stage:
+        data = np.frombuffer(zlib.decompress(cel.compressed_image_data), dtype=np.uint8)
+        stage.size = len(data)
+
+    with profiling.stage(profiling.PIXEL_CONVERSION):
+        match aseprite_file.header.color_depth:
+            case 32:
+                pixels = data.reshape(cel.height, cel.width, 4)
+            case 16:
+                gray = data.reshape(cel.height, cel.width, 2)
+                pixels = gray[:, :, [0, 0, 0, 1]]
+            case 8:
+                palette_key = ("palette", key[1])
+                if palette_key not in decoded_cels:
+                    palette_data = utils.indexed_palette_data(aseprite_file, aseprite_file.frame_number(frame))
+                    decoded_cels[palette_key] = np.frombuffer(palette_data, dtype=np.uint8).reshape(256, 4)
+                pixels = decoded_cels[palette_key][data.reshape(cel.height, cel.width)]
+            case _:
+                raise RuntimeError(f"Invalid color depth: {aseprite_file.header.color_depth}")
+
+    decoded_cels[key] = pixels
+    return pixels
+
+
+def _composite_normal(dst: np.ndarray, src: np.ndarray, opacity: int) -> None:
+    """ Composite RGBA pixels onto an array in place with the normal blend mode.
+    This uses the same integer arithmetic as Pillow's alpha_composite.
+    """
+    np = _import_numpy()
+
+    src_a = src[:, :, 3].astype(np.uint32)
+    if opacity < 255:
+        src_a = (src_a * (float(opacity) / 255.0)).astype(np.uint32)
+
+    dst_a = dst[:, :, 3].astype(np.uint32)
+    blend = dst_a * (255 - src_a)
+    out_a255 = src_a * 255 + blend
+    coef1 = src_a * (255 * 255 * (1 << _PRECISION_BITS)) // np.maximum(out_a255, 1)
+    coef2 = 255 * (1 << _PRECISION_BITS) - coef1
+
+    tmp = src[:, :, :3].astype(np.uint32) * coef1[:, :, None] + dst[:, :, :3].astype(np.uint32) * coef2[:, :, None]
+    tmp += 0x80 << _PRECISION_BITS
+    rgb = (((tmp >> 8) + tmp) >> 8) >> _PRECISION_BITS
+    a = out_a255 + 0x80
+    a = ((a >> 8) + a) >> 8
+
+    # Pixels with a transparent source keep the destination pixel
+    visible = src_a != 0
+    dst[:, :, :3][visible] = rgb[visible]
+    dst[:, :, 3][visible] = a[visible]
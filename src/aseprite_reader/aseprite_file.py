@@ -1,28 +1,92 @@
+from __future__ import annotations
+import shutil
+from concurrent.futures import Executor
 from pathlib import Path
-from typing import Iterator, Optional
+from typing import Any, AsyncIterator, IO, Iterable, Iterator, Optional, TYPE_CHECKING
 
+from PIL import Image
+
+from aseprite_reader import aio
+from aseprite_reader import animation
+from aseprite_reader import arrays
+from aseprite_reader import color_management
+from aseprite_reader import external_files
+from aseprite_reader import memory
+from aseprite_reader import palette
+from aseprite_reader import profiling
+from aseprite_reader import region_render
 from aseprite_reader import render
+from aseprite_reader import scaling
+from aseprite_reader import slices
+from aseprite_reader import timeline
 from aseprite_reader import utils
-from aseprite_reader.chunks import CelChunk, LayerChunk, TagsChunk
-from aseprite_reader.frame import Frame
+from aseprite_reader import writer
+from aseprite_reader.chunk import Chunk
+from aseprite_reader.chunks import (
+    CelChunk, ColorProfileChunk, LayerChunk, SliceChunk, TagsChunk, TilesetChunk, UserDataChunk
+)
+from aseprite_reader.frame import Frame, PALETTE_CHUNK_TYPES, read_chunks
 from aseprite_reader.header import Header
-from aseprite_reader.models import Tag
+from aseprite_reader.models import ExternalFile, Tag
+
+if TYPE_CHECKING:
+    import numpy as np
+    from aseprite_reader.render_cache import RenderCache
 
 
 ASEPRITE_MAGIC_NUMBER = 0xa5e0
 
 
 class AsepriteFile:
-    def __init__(self, file_path: str | Path) -> None:
+    def __init__(
+            self,
+            file_path: str | Path,
+            keep_payloads: bool = True,
+            frames: Optional[Iterable[int]] = None,
+            tag: Optional[str] = None
+    ) -> None:
+        """ Read an Aseprite file.
+        If 'keep_payloads' is False, the compressed pixel and tile data of cels isn't kept in memory; it is read from
+        the file again whenever it is needed (see evict_payloads).
+        To read only some frames, pass their frame numbers (starting from 1) as 'frames', or the name of a tag as
+        'tag'. The first frame is always read (it holds the layers, tags and palette), and the other frames are
+        skipped without reading their chunks. Skipped frames are read when they are needed, e.g. by a linked cel or
+        frame(), but only the selected frames are listed in 'frames'.
+        """
         if isinstance(file_path, str):
             file_path = Path(file_path)
+        if frames is not None and tag is not None:
+            raise ValueError("Only one of 'frames' and 'tag' can be given.")
 
         self._file_path = file_path
+        self._keep_payloads = keep_payloads
         self._header = None
         self._frames = []
+        self._frame_numbers = {}
+        self._parsed_frames = {}
+        self._frame_offsets = []
+        self._cel_indexes = {}
+        self._timeline = None
+        self._palette_timeline = None
+        self._external_file_resolver = None
 
         self._validate()
-        self._read_file()
+        self._read_file(frames, tag)
+
+        if not keep_payloads:
+            self.evict_payloads()
+
+    @classmethod
+    async def aopen(
+            cls,
+            file_path: str | Path,
+            keep_payloads: bool = True,
+            frames: Optional[Iterable[int]] = None,
+            tag: Optional[str] = None,
+            executor: Optional[Executor] = None
+    ) -> AsepriteFile:
+        """ Read an Aseprite file without blocking the event loop. """
+        return await aio.run_blocking(cls, file_path, keep_payloads, frames, tag, executor=executor)
 
     def __str__(self) -> str:
         return f"AsepriteFile({self._file_path.as_posix()})"
@@ -67,6 +131,56 @@ class AsepriteFile:
 
         return layers
 
+    @property
+    def color_profile(self) -> Optional[ColorProfileChunk]:
+        """ The color profile of the file, or None if it doesn't have one. """
+        return color_management.color_profile(self)
+
+    @property
+    def user_data(self) -> Optional[UserDataChunk]:
+        """ The user data of the sprite, or None if it doesn't have any.
+        It is stored after the palette chunk (old or new) of the first frame.
+        """
+        for chunk in self.frame(1).chunks:
+            if chunk.chunk_type in PALETTE_CHUNK_TYPES and chunk.user_data is not None:
+                return chunk.user_data
+
+        return None
+
+    @property
+    def slices(self) -> list[SliceChunk]:
+        """ A list of slices in the file. """
+        slice_chunks = []
+        first_frame = self.frame(1)
+        for chunk in first_frame.chunks:
+            if isinstance(chunk, SliceChunk):
+                slice_chunks.append(chunk)
+
+        return slice_chunks
+
+    @property
+    def tilesets(self) -> list[TilesetChunk]:
+        """ A list of tilesets in the file. """
+        tilesets = []
+        first_frame = self.frame(1)
+        for chunk in first_frame.chunks:
+            if isinstance(chunk, TilesetChunk):
+                tilesets.append(chunk)
+
+        return tilesets
+
+    @property
+    def external_files(self) -> list[ExternalFile]:
+        """ A list of external files (palettes and tilesets) referenced by the file. """
+        return self.external_file_resolver.external_files
+
+    @property
+    def external_file_resolver(self) -> external_files.ExternalFileResolver:
+        """ Loads the external files referenced by the file, relative to its directory, through the shared pool. """
+        if self._external_file_resolver is None:
+            self._external_file_resolver = external_files.ExternalFileResolver(self)
+        return self._external_file_resolver
+
     def _validate(self) -> None:
         """ Make sure this is a valid Aseprite file. """
         with self.file_path.open('rb') as f:
@@ -74,19 +188,96 @@ class AsepriteFile:
             if utils.read_word(f) != ASEPRITE_MAGIC_NUMBER:
                 raise Exception(f"{self.file_path.as_posix()} is not a valid Aseprite file")
 
-    def _read_file(self) -> None:
+    def _read_file(self, frame_numbers: Optional[Iterable[int]], tag: Optional[str]) -> None:
         """ Read header and frame data. """
-        with self.file_path.open('rb') as f:
-            self._header = Header(f)
-            for _ in range(self.header.frame_count):
-                self._frames.append(Frame(f))
+        with self.file_path.open('rb') as f, profiling.scope(self), profiling.stage(profiling.PARSE):
+            with profiling.stage(profiling.PARSE_HEADER):
+                self._header = Header(f)
+
+            for frame_index in range(self.header.frame_count):
+                frame_number = frame_index + 1
+                self._frame_offsets.append(f.tell())
+
+                # The first frame is always read; it holds the layers and tags that frames are selected by
+                if frame_number == 1:
+                    self._read_frame(f, frame_number)
+                    frame_numbers = self._selected_frame_numbers(frame_numbers, tag)
+                elif frame_number in frame_numbers:
+                    self._read_frame(f, frame_number)
+                else:
+                    # Skip over the frame using the frame size from its header
+                    f.seek(self._frame_offsets[-1] + utils.read_dword(f))
+
+        if self._parsed_frames:
+            self._frames = [self._parsed_frames[frame_number] for frame_number in sorted(frame_numbers)]
+
+    def _selected_frame_numbers(self, frame_numbers: Optional[Iterable[int]], tag: Optional[str]) -> set[int]:
+        """ Get the numbers of the frames that were selected when the file was opened. """
+        if tag is not None:
+            for t in self.tags:
+                if t.name == tag:
+                    return set(range(t.from_frame + 1, t.to_frame + 2))
+            raise RuntimeError(f"Tag '{tag}' does not exist in {self.file_path.as_posix()}")
+
+        if frame_numbers is None:
+            return set(range(1, self.header.frame_count + 1))
+
+        frame_numbers = set(frame_numbers)
+        for frame_number in frame_numbers:
+            if not 1 <= frame_number <= self.header.frame_count:
+                raise IndexError(f"Frame {frame_number} does not exist (frame range is 1-{self.header.frame_count}).")
+
+        return frame_numbers
+
+    def _read_frame(self, file: IO, frame_number: int) -> Frame:
+        """ Read a frame at the current file position. """
+        with profiling.scope(self, frame_number=frame_number), profiling.stage(profiling.PARSE_FRAME):
+            frame = Frame(file)
+
+        self._parsed_frames[frame_number] = frame
+        self._frame_numbers[frame] = frame_number
+        return frame
 
     def frame(self, frame_number: int) -> Frame:
-        """ Get a frame from its frame number. """
-        try:
-            return self.frames[frame_number-1]
-        except IndexError:
-            raise IndexError(f"Frame {frame_number} does not exist (frame range is 1-{len(self.frames)}).")
+        """ Get a frame from its frame number.
+        Frames that were skipped when the file was opened are read from the file.
+        """
+        if frame_number in self._parsed_frames:
+            return self._parsed_frames[frame_number]
+
+        if not 1 <= frame_number <= self.header.frame_count:
+            raise IndexError(f"Frame {frame_number} does not exist (frame range is 1-{self.header.frame_count}).")
+
+        with self.file_path.open('rb') as f:
+            f.seek(self._frame_offsets[frame_number - 1])
+            frame = self._read_frame(f, frame_number)
+
+        if not self._keep_payloads:
+            for cel in frame.cels:
+                cel.evict_payload(self.file_path)
+
+        return frame
+
+    def palette_chunks(self, frame_number: int) -> list[Chunk]:
+        """ Get the palette chunks (old and new) of a frame number.
+        Frames that were skipped when the file was opened aren't read: only their chunk headers are read from the file
+        to find the palette chunks, and the rest of their chunks are skipped.
+        """
+        if frame_number in self._parsed_frames:
+            chunks = self._parsed_frames[frame_number].chunks
+        else:
+            if not 1 <= frame_number <= self.header.frame_count:
+                raise IndexError(f"Frame {frame_number} does not exist (frame range is 1-{self.header.frame_count}).")
+
+            with self.file_path.open('rb') as f:
+                f.seek(self._frame_offsets[frame_number - 1])
+                chunks = read_chunks(f, PALETTE_CHUNK_TYPES)
+
+        return [chunk for chunk in chunks if chunk.chunk_type in PALETTE_CHUNK_TYPES]
+
+    def frame_number(self, frame: Frame) -> int:
+        """ Get the frame number (starting from 1) of a frame. """
+        return self._frame_numbers[frame]
 
     def cel(self, frame: Frame, layer: LayerChunk) -> Optional[CelChunk]:
         """ Get a layer's cel on a specific frame. """
@@ -95,37 +286,297 @@ class AsepriteFile:
             if cel.layer_index == layer_index:
                 return cel
 
+    def resolve_cel(self, cel: CelChunk) -> CelChunk:
+        """ Get the cel that holds the image data for a cel.
+        Linked cels are followed to the cel they link to; any other cel is returned as-is.
+        """
+        if cel.cel_type != 1:
+            return cel
+
+        layer = self.layers[cel.layer_index]
+        linked_frame = self.frame(cel.linked_frame_position + 1)
+        linked_cel = self.cel(linked_frame, layer)
+        if not linked_cel:
+            raise RuntimeError(f"Linked cel on layer '{layer.layer_name}' points to an empty cel "
+                               f"(frame {cel.linked_frame_position + 1}).")
+
+        return linked_cel
+
+    def memory_report(self) -> memory.MemoryReport:
+        """ Estimate the memory held by this file, per chunk type, per frame and per layer. """
+        return memory.memory_report(self)
+
+    def caches(self) -> dict[str, Any]:
+        """ Get the caches built on this file, by name (e.g. for a memory report). Caches that haven't been built yet
+        are None, or empty.
+        """
+        return {
+            "cel_indexes": self._cel_indexes,
+            "timeline": self._timeline,
+            "palette_timeline": self._palette_timeline,
+            "external_files": self._external_file_resolver,
+        }
+
+    def evict_payloads(self) -> None:
+        """ Drop the compressed pixel and tile data of every cel from memory.
+        The position of the data in the file is kept, so it is read again whenever it is needed. The file must not
+        be modified or moved while it is in use.
+        """
+        for frame in self._parsed_frames.values():
+            for cel in frame.cels:
+                cel.evict_payload(self.file_path)
+
+    @property
+    def timeline(self) -> timeline.Timeline:
+        """ Playback timelines for the tags of the file, and an index of the tags on each frame. """
+        if self._timeline is None:
+            self._timeline = timeline.Timeline(self)
+        return self._timeline
+
+    @property
+    def palette_timeline(self) -> palette.PaletteTimeline:
+        """ The palette of each frame, with palette changes in later frames applied. """
+        if self._palette_timeline is None:
+            self._palette_timeline = palette.PaletteTimeline(self)
+        return self._palette_timeline
+
     def frame_tags(self, frame_number: int) -> list[Tag]:
         """ Get a list of tags on a frame number. """
-        tags = []
-        for tag in self.tags:
-            if tag.from_frame <= frame_number - 1 <= tag.to_frame:
-                if tag not in tags:
-                    tags.append(tag)
+        return self.timeline.tags_at(frame_number)
 
-        return tags
+    def frame_at(self, tag: Optional[Tag], time: int) -> int:
+        """ Get the frame number that a tag (or every frame, if no tag is given) shows at a time (in milliseconds from
+        the start of the animation). Tags that repeat forever loop; others stop on their last frame.
+        """
+        return self.timeline.frame_at(tag, time)
 
     def iter_frames(self) -> Iterator[tuple[int, Frame]]:
         """ Iterate over frames in the file.
         A tuple of (frame_number, Frame) is returned.
         """
-        start = 1
-        end = len(self.frames)
+        for frame in self.frames:
+            yield self.frame_number(frame), frame
 
-        for f in range(start, end + 1):
-            frame = self.frame(f)
-            frame_number = f - start + 1
-            yield frame_number, frame
+    def iter_rendered_frames(
+            self,
+            prefetch: int = 2,
+            executor: Optional[Executor] = None
+    ) -> Iterator[tuple[int, Image.Image]]:
+        """ Iterate over rendered frames in the file.
+        A tuple of (frame_number, Image) is returned.
+        Up to 'prefetch' frames are rendered ahead on a background thread while the current frame is being used.
+        """
+        images = render.iter_frame_images(self, self.frames, prefetch=prefetch, executor=executor)
+        for frame, image in zip(self.frames, images):
+            yield self.frame_number(frame), image
 
-    def render(self, frame: Frame, output_file: Path) -> None:
-        """ Render a frame as a PNG image. """
+    def render(
+            self,
+            frame: Frame,
+            output_file: Path,
+            cache: Optional[RenderCache] = None,
+            overwrite: bool = False,
+            trim: bool = False,
+            scale: int = 1,
+            correct_aspect: bool = False,
+            palettized: bool = False,
+            color_managed: bool = False
+    ) -> Optional[tuple[int, int, int, int]]:
+        """ Render a frame as a PNG image.
+        If a render cache is given, a previously rendered copy of the frame is used when there is one.
+        Existing files are only replaced if 'overwrite' is set.
+        If 'trim' is set, the image is cropped to the pixels that aren't transparent. The box (left, upper, right,
+        lower) it was cropped to is returned, and recorded in the PNG as a text chunk (see region_render.TRIM_KEY).
+        The box is in canvas pixels, before scaling.
+        scale: Scale the image by a whole number, with nearest-neighbor sampling.
+        correct_aspect: Also stretch the image by the file's pixel ratio, if it has non-square pixels.
+        palettized: Write indexed sprites as 8-bit palettized PNGs, when the frame can be composited without converting
+            to RGBA (see palette.frame_to_palettized_image); otherwise an RGBA PNG is written.
+        color_managed: Convert the image from the file's color profile to sRGB.
+        """
         # Make sure 'output_file' has a .png extension
         if not output_file.suffix == ".png":
             raise RuntimeError(f"Output file {output_file.as_posix()} must have a '.png' extension.")
 
         # Make sure output file doesn't already exist
-        if output_file.exists():
+        if output_file.exists() and not overwrite:
             raise FileExistsError(f"Can't overwrite existing file: {output_file.as_posix()}")
 
+        if cache:
+            options = {}
+            if trim:
+                options["trim"] = True
+            if palettized:
+                options["palettized"] = True
+            if color_managed:
+                options["color_profile"] = color_management.profile_fingerprint(self.color_profile)
+            factors = scaling.scale_factors(self, scale, correct_aspect)
+            if factors != (1, 1):
+                options["scale"] = list(factors)
+            key = cache.frame_key(self, frame, options or None)
+            cached_file = cache.get(key)
+            if cached_file:
+                shutil.copyfile(cached_file, output_file)
+                return region_render.read_trim_box(output_file) if trim else None
+
+        trim_box = None
+        image = palette.frame_to_palettized_image(self, frame) if palettized else None
+        if image is not None:
+            if trim:
+                trim_box = self.frame_bounds(frame) or (0, 0, 1, 1)
+                image = image.crop(trim_box)
+        elif trim:
+            image, trim_box = region_render.trimmed_frame_to_image(self, frame, self._cel_index(frame))
+        else:
+            image = render.frame_to_image(self, frame)
+
+        with profiling.scope(self, frame):
+            if color_managed:
+                image = color_management.apply_color_profile(self, image)
+            image = scaling.scale_image(self, image, scale, correct_aspect)
+            with profiling.stage(profiling.PNG_ENCODE):
+                if trim:
+                    region_render.save_trimmed_image(image, trim_box, output_file)
+                else:
+                    image.save(output_file)
+
+        if cache:
+            cache.put_file(key, output_file)
+
+        return trim_box
+
+    def render_scaled(
+            self,
+            frame: Frame,
+            scales: Iterable[int],
+            correct_aspect: bool = False,
+            color_managed: bool = False
+    ) -> dict[int, Image.Image]:
+        """ Render a frame once, and scale it by several whole numbers with nearest-neighbor sampling.
+        If 'color_managed' is set, the image is converted from the file's color profile to sRGB before it is scaled.
+        A dict of {scale: Image} is returned.
+        """
         image = render.frame_to_image(self, frame)
-        image.save(output_file)
+        if color_managed:
+            image = color_management.apply_color_profile(self, image)
+        return scaling.scale_images(self, image, scales, correct_aspect)
+
+    def frame_bounds(self, frame: Frame) -> Optional[tuple[int, int, int, int]]:
+        """ Get the bounding box (left, upper, right, lower) of the pixels of a frame that aren't transparent, or None
+        if the frame is fully transparent. Only the region covered by cels is rendered to find it.
+        """
+        return region_render.frame_bounds(self, frame, self._cel_index(frame))
+
+    def render_region(self, frame: Frame, box: tuple[int, int, int, int]) -> Image.Image:
+        """ Render a region (left, upper, right, lower) of a frame, e.g. the part of the canvas shown in a viewport.
+        Only the cels that intersect the region are decoded. The spatial index of the cels of each frame is built the
+        first time a region of it is rendered, and kept for later regions.
+        """
+        return region_render.render_region(self, frame, box, cel_index=self._cel_index(frame))
+
+    def _cel_index(self, frame: Frame) -> region_render.CelIndex:
+        """ Get the spatial index of the cels of a frame, building it the first time it is needed. """
+        if frame not in self._cel_indexes:
+            self._cel_indexes[frame] = region_render.CelIndex(self, frame)
+
+        return self._cel_indexes[frame]
+
+    def render_to_buffer(
+            self,
+            frame: Frame,
+            pixel_format: str = "RGBA",
+            row_alignment: int = 1,
+            out: Optional[Any] = None
+    ) -> bytes | memoryview:
+        """ Render a frame as raw pixel data (4 bytes per pixel, rows from top to bottom).
+        pixel_format: "RGBA", "BGRA", or "RGBa"/"BGRa" for premultiplied alpha.
+        row_alignment: Pad rows to a multiple of this many bytes.
+        out: An optional writable buffer to write the pixel data into.
+        """
+        return render.frame_to_buffer(self, frame, pixel_format=pixel_format, row_alignment=row_alignment, out=out)
+
+    def iter_slice_images(
+            self,
+            frame_numbers: Optional[Iterable[int]] = None,
+            slice_chunks: Optional[Iterable[SliceChunk]] = None
+    ) -> Iterator[slices.SliceImage]:
+        """ Crop every slice (all slices by default) from every frame (all frames by default), rendering each frame
+        once. A SliceImage with the pixels, bounds, 9-patch center and pivot of the slice is returned for each slice
+        on each frame.
+        """
+        return slices.iter_slice_images(self, frame_numbers=frame_numbers, slices=slice_chunks)
+
+    def export_slices(
+            self,
+            output_dir: Path,
+            frame_numbers: Optional[Iterable[int]] = None,
+            slice_chunks: Optional[Iterable[SliceChunk]] = None,
+            overwrite: bool = False
+    ) -> list[Path]:
+        """ Write every slice on every frame as a PNG image, with their metadata in 'slices.json'. """
+        return slices.export_slices(self, output_dir, frame_numbers=frame_numbers, slices=slice_chunks,
+                                    overwrite=overwrite)
+
+    def save(self, output_file: Path, overwrite: bool = False) -> None:
+        """ Write this file as an Aseprite file. """
+        if output_file.exists() and not overwrite:
+            raise FileExistsError(f"Can't overwrite existing file: {output_file.as_posix()}")
+
+        writer.write(self, output_file)
+
+    def export_animation(
+            self,
+            output_file: Path,
+            tag: Optional[Tag] = None,
+            loop: int = 0,
+            overwrite: bool = False,
+            scale: int = 1,
+            correct_aspect: bool = False
+    ) -> None:
+        """ Export the frames of a tag (or every frame) as an animated GIF, APNG or WebP file.
+        The format is chosen by the output file extension (.gif, .png, .apng or .webp).
+        Frames are scaled as in render().
+        """
+        if output_file.exists() and not overwrite:
+            raise FileExistsError(f"Can't overwrite existing file: {output_file.as_posix()}")
+
+        animation.export_animation(self, output_file, tag=tag, loop=loop, scale=scale, correct_aspect=correct_aspect)
+
+    def to_array(
+            self,
+            frames: Optional[Iterable[Frame]] = None,
+            layers: Optional[Iterable[LayerChunk]] = None
+    ) -> np.ndarray:
+        """ Render frames (all frames by default) into a (frames, height, width, 4) uint8 NumPy array.
+        Requires NumPy.
+        """
+        return arrays.frames_to_array(self, frames=frames, layers=layers)
+
+    def to_layer_array(
+            self,
+            frames: Optional[Iterable[Frame]] = None,
+            layers: Optional[Iterable[LayerChunk]] = None
+    ) -> np.ndarray:
+        """ Get the pixels of each layer on each frame as a (frames, layers, height, width, 4) uint8 NumPy array.
+        Requires NumPy.
+        """
+        return arrays.layers_to_array(self, frames=frames, layers=layers)
+
+    async def arender(self, frame: Frame, executor: Optional[Executor] = None) -> Image.Image:
+        """ Produce an image from a frame without blocking the event loop. """
+        return await aio.run_blocking(render.frame_to_image, self, frame, executor=executor)
+
+    async def arender_frames(
+            self,
+            frames: Optional[Iterable[Frame]] = None,
+            executor: Optional[Executor] = None
+    ) -> AsyncIterator[tuple[Frame, Image.Image]]:
+        """ Produce an image from each frame (all frames by default) without blocking the event loop.
+        A tuple of (Frame, Image) is returned.
+        Frames are rendered one at a time, so cancelling the iteration stops before the next frame is rendered.
+        """
+        if frames is None:
+            frames = self.frames
+
+        for frame in frames:
+            yield frame, await self.arender(frame, executor=executor)
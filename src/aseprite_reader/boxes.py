@@ -0,0 +1,36 @@
+from __future__ import annotations
+from typing import Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from aseprite_reader.chunks import CelChunk
+
+
+Box = tuple[int, int, int, int]
+
+
+def cel_box(cel: CelChunk) -> Box:
+    """ The bounding box of a cel on the canvas. """
+    return cel.x_position, cel.y_position, cel.x_position + cel.width, cel.y_position + cel.height
+
+
+def area(box: Box) -> int:
+    """ The area of a box. """
+    return (box[2] - box[0]) * (box[3] - box[1])
+
+
+def intersection(a: Box, b: Box) -> Optional[Box]:
+    """ The intersection of two boxes, or None if they don't overlap. """
+    box = (max(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), min(a[3], b[3]))
+    if box[0] >= box[2] or box[1] >= box[3]:
+        return None
+
+    return box
+
+
+def union(boxes: list[Box]) -> Optional[Box]:
+    """ The smallest box containing every box, or None if there are no boxes. """
+    if not boxes:
+        return None
+
+    return (min(b[0] for b in boxes), min(b[1] for b in boxes),
+            max(b[2] for b in boxes), max(b[3] for b in boxes))
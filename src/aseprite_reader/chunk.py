@@ -1,10 +1,14 @@
 from __future__ import annotations
 
 import os
-from typing import IO
+from typing import IO, Optional, TYPE_CHECKING
 
+from aseprite_reader import profiling
 from aseprite_reader import utils
 
+if TYPE_CHECKING:
+    from aseprite_reader.chunks import UserDataChunk
+
 
 class Chunk:
     """ Base chunk class. """
@@ -12,10 +16,34 @@ class Chunk:
         self._offset = 0
         self._size = 0
         self._chunk_type = 0
-        
+        self._user_data = None
+
         self._read_file(file)
         self._go_to_end_of_chunk(file)
 
+    @property
+    def offset(self) -> int:
+        """ Position of the chunk in the file. """
+        return self._offset
+
+    @property
+    def size(self) -> int:
+        """ Chunk size (including the chunk header). """
+        return self._size
+
+    @property
+    def chunk_type(self) -> int:
+        """ Chunk type. """
+        return self._chunk_type
+
+    @property
+    def user_data(self) -> Optional[UserDataChunk]:
+        """ The user data of this chunk (e.g. of a layer, cel, slice or tileset), if it has any.
+        User data is linked to the chunk it follows when the frame is read. The user data of the sprite is linked to
+        the palette chunk of the first frame.
+        """
+        return self._user_data
+
     def _read_file(self, file: IO) -> None:
         """ Read the file to populate chunk data.
         This needs to be implemented on each chunk type.
@@ -39,45 +67,48 @@ class Chunk:
         match chunk_type:
             case 0x0004:
                 from aseprite_reader.chunks import OldPaletteChunk04
-                return OldPaletteChunk04(file)
+                chunk_class = OldPaletteChunk04
             case 0x0011:
                 from aseprite_reader.chunks import OldPaletteChunk11
-                return OldPaletteChunk11(file)
+                chunk_class = OldPaletteChunk11
             case 0x2004:
                 from aseprite_reader.chunks import LayerChunk
-                return LayerChunk(file)
+                chunk_class = LayerChunk
             case 0x2005:
                 from aseprite_reader.chunks import CelChunk
-                return CelChunk(file)
+                chunk_class = CelChunk
             case 0x2006:
                 from aseprite_reader.chunks import CelExtraChunk
-                return CelExtraChunk(file)
+                chunk_class = CelExtraChunk
             case 0x2007:
                 from aseprite_reader.chunks import ColorProfileChunk
-                return ColorProfileChunk(file)
+                chunk_class = ColorProfileChunk
             case 0x2008:
                 from aseprite_reader.chunks import ExternalFilesChunk
-                return ExternalFilesChunk(file)
+                chunk_class = ExternalFilesChunk
             case 0x2016:
                 from aseprite_reader.chunks import MaskChunk
-                return MaskChunk(file)
+                chunk_class = MaskChunk
             case 0x2017:
                 from aseprite_reader.chunks import PathChunk
-                return PathChunk(file)
+                chunk_class = PathChunk
             case 0x2018:
                 from aseprite_reader.chunks import TagsChunk
-                return TagsChunk(file)
+                chunk_class = TagsChunk
             case 0x2019:
                 from aseprite_reader.chunks import PaletteChunk
-                return PaletteChunk(file)
+                chunk_class = PaletteChunk
             case 0x2020:
                 from aseprite_reader.chunks import UserDataChunk
-                return UserDataChunk(file)
+                chunk_class = UserDataChunk
             case 0x2022:
                 from aseprite_reader.chunks import SliceChunk
-                return SliceChunk(file)
+                chunk_class = SliceChunk
             case 0x2023:
                 from aseprite_reader.chunks import TilesetChunk
-                return TilesetChunk(file)
+                chunk_class = TilesetChunk
             case _:
                 raise Exception(f"Invalid chunk type: {hex(chunk_type)}")
+
+        with profiling.stage(f"{profiling.CHUNK}.{chunk_class.__name__}"):
+            return chunk_class(file)
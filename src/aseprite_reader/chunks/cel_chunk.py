@@ -1,9 +1,15 @@
+from __future__ import annotations
+import hashlib
 import os
-from typing import Any, IO, Optional
+from pathlib import Path
+from typing import Any, IO, Optional, TYPE_CHECKING
 
 from aseprite_reader.chunk import Chunk
 from aseprite_reader import utils
 
+if TYPE_CHECKING:
+    from aseprite_reader.chunks import CelExtraChunk
+
 
 class CelChunk(Chunk):
     """ This chunk determine where to put a cel in the specified layer/frame. """
@@ -13,6 +19,7 @@ class CelChunk(Chunk):
         self._y_position = 0
         self._opacity_level = 0
         self._cel_type = 0
+        self._z_index = 0
         self._width = None
         self._height = None
         self._raw_pixel_data = None
@@ -26,9 +33,19 @@ class CelChunk(Chunk):
         self._bitmask_y_flip = None
         self._bitmask_90cw_rotation = None
         self._compressed_tile_data = None
+        self._payload_offset = None
+        self._payload_size = 0
+        self._payload_file_path = None
+        self._payload_digest = None
+        self._cel_extra = None
 
         super().__init__(file)
 
+    @property
+    def cel_extra(self) -> Optional[CelExtraChunk]:
+        """ The extra information of this cel (e.g. its precise bounds), if it has any. """
+        return self._cel_extra
+
     @property
     def layer_index(self) -> int:
         """ Layer index.
@@ -69,6 +86,13 @@ class CelChunk(Chunk):
         """
         return self._cel_type
 
+    @property
+    def z_index(self) -> int:
+        """ Z-Index (0 = default layer ordering).
+        The cel is shown this many layers above (positive values) or below (negative values) its own layer.
+        """
+        return self._z_index
+
     @property
     def width(self) -> Optional[int]:
         """ Width in pixels. """
@@ -82,6 +106,8 @@ class CelChunk(Chunk):
     @property
     def raw_pixel_data(self) -> Optional[list[Any]]:
         """ Raw pixel data: row by row from top to bottom, for each scanline read pixels from left to right. """
+        if self.cel_type == 0 and self.payload_evicted:
+            return self._read_payload()
         return self._raw_pixel_data
 
     @property
@@ -92,6 +118,8 @@ class CelChunk(Chunk):
     @property
     def compressed_image_data(self) -> Optional[bytes]:
         """ 'Raw Cel' data compressed with ZLIB method. """
+        if self.cel_type == 2 and self.payload_evicted:
+            return self._read_payload()
         return self._compressed_image_data
 
     @property
@@ -132,8 +160,60 @@ class CelChunk(Chunk):
     @property
     def compressed_tile_data(self) -> Optional[bytes]:
         """ Row by row, from top to bottom tile by tile compressed with ZLIB method. """
+        if self.cel_type == 3 and self.payload_evicted:
+            return self._read_payload()
         return self._compressed_tile_data
 
+    @property
+    def payload_evicted(self) -> bool:
+        """ Whether the pixel or tile data was dropped from memory with evict_payload(). """
+        return self._payload_file_path is not None
+
+    @property
+    def payload_position(self) -> Optional[tuple[int, int]]:
+        """ The (offset, size) of the pixel or tile data in the file this cel was read from, or None for linked cels.
+        It identifies the data without reading it, even if it was evicted.
+        """
+        if self._payload_offset is None:
+            return None
+        return self._payload_offset, self._payload_size
+
+    @property
+    def payload_digest(self) -> Optional[bytes]:
+        """ A SHA-256 digest of the pixel or tile data, or None for linked cels.
+        It is computed once, so evicted data is only read again from the file the first time.
+        """
+        if self._payload_digest is None and self._payload_offset is not None:
+            match self.cel_type:
+                case 0:
+                    payload = self.raw_pixel_data
+                case 2:
+                    payload = self.compressed_image_data
+                case _:
+                    payload = self.compressed_tile_data
+            self._payload_digest = hashlib.sha256(payload).digest()
+
+        return self._payload_digest
+
+    def evict_payload(self, file_path: Path) -> None:
+        """ Drop the pixel or tile data from memory.
+        Its position in the file is kept, so it is read again from 'file_path' (the file this cel was read from)
+        whenever it is needed, without being kept in memory.
+        """
+        if self._payload_offset is None:
+            return
+
+        self._payload_file_path = file_path
+        self._raw_pixel_data = None
+        self._compressed_image_data = None
+        self._compressed_tile_data = None
+
+    def _read_payload(self) -> bytes:
+        """ Read the pixel or tile data from the file. """
+        with self._payload_file_path.open('rb') as f:
+            f.seek(self._payload_offset)
+            return f.read(self._payload_size)
+
     def _read_file(self, file: IO) -> None:
         super()._read_file(file)
         self._layer_index = utils.read_word(file)
@@ -141,7 +221,8 @@ class CelChunk(Chunk):
         self._y_position = utils.read_short(file)
         self._opacity_level = utils.read_byte(file)
         self._cel_type = utils.read_word(file)
-        file.seek(7, os.SEEK_CUR)  # For future (set to zero)
+        self._z_index = utils.read_short(file)
+        file.seek(5, os.SEEK_CUR)  # For future (set to zero)
 
         # For cel type 0 (Raw Image Data)
         if self.cel_type == 0:
@@ -150,6 +231,8 @@ class CelChunk(Chunk):
 
             # Read rest of the bytes in the chunk as raw pixel data
             bytes_to_read = self._offset + self._size - file.tell()
+            self._payload_offset = file.tell()
+            self._payload_size = bytes_to_read
             self._raw_pixel_data = file.read(bytes_to_read)
 
         # For cel type 1 (Linked Cel)
@@ -163,6 +246,8 @@ class CelChunk(Chunk):
 
             # Read rest of the bytes in the chunk as compressed image data
             bytes_to_read = self._offset + self._size - file.tell()
+            self._payload_offset = file.tell()
+            self._payload_size = bytes_to_read
             self._compressed_image_data = file.read(bytes_to_read)
 
         # For cel type 3 (Compressed Tilemap)
@@ -178,4 +263,6 @@ class CelChunk(Chunk):
 
             # Read rest of the bytes in the chunk as compressed tile data
             bytes_to_read = self._offset + self._size - file.tell()
+            self._payload_offset = file.tell()
+            self._payload_size = bytes_to_read
             self._compressed_tile_data = file.read(bytes_to_read)
@@ -19,6 +19,11 @@ class ExternalFilesChunk(Chunk):
         """ Number of entries. """
         return self._entry_count
 
+    @property
+    def external_files(self) -> list[ExternalFile]:
+        """ A list of external files. """
+        return self._external_files
+
     def _read_file(self, file: IO) -> None:
         super()._read_file(file)
         self._entry_count = utils.read_dword(file)
@@ -44,6 +44,16 @@ class LayerChunk(Chunk):
         """ Layer visibility. """
         return utils.flag_is_set(self.flags, 1)
 
+    @property
+    def background(self) -> bool:
+        """ Whether this is the background layer. """
+        return utils.flag_is_set(self.flags, 8)
+
+    @property
+    def reference(self) -> bool:
+        """ Whether this is a reference layer. """
+        return utils.flag_is_set(self.flags, 64)
+
     @property
     def layer_type(self) -> int:
         """ Layer type.
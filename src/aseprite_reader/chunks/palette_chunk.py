@@ -32,7 +32,8 @@ class PaletteChunk(Chunk):
 
     @property
     def palette_colors(self) -> list[PaletteColor]:
-        """ A list of colors in this palette. """
+        """ A list of colors in this palette, for the indexes from 'first_index_to_change' to 'last_index_to_change'.
+        """
         return self._palette_colors
 
     def _read_file(self, file: IO) -> None:
@@ -42,7 +43,7 @@ class PaletteChunk(Chunk):
         self._last_index_to_change = utils.read_dword(file)
         file.seek(8, os.SEEK_CUR)  # For future (set to zero)
 
-        # Add each palette color
-        for _ in range(self._palette_size):
+        # Add each palette color (only the entries in the range that changes are stored)
+        for _ in range(self._last_index_to_change - self._first_index_to_change + 1):
             palette_color = PaletteColor(file)
             self._palette_colors.append(palette_color)
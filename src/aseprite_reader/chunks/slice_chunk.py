@@ -1,4 +1,5 @@
-from typing import IO
+import bisect
+from typing import IO, Optional
 
 from aseprite_reader import utils
 from aseprite_reader.chunk import Chunk
@@ -11,9 +12,17 @@ class SliceChunk(Chunk):
         self._flags = 0
         self._name = ""
         self._slice_keys = []
+        self._key_frames = []
+        self._sorted_keys = []
 
         super().__init__(file)
 
+    def __str__(self) -> str:
+        return f"SliceChunk({self.name})"
+
+    def __repr__(self) -> str:
+        return str(self)
+
     @property
     def slice_key_count(self) -> int:
         """ Number of slice keys. """
@@ -36,6 +45,38 @@ class SliceChunk(Chunk):
     def slice_keys(self) -> list[SliceKey]:
         return self._slice_keys
 
+    @property
+    def nine_patch(self) -> bool:
+        """ Whether this is a 9-patches slice (its keys have center data). """
+        return utils.flag_is_set(self.flags, 1)
+
+    @property
+    def has_pivot(self) -> bool:
+        """ Whether the keys of this slice have pivot information. """
+        return utils.flag_is_set(self.flags, 2)
+
+    def key(self, frame_index: int) -> Optional[SliceKey]:
+        """ Get the key that applies to a frame (0 is the first frame, as in SliceKey.frame_number).
+        Each key is valid from its frame until the next key, so this is the key with the highest frame number that
+        isn't after the frame. None is returned if the slice has no key on or before the frame.
+        """
+        i = bisect.bisect_right(self._key_frames, frame_index)
+        if i == 0:
+            return None
+
+        return self._sorted_keys[i - 1]
+
+    def bounds(self, frame_index: int) -> Optional[tuple[int, int, int, int]]:
+        """ Get the bounds (left, upper, right, lower) of this slice on a frame (0 is the first frame).
+        None is returned if the slice isn't on the frame, or is hidden on it (its key has a size of 0).
+        """
+        slice_key = self.key(frame_index)
+        if slice_key is None or slice_key.slice_width == 0 or slice_key.slice_height == 0:
+            return None
+
+        return (slice_key.x_origin, slice_key.y_origin, slice_key.x_origin + slice_key.slice_width,
+                slice_key.y_origin + slice_key.slice_height)
+
     def _read_file(self, file: IO) -> None:
         super()._read_file(file)
         self._slice_key_count = utils.read_dword(file)
@@ -47,3 +88,7 @@ class SliceChunk(Chunk):
         for _ in range(self.slice_key_count):
             slice_key = SliceKey(file, self.flags)
             self._slice_keys.append(slice_key)
+
+        # Index the keys by frame, so the key for a frame can be found with a binary search
+        self._sorted_keys = sorted(self._slice_keys, key=lambda k: k.frame_number)
+        self._key_frames = [slice_key.frame_number for slice_key in self._sorted_keys]
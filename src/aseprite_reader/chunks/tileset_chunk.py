@@ -1,9 +1,13 @@
+from __future__ import annotations
 import os
-from typing import Any, IO, Optional
+from typing import Any, IO, Optional, TYPE_CHECKING
 
 from aseprite_reader.chunk import Chunk
 from aseprite_reader import utils
 
+if TYPE_CHECKING:
+    from aseprite_reader.chunks import UserDataChunk
+
 
 class TilesetChunk(Chunk):
     def __init__(self, file: IO) -> None:
@@ -18,6 +22,7 @@ class TilesetChunk(Chunk):
         self._tileset_id_in_external_file = None
         self._compressed_data_length = None
         self._compressed_tileset_image = None
+        self._tile_user_data = []
 
         super().__init__(file)
 
@@ -90,6 +95,13 @@ class TilesetChunk(Chunk):
         """
         return self._compressed_tileset_image
 
+    @property
+    def tile_user_data(self) -> list[UserDataChunk]:
+        """ The user data of each tile, in tile order, if the tiles have user data.
+        It follows the user data of the tileset itself, and is linked when the frame is read.
+        """
+        return self._tile_user_data
+
     def _read_file(self, file: IO) -> None:
         super()._read_file(file)
         self._tileset_id = utils.read_dword(file)
@@ -0,0 +1,130 @@
+from __future__ import annotations
+import functools
+import hashlib
+import io
+from typing import Callable, Optional, TYPE_CHECKING
+
+from PIL import Image, ImageCms
+
+from aseprite_reader import profiling
+from aseprite_reader import utils
+from aseprite_reader.chunks import ColorProfileChunk
+
+if TYPE_CHECKING:
+    from aseprite_reader import AsepriteFile
+
+
+ColorTransform = Callable[[Image.Image], Image.Image]
+
+
+def color_profile(aseprite_file: AsepriteFile) -> Optional[ColorProfileChunk]:
+    """ Get the color profile of a file, or None if it doesn't have one. """
+    for chunk in aseprite_file.frame(1).chunks:
+        if isinstance(chunk, ColorProfileChunk):
+            return chunk
+
+    return None
+
+
+def color_transform(
+        profile_chunk: Optional[ColorProfileChunk],
+        output_icc_profile: Optional[bytes] = None
+) -> Optional[ColorTransform]:
+    """ Get a function that converts RGBA images from a color profile to an output profile (sRGB by default).
+    None is returned if no conversion is needed: the file has no color profile, or it is sRGB and the output is sRGB.
+    Transforms are built once per distinct pair of profiles and kept, so they are shared by every file and frame.
+    """
+    if profile_chunk is None or profile_chunk.profile_type == 0:
+        return None
+
+    fixed_gamma = profile_chunk.fixed_gamma if utils.flag_is_set(profile_chunk.flags, 1) else None
+    icc_profile_data = profile_chunk.icc_profile_data if profile_chunk.profile_type == 2 else None
+    return _build_transform(profile_chunk.profile_type, fixed_gamma, icc_profile_data, output_icc_profile)
+
+
+def profile_fingerprint(profile_chunk: Optional[ColorProfileChunk]) -> str:
+    """ Hash the fields of a color profile that affect how colors are converted. """
+    h = hashlib.sha256()
+    if profile_chunk is not None:
+        h.update(f"{profile_chunk.profile_type},{profile_chunk.flags},{profile_chunk.fixed_gamma}".encode("utf-8"))
+        h.update(profile_chunk.icc_profile_data or b"")
+
+    return h.hexdigest()
+
+
+def apply_color_profile(
+        aseprite_file: AsepriteFile,
+        image: Image.Image,
+        output_icc_profile: Optional[bytes] = None
+) -> Image.Image:
+    """ Convert a rendered image (RGBA, or palettized) from the color profile of a file to an output profile (sRGB by
+    default). Palettized images keep their pixels, and only their palette is converted.
+    The image is returned as it is if no conversion is needed.
+    """
+    transform = color_transform(color_profile(aseprite_file), output_icc_profile)
+    if transform is None:
+        return image
+
+    with profiling.stage(profiling.COLOR_TRANSFORM):
+        if image.mode == "P":
+            palette = Image.frombytes("RGBA", (256, 1), bytes(image.getpalette("RGBA")).ljust(1024, b"\0"))
+            image = image.copy()
+            image.putpalette(transform(palette).tobytes(), rawmode="RGBA")
+            return image
+
+        return transform(image)
+
+
+@functools.lru_cache(maxsize=32)
+def _build_transform(
+        profile_type: int,
+        fixed_gamma: Optional[float],
+        icc_profile_data: Optional[bytes],
+        output_icc_profile: Optional[bytes]
+) -> Optional[ColorTransform]:
+    """ Build a color transform for a color profile. The arguments are hashable, so transforms can be cached. """
+    output_profile = ImageCms.ImageCmsProfile(io.BytesIO(output_icc_profile)) if output_icc_profile else None
+
+    match profile_type:
+        case 1:
+            if fixed_gamma is None:
+                # sRGB to sRGB needs no conversion
+                if output_profile is None:
+                    return None
+                input_profile = ImageCms.ImageCmsProfile(ImageCms.createProfile("sRGB"))
+            else:
+                # sRGB primaries with a fixed gamma: convert to sRGB with a lookup table, then to the output profile
+                gamma_transform = _gamma_transform(fixed_gamma)
+                if output_profile is None:
+                    return gamma_transform
+                cms_transform = _build_transform(1, None, None, output_icc_profile)
+                return lambda image: cms_transform(gamma_transform(image))
+        case 2:
+            input_profile = ImageCms.ImageCmsProfile(io.BytesIO(icc_profile_data))
+        case _:
+            raise RuntimeError(f"Invalid color profile type: {profile_type}")
+
+    if output_profile is None:
+        output_profile = ImageCms.ImageCmsProfile(ImageCms.createProfile("sRGB"))
+
+    transform = ImageCms.buildTransform(input_profile, output_profile, "RGBA", "RGBA")
+    return lambda image: ImageCms.applyTransform(image, transform)
+
+
+def _gamma_transform(gamma: float) -> ColorTransform:
+    """ Build a lookup table that converts colors encoded with a fixed gamma (1.0 is linear) to sRGB. """
+    if gamma <= 0:
+        raise RuntimeError(f"Invalid fixed gamma: {gamma}")
+
+    table = []
+    for i in range(256):
+        linear = (i / 255) ** gamma
+        if linear <= 0.0031308:
+            encoded = linear * 12.92
+        else:
+            encoded = 1.055 * linear ** (1 / 2.4) - 0.055
+        table.append(round(min(max(encoded, 0.0), 1.0) * 255))
+
+    # The alpha channel is left as it is
+    lut = table * 3 + list(range(256))
+    return lambda image: image.point(lut)
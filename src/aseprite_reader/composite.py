@@ -1,5 +1,16 @@
 from PIL import Image
 
+from aseprite_reader import profiling
+
+
+# Blend mode names, by blend mode number
+BLEND_MODES = ("normal", "multiply", "screen", "overlay", "darken", "lighten", "color_dodge", "color_burn",
+               "hard_light", "soft_light", "difference", "exclusion", "hue", "saturation", "color", "luminosity",
+               "addition", "subtract", "divide")
+
+# Profiling stage names of compositing, by blend mode number, so they aren't built on every call
+COMPOSITE_STAGES = tuple(f"{profiling.COMPOSITE}.{name}" for name in BLEND_MODES)
+
 
 def composite(bg: Image.Image, fg: Image.Image, blend_mode: int = 0, fg_opacity: int = 255) -> Image.Image:
     """ Composite a background image onto a foreground image. """
@@ -53,6 +64,66 @@ def composite(bg: Image.Image, fg: Image.Image, blend_mode: int = 0, fg_opacity:
     return image
 
 
+def composite_into(
+        bg: Image.Image,
+        fg: Image.Image,
+        position: tuple[int, int] = (0, 0),
+        blend_mode: int = 0,
+        fg_opacity: int = 255
+) -> None:
+    """ Composite a foreground image onto part of a background image, modifying the background in place.
+    The foreground can be smaller than the background, and is placed at 'position' (it may be partly outside of the
+    background). Only the area covered by the foreground is blended, so the cost depends on the size of the foreground.
+    The foreground image isn't modified.
+    """
+    with profiling.stage(composite_stage(blend_mode)):
+        _composite_into(bg, fg, position, blend_mode, fg_opacity)
+
+
+def blend_mode_name(blend_mode: int) -> str:
+    """ Get the name of a blend mode. """
+    return BLEND_MODES[blend_mode] if 0 <= blend_mode < len(BLEND_MODES) else str(blend_mode)
+
+
+def composite_stage(blend_mode: int) -> str:
+    """ Get the profiling stage name of compositing with a blend mode. """
+    if 0 <= blend_mode < len(COMPOSITE_STAGES):
+        return COMPOSITE_STAGES[blend_mode]
+    return f"{profiling.COMPOSITE}.{blend_mode}"
+
+
+def _composite_into(
+        bg: Image.Image,
+        fg: Image.Image,
+        position: tuple[int, int],
+        blend_mode: int,
+        fg_opacity: int
+) -> None:
+    # Clip the foreground to the background
+    x, y = position
+    left, upper = max(x, 0), max(y, 0)
+    right, lower = min(x + fg.width, bg.width), min(y + fg.height, bg.height)
+    if left >= right or upper >= lower:
+        return
+
+    source = (left - x, upper - y, right - x, lower - y)
+    if source != (0, 0) + fg.size:
+        fg = fg.crop(source)
+    elif fg_opacity < 255:
+        fg = fg.copy()
+
+    # Apply fg opacity
+    if fg_opacity < 255:
+        _apply_opacity(fg, fg_opacity)
+
+    # The normal blend mode can be done in place; other modes blend the covered area and paste it back
+    if blend_mode == 0:
+        bg.alpha_composite(fg, (left, upper))
+    else:
+        box = (left, upper, right, lower)
+        bg.paste(composite(bg.crop(box), fg, blend_mode), box)
+
+
 def _apply_opacity(image: Image.Image, opacity: int) -> None:
     """ Apply an opacity value (0-255) to an image. """
     # Don't need to change the image if there is full opacity
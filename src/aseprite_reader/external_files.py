@@ -0,0 +1,206 @@
+from __future__ import annotations
+import threading
+import zlib
+from pathlib import Path
+from typing import Optional, TYPE_CHECKING
+
+from PIL import Image
+
+from aseprite_reader import profiling
+from aseprite_reader import utils
+from aseprite_reader.chunks import ExternalFilesChunk, TilesetChunk
+from aseprite_reader.palette import Color
+
+if TYPE_CHECKING:
+    from aseprite_reader import AsepriteFile
+    from aseprite_reader.models import ExternalFile
+
+
+# External file entry types that refer to files (the others are extension names)
+PALETTE_ENTRY = 0
+TILESET_ENTRY = 1
+
+
+class ExternalFilePool:
+    """ A cache of parsed external files (tilesets and palettes stored in other Aseprite files), shared by every file
+    that references them.
+    Files are keyed by their resolved path and modification time, so each one is parsed once no matter how many files
+    reference it, and parsed again if it changes. Decoded tileset images are kept with the file they come from.
+    """
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._path_locks = {}
+        self._files = {}
+        self._tileset_images = {}
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def open(self, file_path: str | Path) -> AsepriteFile:
+        """ Get a parsed external file, reading it if it isn't in the pool (or has changed since it was read). """
+        from aseprite_reader.aseprite_file import AsepriteFile
+
+        file_path = Path(file_path).resolve()
+        if not file_path.is_file():
+            raise FileNotFoundError(f"External file not found: {file_path.as_posix()}")
+        mtime = file_path.stat().st_mtime_ns
+
+        entry = self._files.get(file_path)
+        if entry is not None and entry[0] == mtime:
+            return entry[1]
+
+        # Files are read outside of the pool lock, so different files can be read at the same time. A lock is only
+        # kept for a path while it is being read, and is shared by every thread waiting for it.
+        with self._lock:
+            path_lock, waiting = self._path_locks.get(file_path, (threading.Lock(), 0))
+            self._path_locks[file_path] = (path_lock, waiting + 1)
+
+        try:
+            with path_lock:
+                entry = self._files.get(file_path)
+                if entry is None or entry[0] != mtime:
+                    entry = (mtime, AsepriteFile(file_path))
+                    with self._lock:
+                        self._files[file_path] = entry
+                        for key in [key for key in self._tileset_images if key[0] == file_path]:
+                            del self._tileset_images[key]
+
+                return entry[1]
+        finally:
+            with self._lock:
+                # The lock may have been dropped by clear() while the file was being read
+                path_lock, waiting = self._path_locks.get(file_path, (path_lock, 0))
+                if waiting <= 1:
+                    self._path_locks.pop(file_path, None)
+                else:
+                    self._path_locks[file_path] = (path_lock, waiting - 1)
+
+    def tileset(self, file_path: str | Path, tileset_id: int) -> TilesetChunk:
+        """ Get a tileset of an external file by its ID. """
+        for chunk in self.open(file_path).frame(1).chunks:
+            if isinstance(chunk, TilesetChunk) and chunk.tileset_id == tileset_id:
+                return chunk
+
+        raise RuntimeError(f"Tileset {tileset_id} not found in {Path(file_path).as_posix()}")
+
+    def tileset_image(self, file_path: str | Path, tileset_id: int) -> Image.Image:
+        """ Get the tiles of a tileset of an external file as an RGBA image (one tile wide, with the tiles stacked
+        from top to bottom). The image is decoded once, and shared.
+        """
+        external_file = self.open(file_path)
+        key = (external_file.file_path, tileset_id)
+        image = self._tileset_images.get(key)
+        if image is None:
+            image = decode_tileset(external_file, self.tileset(file_path, tileset_id))
+            with self._lock:
+                image = self._tileset_images.setdefault(key, image)
+
+        return image
+
+    def palette(self, file_path: str | Path) -> list[Color]:
+        """ Get the RGBA colors of the palette of an external file. """
+        return self.open(file_path).palette_timeline.colors(1)
+
+    def clear(self) -> None:
+        """ Remove every file from the pool. """
+        with self._lock:
+            self._files.clear()
+            self._tileset_images.clear()
+            self._path_locks.clear()
+
+
+_pool = ExternalFilePool()
+
+
+def shared_pool() -> ExternalFilePool:
+    """ Get the pool that external files are loaded through by default. """
+    return _pool
+
+
+def decode_tileset(aseprite_file: AsepriteFile, tileset: TilesetChunk) -> Image.Image:
+    """ Decompress the tiles stored in a tileset chunk into an RGBA image (one tile wide, with the tiles stacked from
+    top to bottom).
+    """
+    if tileset.compressed_tileset_image is None:
+        raise RuntimeError(f"Tileset {tileset.tileset_id} of {aseprite_file} doesn't include its tiles.")
+
+    with profiling.stage(profiling.INFLATE) as stage:
+        image_data = zlib.decompress(tileset.compressed_tileset_image)
+        stage.size = len(image_data)
+
+    with profiling.stage(profiling.PIXEL_CONVERSION):
+        height = tileset.tile_height * tileset.tile_count
+        return utils.image_data_to_image(aseprite_file, tileset.tile_width, height, image_data)
+
+
+class ExternalFileResolver:
+    """ Resolves the external files referenced by a file (in its External Files chunk) relative to the file's
+    directory, and loads them through a pool (the shared pool by default).
+    """
+    def __init__(self, aseprite_file: AsepriteFile, pool: Optional[ExternalFilePool] = None) -> None:
+        self._aseprite_file = aseprite_file
+        self._pool = pool if pool is not None else shared_pool()
+        self._external_files = {}
+        self._tileset_images = {}
+
+        for chunk in aseprite_file.frame(1).chunks:
+            if isinstance(chunk, ExternalFilesChunk):
+                for external_file in chunk.external_files:
+                    self._external_files[external_file.entry_id] = external_file
+
+    @property
+    def aseprite_file(self) -> AsepriteFile:
+        """ The Aseprite file. """
+        return self._aseprite_file
+
+    @property
+    def pool(self) -> ExternalFilePool:
+        """ The pool that external files are loaded through. """
+        return self._pool
+
+    @property
+    def external_files(self) -> list[ExternalFile]:
+        """ A list of external files referenced by the file. """
+        return list(self._external_files.values())
+
+    def path(self, entry_id: int, entry_type: Optional[int] = None) -> Path:
+        """ Get the path of an external file by its entry ID.
+        If an entry type is given (PALETTE_ENTRY or TILESET_ENTRY), the entry must be of that type. Entries of other
+        types (extension names) aren't files.
+        """
+        external_file = self._external_files.get(entry_id)
+        if external_file is None:
+            raise RuntimeError(f"External file {entry_id} not found in {self.aseprite_file}")
+        if entry_type is not None and external_file.entry_type != entry_type:
+            raise RuntimeError(f"External file {entry_id} of {self.aseprite_file} has entry type "
+                               f"{external_file.entry_type} (expected {entry_type}).")
+        if external_file.entry_type not in (PALETTE_ENTRY, TILESET_ENTRY):
+            raise RuntimeError(f"External file {entry_id} of {self.aseprite_file} is an extension name, not a file.")
+
+        return self.aseprite_file.file_path.parent / external_file.file_name
+
+    def tileset(self, tileset: TilesetChunk) -> TilesetChunk:
+        """ Get the tileset that a tileset chunk links to in an external file, or the chunk itself if it isn't linked to
+        an external file.
+        """
+        if tileset.external_file_id is None:
+            return tileset
+
+        path = self.path(tileset.external_file_id, TILESET_ENTRY)
+        return self.pool.tileset(path, tileset.tileset_id_in_external_file)
+
+    def tileset_image(self, tileset: TilesetChunk) -> Image.Image:
+        """ Get the tiles of a tileset as an RGBA image (one tile wide, with the tiles stacked from top to bottom).
+        Tilesets linked to an external file are loaded from it through the pool; others are decoded from the file.
+        """
+        if tileset.external_file_id is not None:
+            path = self.path(tileset.external_file_id, TILESET_ENTRY)
+            return self.pool.tileset_image(path, tileset.tileset_id_in_external_file)
+
+        if tileset.tileset_id not in self._tileset_images:
+            self._tileset_images[tileset.tileset_id] = decode_tileset(self.aseprite_file, tileset)
+        return self._tileset_images[tileset.tileset_id]
+
+    def palette(self, entry_id: int) -> list[Color]:
+        """ Get the RGBA colors of an external palette by its entry ID. """
+        return self.pool.palette(self.path(entry_id, PALETTE_ENTRY))
@@ -3,7 +3,11 @@ from typing import IO
 
 from aseprite_reader import utils
 from aseprite_reader.chunk import Chunk
-from aseprite_reader.chunks import CelChunk
+from aseprite_reader.chunks import CelChunk, CelExtraChunk, TagsChunk, TilesetChunk, UserDataChunk
+
+
+# Chunk types of the palette chunks (old and new)
+PALETTE_CHUNK_TYPES = (0x0004, 0x0011, 0x2019)
 
 
 class Frame:
@@ -63,7 +67,62 @@ class Frame:
         file.seek(2, os.SEEK_CUR)  # For future (set to zero)
         self._chunk_count_new = utils.read_dword(file)
 
-        # Add each chunk
+        # Add each chunk, and link user data and cel extra chunks to the chunk they belong to
+        owner = None
+        cel = None
+        tileset = None
+        pending_tags = []
         for _ in range(self.chunk_count):
             c = Chunk.create_chunk(file)
             self._chunks.append(c)
+
+            if isinstance(c, UserDataChunk):
+                if pending_tags:
+                    # After a tags chunk, each user data chunk belongs to the next tag
+                    pending_tags.pop(0)._user_data = c
+                elif owner is not None:
+                    owner._user_data = c
+                    # After the user data of a tileset, each user data chunk belongs to the next tile
+                    tileset = owner if isinstance(owner, TilesetChunk) else None
+                    owner = None
+                elif tileset is not None:
+                    tileset._tile_user_data.append(c)
+            elif isinstance(c, CelExtraChunk):
+                if cel is not None:
+                    cel._cel_extra = c
+            elif isinstance(c, TagsChunk):
+                owner = None
+                cel = None
+                tileset = None
+                pending_tags = list(c.tags)
+            else:
+                owner = c
+                cel = c if isinstance(c, CelChunk) else None
+                tileset = None
+                pending_tags = []
+
+
+def read_chunks(file: IO, chunk_types: tuple[int, ...]) -> list[Chunk]:
+    """ Read only the chunks of some types from the frame at the current file position, without reading the frame.
+    Only the chunk headers are read; other chunks are skipped over by their chunk size. The file position is moved to
+    the end of the frame.
+    """
+    offset = file.tell()
+    size = utils.read_dword(file)
+    file.seek(2, os.SEEK_CUR)  # Magic number
+    chunk_count_old = utils.read_word(file)
+    file.seek(4, os.SEEK_CUR)  # Duration, and for future (set to zero)
+    chunk_count_new = utils.read_dword(file)
+
+    chunks = []
+    for _ in range(chunk_count_new or chunk_count_old):
+        chunk_offset = file.tell()
+        chunk_size = utils.read_dword(file)
+        chunk_type = utils.read_word(file)
+        file.seek(chunk_offset)
+        if chunk_type in chunk_types:
+            chunks.append(Chunk.create_chunk(file))
+        file.seek(chunk_offset + chunk_size)
+
+    file.seek(offset + size)
+    return chunks
@@ -0,0 +1,254 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Iterator, Optional, TYPE_CHECKING
+
+from aseprite_reader import utils
+from aseprite_reader.aseprite_file import AsepriteFile
+from aseprite_reader.render_cache import frame_fingerprint
+
+if TYPE_CHECKING:
+    from aseprite_reader.frame import Frame
+    from aseprite_reader.models import Tag
+    from aseprite_reader.render_cache import RenderCache
+
+
+# Change this whenever the manifest format or the output layout changes
+MANIFEST_VERSION = 2
+MANIFEST_FILE_NAME = ".aseprite-manifest.json"
+ASEPRITE_EXTENSIONS = (".aseprite", ".ase")
+
+
+class BuildReport:
+    """ The result of an incremental build. """
+    def __init__(self) -> None:
+        self._exported = []
+        self._unchanged = []
+        self._deleted = []
+
+    def __str__(self) -> str:
+        return (f"BuildReport(exported={len(self.exported)}, unchanged={len(self.unchanged)}, "
+                f"deleted={len(self.deleted)})")
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    @property
+    def exported(self) -> list[Path]:
+        """ Output files that were rendered. """
+        return self._exported
+
+    @property
+    def unchanged(self) -> list[Path]:
+        """ Output files that were already up-to-date. """
+        return self._unchanged
+
+    @property
+    def deleted(self) -> list[Path]:
+        """ Output files that were removed because their frame, tag or source file no longer exists. """
+        return self._deleted
+
+
+def build(
+        source_dir: str | Path,
+        output_dir: str | Path,
+        manifest_file: Optional[str | Path] = None,
+        by_tag: bool = False,
+        cache: Optional[RenderCache] = None
+) -> BuildReport:
+    """ Export every Aseprite file in a source directory as PNG images, rendering only what changed since the last
+    build.
+    Each frame is written to '<output_dir>/<relative path without extension>/<frame number>.png', or, if 'by_tag' is
+    set, to '<output_dir>/<relative path without extension>/<tag name>/<frame number in tag>.png'. Tag names are made
+    safe to use as directory names (see utils.file_name), and tags that would share a directory with an earlier tag
+    (e.g. two tags with the same name) get a number added to their name ('<tag name>_2').
+    A manifest records the size, modification time and content hash of each source file, and a fingerprint of each
+    output. Source files whose size and modification time (or content hash) match the manifest are skipped without
+    being read. Otherwise, only outputs whose fingerprint changed are rendered again. Outputs that were produced by
+    the last build but not by this one are deleted, even if the last build used another manifest version or options.
+    """
+    if isinstance(source_dir, str):
+        source_dir = Path(source_dir)
+    if isinstance(output_dir, str):
+        output_dir = Path(output_dir)
+    if manifest_file is None:
+        manifest_file = output_dir / MANIFEST_FILE_NAME
+    elif isinstance(manifest_file, str):
+        manifest_file = Path(manifest_file)
+
+    report = BuildReport()
+    old_entries, stale_outputs = _read_manifest(manifest_file, by_tag)
+    new_entries = {}
+
+    for source_file in _iter_source_files(source_dir):
+        relative_path = source_file.relative_to(source_dir).as_posix()
+        old_entry = old_entries.get(relative_path)
+        new_entries[relative_path] = _build_file(source_file, relative_path, output_dir, old_entry, by_tag, cache,
+                                                 report)
+
+    # Remove outputs that are no longer produced
+    old_outputs = {output for entry in old_entries.values() for output in entry["outputs"]} | stale_outputs
+    new_outputs = {output for entry in new_entries.values() for output in entry["outputs"]}
+    for output in sorted(old_outputs - new_outputs):
+        output_file = output_dir / output
+        if output_file.exists():
+            output_file.unlink()
+            report.deleted.append(output_file)
+            _remove_empty_dirs(output_file.parent, output_dir)
+
+    _write_manifest(manifest_file, new_entries, by_tag)
+    return report
+
+
+def _build_file(
+        source_file: Path,
+        relative_path: str,
+        output_dir: Path,
+        old_entry: Optional[dict],
+        by_tag: bool,
+        cache: Optional[RenderCache],
+        report: BuildReport
+) -> dict:
+    """ Export the outputs of one source file that changed, and return its new manifest entry. """
+    stat = source_file.stat()
+
+    # Skip files that haven't been touched since the last build
+    if old_entry and _outputs_exist(output_dir, old_entry):
+        if old_entry["size"] == stat.st_size and old_entry["mtime_ns"] == stat.st_mtime_ns:
+            report.unchanged.extend(output_dir / output for output in old_entry["outputs"])
+            return old_entry
+
+    # Skip files that were touched, but not changed
+    content_hash = _hash_file(source_file)
+    if old_entry and _outputs_exist(output_dir, old_entry):
+        if old_entry["sha256"] == content_hash:
+            report.unchanged.extend(output_dir / output for output in old_entry["outputs"])
+            return dict(old_entry, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+
+    # Render the outputs whose frames changed
+    old_outputs = old_entry["outputs"] if old_entry else {}
+    outputs = {}
+    aseprite_file = AsepriteFile(source_file)
+    for output, frame in _iter_outputs(aseprite_file, relative_path, by_tag):
+        fingerprint = frame_fingerprint(aseprite_file, frame)
+        outputs[output] = fingerprint
+
+        output_file = output_dir / output
+        if old_outputs.get(output) == fingerprint and output_file.exists():
+            report.unchanged.append(output_file)
+            continue
+
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        aseprite_file.render(frame, output_file, cache=cache, overwrite=True)
+        report.exported.append(output_file)
+
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": content_hash,
+        "outputs": outputs,
+    }
+
+
+def _iter_source_files(source_dir: Path) -> Iterator[Path]:
+    """ Iterate over the Aseprite files in a directory and its subdirectories. """
+    for path in sorted(source_dir.rglob("*")):
+        if path.suffix.lower() in ASEPRITE_EXTENSIONS and path.is_file():
+            yield path
+
+
+def _iter_outputs(aseprite_file: AsepriteFile, relative_path: str, by_tag: bool) -> Iterator[tuple[str, Frame]]:
+    """ Iterate over the outputs of a source file.
+    A tuple of (output_path, Frame) is returned, where the output path is relative to the output directory.
+    """
+    stem = relative_path.rsplit(".", 1)[0]
+    if by_tag:
+        tags = aseprite_file.tags
+        for tag, tag_dir_name in zip(tags, _tag_dir_names(tags)):
+            for frame_number, frame_index in enumerate(range(tag.from_frame, tag.to_frame + 1), start=1):
+                yield f"{stem}/{tag_dir_name}/{frame_number}.png", aseprite_file.frame(frame_index + 1)
+    else:
+        for frame_number, frame in aseprite_file.iter_frames():
+            yield f"{stem}/{frame_number}.png", frame
+
+
+def _tag_dir_names(tags: list[Tag]) -> list[str]:
+    """ Get the name of the output directory of each tag.
+    Tag names are made safe to use as directory names, and a number is added to the name of a tag whose directory
+    would be the same as an earlier tag's (compared without case, for case-insensitive file systems).
+    """
+    dir_names = []
+    used = set()
+    for tag in tags:
+        base_name = utils.file_name(tag.name)
+        dir_name = base_name
+        suffix = 2
+        while dir_name.casefold() in used:
+            dir_name = f"{base_name}_{suffix}"
+            suffix += 1
+
+        used.add(dir_name.casefold())
+        dir_names.append(dir_name)
+
+    return dir_names
+
+
+def _outputs_exist(output_dir: Path, entry: dict) -> bool:
+    """ Check that every output in a manifest entry exists. """
+    return all((output_dir / output).exists() for output in entry["outputs"])
+
+
+def _hash_file(path: Path) -> str:
+    """ Hash the contents of a file. """
+    h = hashlib.sha256()
+    with path.open('rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(block)
+
+    return h.hexdigest()
+
+
+def _remove_empty_dirs(directory: Path, root: Path) -> None:
+    """ Remove a directory and its parents (up to, but not including, the root) if they are empty. """
+    while directory != root and directory.is_relative_to(root):
+        try:
+            directory.rmdir()
+        except OSError:
+            return
+        directory = directory.parent
+
+
+def _read_manifest(manifest_file: Path, by_tag: bool) -> tuple[dict[str, dict], set[str]]:
+    """ Read the file entries from a manifest.
+    A tuple of (entries, stale_outputs) is returned. The entries of manifests from a different version, or that were
+    built with different options, can't be reused; their outputs are returned as stale outputs instead, so they can
+    still be deleted.
+    """
+    if not manifest_file.exists():
+        return {}, set()
+
+    with manifest_file.open('r', encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    if manifest.get("version") != MANIFEST_VERSION or manifest.get("by_tag") != by_tag:
+        entries = manifest.get("files", {}).values()
+        return {}, {output for entry in entries for output in entry.get("outputs", ())}
+
+    return manifest["files"], set()
+
+
+def _write_manifest(manifest_file: Path, entries: dict[str, dict], by_tag: bool) -> None:
+    """ Write a manifest, replacing the previous one only once it has been completely written. """
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "by_tag": by_tag,
+        "files": entries,
+    }
+
+    manifest_file.parent.mkdir(parents=True, exist_ok=True)
+    temp_file = manifest_file.with_name(manifest_file.name + ".tmp")
+    with temp_file.open('w', encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(temp_file, manifest_file)
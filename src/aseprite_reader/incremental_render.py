@@ -0,0 +1,174 @@
+from __future__ import annotations
+from typing import Iterable, Iterator, Optional, TYPE_CHECKING
+
+from PIL import Image
+
+from aseprite_reader import profiling
+from aseprite_reader import render
+from aseprite_reader.boxes import Box, area, cel_box, intersection, union
+from aseprite_reader.composite import composite_into
+
+if TYPE_CHECKING:
+    from aseprite_reader import AsepriteFile
+    from aseprite_reader.chunks import CelChunk, LayerChunk
+    from aseprite_reader.frame import Frame
+
+
+class _LayerState:
+    """ The cel that was last rendered on a layer, and the box it covers on the canvas. """
+    def __init__(self, key: object, box: Optional[Box], image: Optional[Image.Image]) -> None:
+        self.key = key
+        self.box = box
+        self.image = image
+
+
+class IncrementalRenderer:
+    """ Render a sequence of frames, recompositing only the parts of the canvas that changed.
+    The previous composite and the image of every layer's cel are kept between frames. When a frame is rendered,
+    each layer's cel is compared with the cel used for the previous frame (linked cels compare equal to the cel they
+    link to), and only the union of the bounding boxes of the cels that changed is recomposited.
+    Blend modes are applied per pixel, so recompositing a region from all layers gives the same result as a full
+    render. If the changed region covers more than 'full_render_threshold' of the canvas, the whole frame is
+    recomposited instead.
+    """
+    def __init__(self, aseprite_file: AsepriteFile, full_render_threshold: float = 0.5) -> None:
+        self._aseprite_file = aseprite_file
+        self._full_render_threshold = full_render_threshold
+        self._image = None
+        self._layer_states = {}
+        self._dirty_box = None
+
+    @property
+    def aseprite_file(self) -> AsepriteFile:
+        """ The Aseprite file being rendered. """
+        return self._aseprite_file
+
+    @property
+    def dirty_box(self) -> Optional[Box]:
+        """ The region (left, upper, right, lower) that was recomposited for the last frame.
+        None if nothing changed since the frame before it.
+        """
+        return self._dirty_box
+
+    def reset(self) -> None:
+        """ Forget the previous composite, so the next frame is fully rendered. """
+        self._image = None
+        self._layer_states = {}
+        self._dirty_box = None
+
+    def render(self, frame: Frame, target: Optional[Image.Image] = None) -> Image.Image:
+        """ Produce an image from frame data, reusing the previous composite where possible.
+        If a target image is given, the frame is copied into it and it is returned; otherwise a new image is returned.
+        """
+        with profiling.scope(self.aseprite_file, frame), profiling.stage(profiling.RENDER_FRAME):
+            return self._render(frame, target)
+
+    def _render(self, frame: Frame, target: Optional[Image.Image]) -> Image.Image:
+        header = self.aseprite_file.header
+        canvas_box = (0, 0, header.width, header.height)
+
+        # Update the state of each layer, collecting the regions that changed
+        dirty_boxes = []
+        for layer in render.rendered_layers(self.aseprite_file):
+            previous_state = self._layer_states.get(layer)
+            state = self._layer_state(frame, layer, previous_state)
+            if previous_state is None or previous_state.key != state.key:
+                if previous_state is not None and previous_state.box:
+                    dirty_boxes.append(previous_state.box)
+                if state.box:
+                    dirty_boxes.append(state.box)
+            self._layer_states[layer] = state
+
+        if self._image is None:
+            self._image = Image.new(mode="RGBA", size=(header.width, header.height))
+            self._dirty_box = canvas_box
+        else:
+            dirty_box = union(dirty_boxes)
+            self._dirty_box = intersection(dirty_box, canvas_box) if dirty_box else None
+
+        # Recomposite the dirty region
+        if self._dirty_box is not None:
+            if area(self._dirty_box) >= self._full_render_threshold * area(canvas_box):
+                self._dirty_box = canvas_box
+            self._composite_region(self._dirty_box)
+
+        if target is None:
+            return self._image.copy()
+
+        if target.mode != "RGBA" or target.size != self._image.size:
+            raise RuntimeError(f"Target image must be an RGBA image of size {self._image.size} "
+                               f"(got {target.mode} {target.size}).")
+        target.paste(self._image, canvas_box)
+        return target
+
+    def iter_images(self, frames: Iterable[Frame]) -> Iterator[Image.Image]:
+        """ Render each frame in a sequence. """
+        for frame in frames:
+            yield self.render(frame)
+
+    def _layer_state(self, frame: Frame, layer: LayerChunk, previous_state: Optional[_LayerState]) -> _LayerState:
+        """ Get the state of a layer on a frame, only decoding the cel if it differs from the previous state. """
+        if layer.layer_type != 0:
+            # Group and tilemap layers can't be compared by cel, so they are always treated as changed
+            layer_image = render.layer_to_image(self.aseprite_file, frame, layer)
+            if not layer_image:
+                return _LayerState(object(), None, None)
+            return self._crop(object(), layer_image, layer_image.getbbox())
+
+        cel = self.aseprite_file.cel(frame, layer)
+        if not cel:
+            return _LayerState(None, None, None)
+
+        source_cel = self.aseprite_file.resolve_cel(cel)
+        palette_frame_number = render.palette_frame_number(self.aseprite_file, frame)
+        key = _cel_key(source_cel)
+        if self.aseprite_file.header.color_depth == 8:
+            # Indexed cels look different on frames with a different palette
+            key += (self.aseprite_file.palette_timeline.version(palette_frame_number),)
+        if previous_state is not None and previous_state.key == key:
+            return previous_state
+
+        # Keep compressed image cels at the size of the cel
+        if source_cel.cel_type == 2:
+            cel_pixels = render.decode_cel(self.aseprite_file, source_cel, palette_frame_number)
+            return _LayerState(key, cel_box(source_cel), cel_pixels)
+
+        layer_image = render.cel_to_image(self.aseprite_file, frame, layer, cel)
+        return self._crop(key, layer_image, cel_box(source_cel))
+
+    def _crop(self, key: object, layer_image: Image.Image, box: Optional[Box]) -> _LayerState:
+        """ Crop a full-canvas layer image to a box within the canvas. """
+        header = self.aseprite_file.header
+        if box:
+            box = intersection(box, (0, 0, header.width, header.height))
+        if not box:
+            return _LayerState(key, None, None)
+
+        return _LayerState(key, box, layer_image.crop(box))
+
+    def _composite_region(self, box: Box) -> None:
+        """ Composite every layer within a region of the canvas, replacing that region of the previous composite. """
+        self._image.paste((0, 0, 0, 0), box)
+
+        for layer in render.rendered_layers(self.aseprite_file):
+            state = self._layer_states[layer]
+            if not state.box:
+                continue
+
+            overlap = intersection(state.box, box)
+            if not overlap:
+                continue
+
+            # Only composite the part of the layer that overlaps the region
+            source = (overlap[0] - state.box[0], overlap[1] - state.box[1],
+                      overlap[2] - state.box[0], overlap[3] - state.box[1])
+            layer_image = state.image if source == (0, 0) + state.image.size else state.image.crop(source)
+            composite_into(self._image, layer_image, overlap[:2], layer.blend_mode,
+                           render.layer_opacity(self.aseprite_file, layer))
+
+
+def _cel_key(cel: CelChunk) -> tuple:
+    """ A key that compares equal for cels that render the same image.
+    Cels are compared by the position of their data in the file, so evicted data isn't read again.
+    """
+    return cel.cel_type, cel.x_position, cel.y_position, cel.width, cel.height, cel.payload_position
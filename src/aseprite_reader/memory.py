@@ -0,0 +1,185 @@
+from __future__ import annotations
+import sys
+from typing import TYPE_CHECKING
+
+from PIL import Image
+
+from aseprite_reader import external_files
+from aseprite_reader.chunk import Chunk
+from aseprite_reader.chunks import CelChunk, CelExtraChunk, LayerChunk, UserDataChunk
+
+if TYPE_CHECKING:
+    from aseprite_reader import AsepriteFile
+    from aseprite_reader.frame import Frame
+
+
+class MemoryReport:
+    """ An estimate of the memory held by a parsed Aseprite file.
+    Sizes are in bytes. Payloads are the bytes objects holding compressed (or raw) pixel, tile and other binary data;
+    objects are everything else (chunks, frames, and the values and containers they hold); caches are the objects
+    built on the file after it was read (cel indexes, timelines, and decoded tilesets).
+    """
+    def __init__(self) -> None:
+        self._payloads = 0
+        self._objects = 0
+        self._caches = {}
+        self._chunk_types = {}
+        self._frames = {}
+        self._layers = {}
+
+    def __str__(self) -> str:
+        return (f"MemoryReport(total={self.total}, payloads={self.payloads}, objects={self.objects}, "
+                f"caches={sum(self.caches.values())})")
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    @property
+    def total(self) -> int:
+        """ Total bytes held. """
+        return self._payloads + self._objects + sum(self._caches.values())
+
+    @property
+    def payloads(self) -> int:
+        """ Bytes held by payloads. """
+        return self._payloads
+
+    @property
+    def objects(self) -> int:
+        """ Bytes held by model objects. """
+        return self._objects
+
+    @property
+    def caches(self) -> dict[str, int]:
+        """ Bytes held by each cache built on the file, by name. Caches that haven't been built aren't listed. """
+        return self._caches
+
+    @property
+    def chunk_types(self) -> dict[str, int]:
+        """ Bytes held by the chunks of each type, by chunk class name. """
+        return self._chunk_types
+
+    @property
+    def frames(self) -> dict[int, int]:
+        """ Bytes held by each frame (including its chunks), by frame number. """
+        return self._frames
+
+    @property
+    def layers(self) -> dict[int, int]:
+        """ Bytes held by each layer (its layer chunk and its cels in every frame), by layer index.
+        User data and cel extra chunks count towards the layer or cel they belong to.
+        """
+        return self._layers
+
+
+def memory_report(aseprite_file: AsepriteFile) -> MemoryReport:
+    """ Estimate the memory held by a parsed Aseprite file, including the caches built on it.
+    Render caches and the pool of external files aren't included, because they are shared by every file: render
+    caches are stored on disk, and the external files in the pool can be measured with their own memory reports.
+    """
+    report = MemoryReport()
+    seen = set()
+
+    report._objects += _object_size(aseprite_file.header, seen)
+
+    # The first frame holds the layers, so it is included even if it wasn't selected when the file was opened
+    frames = [(1, aseprite_file.frame(1))] if aseprite_file.header.frame_count else []
+    frames += [(frame_number, frame) for frame_number, frame in aseprite_file.iter_frames() if frame_number != 1]
+
+    layer_index = -1
+    for frame_number, frame in frames:
+        frame_size = _frame_size(frame, seen)
+        report._objects += frame_size
+
+        owner_layer_index = None
+        for chunk in frame.chunks:
+            payloads, objects = _chunk_size(chunk, seen)
+            size = payloads + objects
+            report._payloads += payloads
+            report._objects += objects
+            frame_size += size
+
+            chunk_type = type(chunk).__name__
+            report._chunk_types[chunk_type] = report._chunk_types.get(chunk_type, 0) + size
+
+            # User data and cel extra chunks belong to the chunk before them
+            if isinstance(chunk, LayerChunk):
+                layer_index += 1
+                owner_layer_index = layer_index
+            elif isinstance(chunk, CelChunk):
+                owner_layer_index = chunk.layer_index
+            elif not isinstance(chunk, (UserDataChunk, CelExtraChunk)):
+                owner_layer_index = None
+
+            if owner_layer_index is not None:
+                report._layers[owner_layer_index] = report._layers.get(owner_layer_index, 0) + size
+
+        report._frames[frame_number] = frame_size
+
+    # Caches refer back to the file and to its chunks, which were counted above
+    seen.add(id(aseprite_file))
+    seen.add(id(external_files.shared_pool()))
+    for name, cache in aseprite_file.caches().items():
+        if cache:
+            report._caches[name] = _object_size(cache, seen)
+
+    return report
+
+
+def _chunk_size(chunk: Chunk, seen: set) -> tuple[int, int]:
+    """ Get the (payload, object) bytes held by a chunk. """
+    payloads = 0
+    objects = sys.getsizeof(chunk) + sys.getsizeof(vars(chunk))
+    seen.add(id(chunk))
+
+    for value in vars(chunk).values():
+        # Linked user data and cel extra chunks are counted on their own
+        if isinstance(value, Chunk):
+            continue
+        if isinstance(value, (bytes, bytearray)):
+            if id(value) not in seen:
+                seen.add(id(value))
+                payloads += sys.getsizeof(value)
+        else:
+            objects += _object_size(value, seen)
+
+    return payloads, objects
+
+
+def _frame_size(frame: Frame, seen: set) -> int:
+    """ Get the bytes held by a frame, without its chunks. """
+    size = sys.getsizeof(frame) + sys.getsizeof(vars(frame))
+    for value in vars(frame).values():
+        if value is frame.chunks:
+            size += sys.getsizeof(value)
+        else:
+            size += _object_size(value, seen)
+
+    return size
+
+
+def _object_size(value: object, seen: set) -> int:
+    """ Get the bytes held by an object and everything it refers to (each object is only counted once). """
+    if id(value) in seen or isinstance(value, Chunk):
+        return 0
+    seen.add(id(value))
+
+    size = sys.getsizeof(value)
+    if isinstance(value, Image.Image):
+        # The pixels are held outside of the Python object
+        size += value.width * value.height * len(value.getbands())
+        children = ()
+    elif isinstance(value, dict):
+        children = list(value.keys()) + list(value.values())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        children = value
+    elif hasattr(value, "__dict__") and not isinstance(value, type):
+        size += sys.getsizeof(vars(value))
+        children = vars(value).values()
+    else:
+        children = ()
+
+    for child in children:
+        size += _object_size(child, seen)
+
+    return size
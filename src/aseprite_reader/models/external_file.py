@@ -7,6 +7,7 @@ from aseprite_reader import utils
 class ExternalFile:
     def __init__(self, file: IO):
         self._entry_id = 0
+        self._entry_type = 0
         self._file_name = ""
 
         self._read_file(file)
@@ -22,6 +23,16 @@ class ExternalFile:
         """ Entry ID (this ID is referenced by tilesets or palettes). """
         return self._entry_id
 
+    @property
+    def entry_type(self) -> int:
+        """ Type of the external file.
+        0 - External palette
+        1 - External tileset
+        2 - Extension name for properties
+        3 - Extension name for tile management (can exist one per sprite)
+        """
+        return self._entry_type
+
     @property
     def file_name(self) -> str:
         """ External file name. """
@@ -29,5 +40,6 @@ class ExternalFile:
 
     def _read_file(self, file: IO) -> None:
         self._entry_id = utils.read_dword(file)
-        file.seek(8, os.SEEK_CUR)  # Reserved (set to zero)
+        self._entry_type = utils.read_byte(file)
+        file.seek(7, os.SEEK_CUR)  # Reserved (set to zero)
         self._file_name = utils.read_string(file)
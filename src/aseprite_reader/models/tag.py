@@ -1,8 +1,12 @@
+from __future__ import annotations
 import os
-from typing import IO
+from typing import IO, Optional, TYPE_CHECKING
 
 from aseprite_reader import utils
 
+if TYPE_CHECKING:
+    from aseprite_reader.chunks import UserDataChunk
+
 
 class Tag:
     def __init__(self, file: IO):
@@ -12,6 +16,7 @@ class Tag:
         self._repeat = 0
         self._color = (0, 0, 0)
         self._name = ""
+        self._user_data = None
 
         self._read_file(file)
 
@@ -64,6 +69,39 @@ class Tag:
         """ Tag name. """
         return self._name
 
+    @property
+    def user_data(self) -> Optional[UserDataChunk]:
+        """ The user data of this tag (its color and text), if it has any. """
+        return self._user_data
+
+    def frame_sequence(self) -> list[int]:
+        """ The frame indexes (0-based) of this tag, in the order they are played when exported.
+        Forward and reverse tags play 'repeat' times (once if 'repeat' is 0).
+        Ping-pong tags alternate direction on each pass without repeating the frame they turn around on. If 'repeat'
+        is 0, they play once in each direction, without the first frame at the end (so the sequence can loop).
+        """
+        forward = list(range(self.from_frame, self.to_frame + 1))
+        match self.loop_animation_direction:
+            case 0:
+                return forward * max(self.repeat, 1)
+            case 1:
+                return forward[::-1] * max(self.repeat, 1)
+            case 2 | 3:
+                if self.loop_animation_direction == 3:
+                    forward.reverse()
+
+                # Play once in each direction, ready to loop back to the start
+                if self.repeat == 0:
+                    return forward + forward[-2:0:-1]
+
+                sequence = forward
+                for i in range(1, self.repeat):
+                    direction = forward[::-1] if i % 2 == 1 else forward
+                    sequence = sequence + direction[1:]
+                return sequence
+            case _:
+                raise RuntimeError(f"Invalid loop animation direction: {self.loop_animation_direction}")
+
     def _read_file(self, file: IO) -> None:
         self._from_frame = utils.read_word(file)
         self._to_frame = utils.read_word(file)
@@ -0,0 +1,294 @@
+""" Optimize Aseprite files so they load and render faster.
+
+    python -m aseprite_reader.optimize input.aseprite output.aseprite --drop-hidden-layers
+"""
+from __future__ import annotations
+import argparse
+import hashlib
+import zlib
+from pathlib import Path
+from typing import Optional
+
+from PIL import Image
+
+from aseprite_reader import writer
+from aseprite_reader.aseprite_file import AsepriteFile
+from aseprite_reader.chunks import CelChunk, CelExtraChunk, LayerChunk, UserDataChunk
+from aseprite_reader.writer import AsepriteWriter, CelHeader
+
+
+class OptimizeReport:
+    """ The result of optimizing a file. """
+    def __init__(self) -> None:
+        self._original_size = 0
+        self._optimized_size = 0
+        self._linked_cels = 0
+        self._cropped_cels = 0
+        self._removed_cels = 0
+        self._removed_layers = 0
+
+    def __str__(self) -> str:
+        return (f"OptimizeReport(original_size={self.original_size}, optimized_size={self.optimized_size}, "
+                f"linked_cels={self.linked_cels}, cropped_cels={self.cropped_cels}, "
+                f"removed_cels={self.removed_cels}, removed_layers={self.removed_layers})")
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    @property
+    def original_size(self) -> int:
+        """ Size of the original file (in bytes). """
+        return self._original_size
+
+    @property
+    def optimized_size(self) -> int:
+        """ Size of the optimized file (in bytes). """
+        return self._optimized_size
+
+    @property
+    def linked_cels(self) -> int:
+        """ Number of cels that were replaced by links to identical cels in earlier frames. """
+        return self._linked_cels
+
+    @property
+    def cropped_cels(self) -> int:
+        """ Number of cels that were cropped to their non-transparent pixels. """
+        return self._cropped_cels
+
+    @property
+    def removed_cels(self) -> int:
+        """ Number of cels that were removed, because they were fully transparent or on a removed layer. """
+        return self._removed_cels
+
+    @property
+    def removed_layers(self) -> int:
+        """ Number of layers that were removed. """
+        return self._removed_layers
+
+
+def optimize(
+        aseprite_file: AsepriteFile,
+        output_file: Path,
+        compression_level: int = 9,
+        link_duplicates: bool = True,
+        crop_cels: bool = True,
+        drop_hidden_layers: bool = False,
+        drop_reference_layers: bool = False
+) -> OptimizeReport:
+    """ Write an optimized copy of an Aseprite file.
+    compression_level: The ZLIB compression level (0-9) that cel data is compressed with.
+    link_duplicates: Replace cels with links to identical cels (same pixels, position and opacity) on the same layer
+        in earlier frames, so they are stored and decoded once.
+    crop_cels: Crop cels to their non-transparent pixels, and remove cels that are fully transparent. Cels on the
+        background layer and cels with precise bounds (a cel extra chunk) are left as they are.
+    drop_hidden_layers: Remove hidden layers (and the layers in hidden groups), with their cels.
+    drop_reference_layers: Remove reference layers (and the layers in reference groups), with their cels.
+    Cels that have user data are never replaced by links, so their user data is kept.
+    """
+    if not 0 <= compression_level <= 9:
+        raise ValueError(f"compression_level must be between 0 and 9 (got {compression_level}).")
+    writer.check_output_file(aseprite_file, output_file)
+
+    report = OptimizeReport()
+    report._original_size = aseprite_file.file_path.stat().st_size
+
+    layers = aseprite_file.layers
+    removed_layers = _removed_layers(layers, drop_hidden_layers, drop_reference_layers)
+    layer_indexes = {}
+    for layer_index, layer in enumerate(layers):
+        if layer_index not in removed_layers:
+            layer_indexes[layer_index] = len(layer_indexes)
+
+    # For each (layer index, frame position), the frame position of the cel that holds its data (None if removed)
+    cel_data_frames = {}
+    # For each layer index, the frame position of each distinct cel, by its position, opacity and pixels
+    payloads = {}
+
+    with aseprite_file.file_path.open('rb') as source, output_file.open('wb') as f:
+        aseprite_writer = AsepriteWriter(f, aseprite_file.header)
+
+        for frame_position in range(aseprite_file.header.frame_count):
+            frame = aseprite_file.frame(frame_position + 1)
+            chunks = []
+            owner_removed = False
+            layer_chunk_index = 0
+
+            for chunk in frame.chunks:
+                # User data and cel extra chunks belong to the chunk before them
+                if isinstance(chunk, (UserDataChunk, CelExtraChunk)):
+                    if not owner_removed:
+                        chunks.append(writer.read_chunk(source, chunk))
+                    continue
+
+                owner_removed = False
+                if isinstance(chunk, LayerChunk):
+                    owner_removed = layer_chunk_index in removed_layers
+                    layer_chunk_index += 1
+                    if owner_removed:
+                        report._removed_layers += 1
+                    else:
+                        chunks.append(writer.read_chunk(source, chunk))
+                elif isinstance(chunk, CelChunk):
+                    if chunk.layer_index in removed_layers:
+                        encoded = None
+                    else:
+                        encoded = _optimize_cel(
+                            aseprite_file, chunk, frame_position, layers[chunk.layer_index],
+                            layer_indexes[chunk.layer_index], cel_data_frames, payloads, report,
+                            compression_level, link_duplicates, crop_cels
+                        )
+
+                    if encoded is None:
+                        owner_removed = True
+                        report._removed_cels += 1
+                    else:
+                        chunks.append(encoded)
+                else:
+                    chunks.append(writer.read_chunk(source, chunk))
+
+            aseprite_writer.add_frame(chunks, frame.duration)
+
+        aseprite_writer.close()
+
+    report._optimized_size = output_file.stat().st_size
+    return report
+
+
+def _removed_layers(layers: list[LayerChunk], hidden: bool, reference: bool) -> set[int]:
+    """ Get the indexes of the layers to remove. Layers inside a removed group are removed too. """
+    removed = set()
+    removed_group_level = None
+
+    for layer_index, layer in enumerate(layers):
+        if removed_group_level is not None and layer.layer_child_level > removed_group_level:
+            removed.add(layer_index)
+            continue
+
+        removed_group_level = None
+        if (hidden and not layer.visible) or (reference and layer.reference):
+            removed.add(layer_index)
+            removed_group_level = layer.layer_child_level
+
+    return removed
+
+
+def _optimize_cel(
+        aseprite_file: AsepriteFile,
+        cel: CelChunk,
+        frame_position: int,
+        layer: LayerChunk,
+        layer_index: int,
+        cel_data_frames: dict,
+        payloads: dict,
+        report: OptimizeReport,
+        compression_level: int,
+        link_duplicates: bool,
+        crop_cels: bool
+) -> Optional[bytes]:
+    """ Encode an optimized cel chunk, or return None if the cel should be removed. """
+    header = CelHeader.from_cel(cel, layer_index)
+    key = (cel.layer_index, frame_position)
+    has_attachments = cel.user_data is not None or cel.cel_extra is not None
+
+    match cel.cel_type:
+        case 1:
+            # Follow the link to the cel that holds the data (it may have been replaced by a link, or removed)
+            data_frame = cel_data_frames.get((cel.layer_index, cel.linked_frame_position), cel.linked_frame_position)
+            cel_data_frames[key] = data_frame
+            if data_frame is None:
+                return None
+            return writer.encode_linked_cel_chunk(header, data_frame)
+
+        case 2:
+            width, height = cel.width, cel.height
+            data = zlib.decompress(cel.compressed_image_data)
+
+            if crop_cels and not layer.background and cel.cel_extra is None:
+                image = _cel_image(aseprite_file, width, height, data)
+                bbox = _opaque_bbox(aseprite_file, image)
+                if bbox is None and not has_attachments:
+                    cel_data_frames[key] = None
+                    return None
+                if bbox is not None and bbox != (0, 0, width, height):
+                    data = image.crop(bbox).tobytes()
+                    header.x_position += bbox[0]
+                    header.y_position += bbox[1]
+                    width, height = bbox[2] - bbox[0], bbox[3] - bbox[1]
+                    report._cropped_cels += 1
+
+            if link_duplicates and not has_attachments:
+                payload_key = (header.x_position, header.y_position, header.opacity_level, header.z_index, width,
+                               height, hashlib.sha256(data).digest())
+                layer_payloads = payloads.setdefault(cel.layer_index, {})
+                if payload_key in layer_payloads:
+                    cel_data_frames[key] = layer_payloads[payload_key]
+                    report._linked_cels += 1
+                    return writer.encode_linked_cel_chunk(header, layer_payloads[payload_key])
+                layer_payloads[payload_key] = frame_position
+
+            cel_data_frames[key] = frame_position
+            return writer.encode_image_cel_chunk(header, width, height, zlib.compress(data, compression_level))
+
+        case 3:
+            cel_data_frames[key] = frame_position
+            tile_data = zlib.compress(zlib.decompress(cel.compressed_tile_data), compression_level)
+            return writer.encode_tilemap_cel_chunk(header, cel, tile_data)
+
+        case _:
+            cel_data_frames[key] = frame_position
+            return writer.encode_cel_chunk(cel, layer_index)
+
+
+def _cel_image(aseprite_file: AsepriteFile, width: int, height: int, data: bytes) -> Image.Image:
+    """ Wrap decompressed cel data in an image, without converting it, so it can be cropped and turned back into data. """
+    match aseprite_file.header.color_depth:
+        case 32:
+            return Image.frombytes("RGBA", (width, height), data)
+        case 16:
+            return Image.frombytes("LA", (width, height), data)
+        case 8:
+            return Image.frombytes("L", (width, height), data)
+        case _:
+            raise RuntimeError(f"Invalid color depth: {aseprite_file.header.color_depth}")
+
+
+def _opaque_bbox(aseprite_file: AsepriteFile, image: Image.Image) -> Optional[tuple[int, int, int, int]]:
+    """ Get the bounding box of the pixels of a cel image that aren't transparent. """
+    if image.mode == "L":
+        transparent_index = aseprite_file.header.transparent_color_index
+        return image.point(lambda i: 0 if i == transparent_index else 255).getbbox()
+
+    return image.getchannel("A").getbbox()
+
+
+def main(args: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Optimize an Aseprite file so it loads and renders faster.")
+    parser.add_argument("input_file", type=Path, help="The Aseprite file to optimize.")
+    parser.add_argument("output_file", type=Path, help="Where to write the optimized file.")
+    parser.add_argument("--compression-level", type=int, default=9, help="ZLIB compression level (0-9).")
+    parser.add_argument("--no-link", action="store_true", help="Don't replace duplicate cels with linked cels.")
+    parser.add_argument("--no-crop", action="store_true", help="Don't crop cels to their non-transparent pixels.")
+    parser.add_argument("--drop-hidden-layers", action="store_true", help="Remove hidden layers.")
+    parser.add_argument("--drop-reference-layers", action="store_true", help="Remove reference layers.")
+    parser.add_argument("--overwrite", action="store_true", help="Overwrite the output file if it exists.")
+    parsed = parser.parse_args(args)
+
+    aseprite_file = AsepriteFile(parsed.input_file)
+    if parsed.output_file.exists() and not parsed.overwrite:
+        raise FileExistsError(f"Can't overwrite existing file: {parsed.output_file.as_posix()}")
+    writer.check_output_file(aseprite_file, parsed.output_file)
+
+    report = optimize(
+        aseprite_file,
+        parsed.output_file,
+        compression_level=parsed.compression_level,
+        link_duplicates=not parsed.no_link,
+        crop_cels=not parsed.no_crop,
+        drop_hidden_layers=parsed.drop_hidden_layers,
+        drop_reference_layers=parsed.drop_reference_layers,
+    )
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+from __future__ import annotations
+import bisect
+import zlib
+from typing import Optional, TYPE_CHECKING
+
+from PIL import Image
+
+from aseprite_reader import profiling
+from aseprite_reader import render
+from aseprite_reader.chunks import PaletteChunk
+from aseprite_reader.composite import COMPOSITE_STAGES
+
+if TYPE_CHECKING:
+    from aseprite_reader import AsepriteFile
+    from aseprite_reader.frame import Frame
+
+
+Color = tuple[int, int, int, int]
+
+
+class PaletteTimeline:
+    """ The palette of each frame.
+    A palette chunk replaces a range of palette entries (from 'first_index_to_change' to 'last_index_to_change') from
+    its frame on, so each frame with a palette chunk starts a new palette version.
+    The palette chunks of frames are read in order as far as they are needed. Frames that were skipped when the file
+    was opened stay unread; only their palette chunks are read.
+    The palette data of each version is built once, and kept.
+    """
+    def __init__(self, aseprite_file: AsepriteFile) -> None:
+        self._aseprite_file = aseprite_file
+        self._start_frames = []
+        self._versions = []
+        self._palette_data = {}
+        self._frames_read = 0
+
+    @property
+    def aseprite_file(self) -> AsepriteFile:
+        """ The Aseprite file. """
+        return self._aseprite_file
+
+    def version(self, frame_number: int) -> int:
+        """ Get the palette version of a frame number (starting from 1). Frames with the same palette share a version;
+        the first palette is version 0.
+        """
+        self._read_frames(frame_number)
+        i = bisect.bisect_right(self._start_frames, frame_number)
+        if i == 0:
+            raise RuntimeError("Error reading indexed colors: could not find palette chunk.")
+
+        return i - 1
+
+    def colors(self, frame_number: int) -> list[Color]:
+        """ Get the RGBA colors of the palette of a frame number (starting from 1). """
+        return self._versions[self.version(frame_number)]
+
+    def palette_data(self, frame_number: int) -> bytes:
+        """ Get the palette of a frame number as 256 RGBA entries, with the transparent color index cleared. """
+        version = self.version(frame_number)
+        if version not in self._palette_data:
+            palette_data = bytearray(256 * 4)
+            for i, color in enumerate(self._versions[version][:256]):
+                palette_data[i * 4:i * 4 + 4] = color
+
+            transparent_index = self.aseprite_file.header.transparent_color_index
+            palette_data[transparent_index * 4:transparent_index * 4 + 4] = (0, 0, 0, 0)
+            self._palette_data[version] = bytes(palette_data)
+
+        return self._palette_data[version]
+
+    def _read_frames(self, frame_number: int) -> None:
+        """ Apply the palette chunks of every frame up to a frame number. """
+        last_frame_number = min(frame_number, self.aseprite_file.header.frame_count)
+        while self._frames_read < last_frame_number:
+            self._frames_read += 1
+            for chunk in self.aseprite_file.palette_chunks(self._frames_read):
+                if isinstance(chunk, PaletteChunk):
+                    self._apply(self._frames_read, chunk)
+
+    def _apply(self, frame_number: int, palette: PaletteChunk) -> None:
+        """ Start a new palette version from a palette chunk. """
+        colors = list(self._versions[-1]) if self._versions else []
+        colors = (colors + [(0, 0, 0, 0)] * palette.palette_size)[:palette.palette_size]
+        for i, color in enumerate(palette.palette_colors):
+            index = palette.first_index_to_change + i
+            if index < len(colors):
+                colors[index] = (color.r, color.g, color.b, color.a)
+
+        if self._start_frames and self._start_frames[-1] == frame_number:
+            self._versions[-1] = colors
+        else:
+            self._start_frames.append(frame_number)
+            self._versions.append(colors)
+
+
+def frame_to_palettized_image(aseprite_file: AsepriteFile, frame: Frame) -> Optional[Image.Image]:
+    """ Produce a palettized ('P' mode) image from the frame data of an indexed sprite, without converting it to RGBA.
+    The image has the frame's palette as RGBA entries, so it is saved as an 8-bit PNG with transparency.
+    Compositing indexed pixels only gives the same result as an RGBA render when every pixel is either fully opaque or
+    fully transparent, so None is returned if the sprite isn't indexed, or if any layer has a blend mode other than
+    normal, isn't fully opaque, isn't made of compressed image cels, or if the palette has translucent colors.
+    """
+    if aseprite_file.header.color_depth != 8:
+        return None
+
+    frame_number = aseprite_file.frame_number(frame)
+    palette_data = aseprite_file.palette_timeline.palette_data(frame_number)
+    alphas = palette_data[3::4]
+    if any(0 < a < 255 for a in alphas):
+        return None
+
+    # Pixels whose color is fully transparent are left out when pasting cels
+    transparent_index = aseprite_file.header.transparent_color_index
+    mask_table = [0 if a == 0 or i == transparent_index else 255 for i, a in enumerate(alphas)]
+
+    cels = []
+    for layer in render.rendered_layers(aseprite_file):
+        if layer.layer_type != 0 or layer.blend_mode != 0 or render.layer_opacity(aseprite_file, layer) != 255:
+            return None
+
+        cel = aseprite_file.cel(frame, layer)
+        if not cel:
+            continue
+
+        cel = aseprite_file.resolve_cel(cel)
+        if cel.cel_type != 2:
+            return None
+        cels.append(cel)
+
+    with profiling.scope(aseprite_file, frame), profiling.stage(profiling.RENDER_FRAME):
+        size = (aseprite_file.header.width, aseprite_file.header.height)
+        frame_image = Image.new(mode="P", size=size, color=transparent_index)
+        frame_image.putpalette(palette_data, rawmode="RGBA")
+
+        for cel in cels:
+            with profiling.stage(profiling.INFLATE) as stage:
+                image_data = zlib.decompress(cel.compressed_image_data)
+                stage.size = len(image_data)
+
+            cel_image = Image.frombytes("P", (cel.width, cel.height), image_data)
+            mask = Image.frombytes("L", (cel.width, cel.height), image_data).point(mask_table)
+            with profiling.stage(COMPOSITE_STAGES[0]):
+                frame_image.paste(cel_image, (cel.x_position, cel.y_position), mask)
+
+        return frame_image
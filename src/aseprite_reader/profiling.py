@@ -0,0 +1,298 @@
+from __future__ import annotations
+import contextlib
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Iterator, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from aseprite_reader import AsepriteFile
+    from aseprite_reader.frame import Frame
+
+
+# Stage names
+PARSE = "parse"
+PARSE_HEADER = "parse_header"
+PARSE_FRAME = "parse_frame"
+CHUNK = "chunk"  # Chunk stages are named "chunk.<chunk class name>"
+INFLATE = "inflate"
+PIXEL_CONVERSION = "pixel_conversion"
+COMPOSITE = "composite"  # Composite stages are named "composite.<blend mode name>"
+RENDER_FRAME = "render_frame"
+SCALE = "scale"
+COLOR_TRANSFORM = "color_transform"
+PNG_ENCODE = "png_encode"
+
+_callbacks = []
+_callbacks_lock = threading.Lock()
+_local = threading.local()
+
+
+class StageEvent:
+    """ A measurement of one stage of the pipeline. """
+    def __init__(
+            self,
+            stage: str,
+            seconds: float,
+            size: int,
+            file_path: Optional[Path],
+            frame_number: Optional[int]
+    ) -> None:
+        self._stage = stage
+        self._seconds = seconds
+        self._size = size
+        self._file_path = file_path
+        self._frame_number = frame_number
+
+    def __str__(self) -> str:
+        return f"StageEvent({self.stage}, {self.seconds:.6f}s)"
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    @property
+    def stage(self) -> str:
+        """ The name of the stage. """
+        return self._stage
+
+    @property
+    def seconds(self) -> float:
+        """ How long the stage took. """
+        return self._seconds
+
+    @property
+    def size(self) -> int:
+        """ The number of bytes the stage produced (e.g. decompressed bytes for 'inflate'), or 0. """
+        return self._size
+
+    @property
+    def file_path(self) -> Optional[Path]:
+        """ The Aseprite file the stage worked on, if it is known. """
+        return self._file_path
+
+    @property
+    def frame_number(self) -> Optional[int]:
+        """ The frame the stage worked on (starting from 1), if it is known.
+        Cels that are decoded on an executor may be shared by several frames, so they aren't counted for a frame.
+        """
+        return self._frame_number
+
+
+class StageStats:
+    """ Totals for a stage. """
+    def __init__(self) -> None:
+        self.count = 0
+        self.seconds = 0.0
+        self.size = 0
+
+    def __str__(self) -> str:
+        return f"StageStats(count={self.count}, seconds={self.seconds:.6f}, size={self.size})"
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    def add(self, event: StageEvent) -> None:
+        """ Add an event to the totals. """
+        self.count += 1
+        self.seconds += event.seconds
+        self.size += event.size
+
+    def to_dict(self) -> dict:
+        return {"count": self.count, "seconds": self.seconds, "size": self.size}
+
+
+class Profile:
+    """ Collects stage events, with totals for everything, per file and per frame.
+    Use profile() to collect the events of a block of code, or register a Profile with add_callback().
+    """
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._totals = {}
+        self._files = {}
+        self._frames = {}
+
+    def __call__(self, event: StageEvent) -> None:
+        with self._lock:
+            _stats(self._totals, event.stage).add(event)
+            if event.file_path is not None:
+                _stats(self._files.setdefault(event.file_path, {}), event.stage).add(event)
+                if event.frame_number is not None:
+                    key = (event.file_path, event.frame_number)
+                    _stats(self._frames.setdefault(key, {}), event.stage).add(event)
+
+    @property
+    def totals(self) -> dict[str, StageStats]:
+        """ Totals for each stage. """
+        return self._totals
+
+    @property
+    def files(self) -> dict[Path, dict[str, StageStats]]:
+        """ Totals for each stage, for each file. """
+        return self._files
+
+    @property
+    def frames(self) -> dict[tuple[Path, int], dict[str, StageStats]]:
+        """ Totals for each stage, for each (file, frame number). """
+        return self._frames
+
+    def to_dict(self) -> dict:
+        """ Get the totals as a dict that can be serialized as JSON (e.g. to export as metrics). """
+        return {
+            "totals": _stats_dict(self.totals),
+            "files": {file_path.as_posix(): _stats_dict(stats) for file_path, stats in self.files.items()},
+            "frames": [
+                {"file": file_path.as_posix(), "frame": frame_number, "stages": _stats_dict(stats)}
+                for (file_path, frame_number), stats in self.frames.items()
+            ],
+        }
+
+
+@contextlib.contextmanager
+def profile() -> Iterator[Profile]:
+    """ Collect the stage events of everything that runs inside a with block (on any thread).
+
+        with profiling.profile() as p:
+            aseprite_file.render(frame, output_file)
+        print(p.totals)
+    """
+    collected = Profile()
+    add_callback(collected)
+    try:
+        yield collected
+    finally:
+        remove_callback(collected)
+
+
+def add_callback(callback: Callable[[StageEvent], None]) -> None:
+    """ Register a function that is called with a StageEvent whenever a stage finishes.
+    Callbacks can be called from any thread (e.g. executor threads that decode cels), so they must be thread-safe.
+    """
+    global _callbacks
+
+    with _callbacks_lock:
+        _callbacks = _callbacks + [callback]
+
+
+def remove_callback(callback: Callable[[StageEvent], None]) -> None:
+    """ Unregister a function that was registered with add_callback(). """
+    global _callbacks
+
+    with _callbacks_lock:
+        callbacks = list(_callbacks)
+        callbacks.remove(callback)
+        _callbacks = callbacks
+
+
+def enabled() -> bool:
+    """ Whether any callbacks are registered. Stages aren't timed when nothing is listening. """
+    return bool(_callbacks)
+
+
+def stage(name: str) -> _Stage | _NullStage:
+    """ Context manager that times a stage and sends it to the callbacks.
+    The stage is counted for the file and frame of the innermost scope() on this thread.
+    Set 'size' on the returned object to report the number of bytes the stage produced.
+    """
+    if not _callbacks:
+        return _NULL_STAGE
+
+    return _Stage(name)
+
+
+def scope(aseprite_file: AsepriteFile, frame: Optional[Frame] = None, frame_number: Optional[int] = None) -> _Scope:
+    """ Context manager that sets the file and frame that stages on this thread are counted for. """
+    return _Scope(aseprite_file, frame, frame_number)
+
+
+class _Stage:
+    def __init__(self, name: str) -> None:
+        self._name = name
+        self._start = 0.0
+        self.size = 0
+
+    def __enter__(self) -> _Stage:
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args) -> None:
+        seconds = time.perf_counter() - self._start
+        file_path, frame_number = _current_scope()
+
+        event = StageEvent(self._name, seconds, self.size, file_path, frame_number)
+        for callback in _callbacks:
+            callback(event)
+
+
+class _NullStage:
+    """ Stand-in for a stage when nothing is listening. """
+    def __enter__(self) -> _NullStage:
+        return self
+
+    def __exit__(self, *args) -> None:
+        pass
+
+    @property
+    def size(self) -> int:
+        return 0
+
+    @size.setter
+    def size(self, value: int) -> None:
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Scope:
+    def __init__(self, aseprite_file: AsepriteFile, frame: Optional[Frame], frame_number: Optional[int]) -> None:
+        self._aseprite_file = aseprite_file
+        self._frame = frame
+        self._frame_number = frame_number
+        self._entered = False
+
+    def __enter__(self) -> None:
+        # Scopes cost nothing when nothing is listening
+        self._entered = bool(_callbacks)
+        if not self._entered:
+            return
+
+        frame_number = self._frame_number
+        if frame_number is None and self._frame is not None:
+            frame_number = _frame_number(self._aseprite_file, self._frame)
+        _scopes().append((self._aseprite_file.file_path, frame_number))
+
+    def __exit__(self, *args) -> None:
+        if self._entered:
+            _scopes().pop()
+
+
+def _scopes() -> list:
+    """ Get the scope stack of this thread. """
+    if not hasattr(_local, "scopes"):
+        _local.scopes = []
+    return _local.scopes
+
+
+def _current_scope() -> tuple[Optional[Path], Optional[int]]:
+    """ Get the (file path, frame number) of the innermost scope on this thread. """
+    scopes = _scopes()
+    return scopes[-1] if scopes else (None, None)
+
+
+def _frame_number(aseprite_file: AsepriteFile, frame: Frame) -> Optional[int]:
+    """ Get the number of a frame (starting from 1). """
+    try:
+        return aseprite_file.frame_number(frame)
+    except KeyError:
+        return None
+
+
+def _stats(stats: dict[str, StageStats], name: str) -> StageStats:
+    if name not in stats:
+        stats[name] = StageStats()
+    return stats[name]
+
+
+def _stats_dict(stats: dict[str, StageStats]) -> dict:
+    return {name: stage_stats.to_dict() for name, stage_stats in stats.items()}
+
@@ -0,0 +1,218 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Optional, TYPE_CHECKING
+
+from PIL import Image
+from PIL.PngImagePlugin import PngInfo
+
+from aseprite_reader import profiling
+from aseprite_reader import render
+from aseprite_reader.boxes import Box, cel_box, intersection, union
+from aseprite_reader.composite import composite_into
+
+if TYPE_CHECKING:
+    from aseprite_reader import AsepriteFile
+    from aseprite_reader.chunks import CelChunk, LayerChunk
+    from aseprite_reader.frame import Frame
+
+
+# The PNG text chunk that the box of a trimmed frame is recorded in, as "left,upper,right,lower"
+TRIM_KEY = "aseprite_reader:trim"
+
+
+class _CelEntry:
+    """ A rendered layer of a frame, with its cel and the box the cel covers on the canvas.
+    The box is None for layers that aren't rendered from a compressed image cel, which are treated as covering the
+    whole canvas.
+    """
+    def __init__(self, order: int, layer: LayerChunk, cel: Optional[CelChunk], box: Optional[Box]) -> None:
+        self.order = order
+        self.layer = layer
+        self.cel = cel
+        self.box = box
+
+
+class CelIndex:
+    """ A spatial index of the cels of a frame, for finding the cels that intersect a region of the canvas.
+    The canvas is divided into square buckets of 'bucket_size' pixels, and each cel is added to the buckets its
+    bounding box touches, so a query only looks at the cels near the region instead of every layer.
+    """
+    def __init__(self, aseprite_file: AsepriteFile, frame: Frame, bucket_size: int = 256) -> None:
+        if bucket_size < 1:
+            raise RuntimeError(f"Invalid bucket size: {bucket_size}")
+
+        self._bucket_size = bucket_size
+        self._buckets = {}
+        self._canvas_entries = []
+        self._bounds = None
+
+        header = aseprite_file.header
+        canvas_box = (0, 0, header.width, header.height)
+
+        for order, layer in enumerate(render.rendered_layers(aseprite_file)):
+            cel = None
+            if layer.layer_type == 0:
+                cel = aseprite_file.cel(frame, layer)
+                if not cel:
+                    continue
+                cel = aseprite_file.resolve_cel(cel)
+
+            if cel is None or cel.cel_type != 2:
+                self._canvas_entries.append(_CelEntry(order, layer, cel, None))
+                self._bounds = canvas_box
+                continue
+
+            # Cels are clipped to the canvas when they are rendered
+            box = intersection(cel_box(cel), canvas_box)
+            if box is None:
+                continue
+
+            entry = _CelEntry(order, layer, cel, box)
+            self._bounds = union([box] if self._bounds is None else [self._bounds, box])
+            for bucket in self._bucket_keys(box):
+                self._buckets.setdefault(bucket, []).append(entry)
+
+    @property
+    def bucket_size(self) -> int:
+        """ The size (in pixels) of the square buckets the canvas is divided into. """
+        return self._bucket_size
+
+    @property
+    def bounds(self) -> Optional[Box]:
+        """ The union of the boxes of the cels on the canvas, or None if no cel is on the canvas.
+        Layers that aren't rendered from a compressed image cel count as covering the whole canvas.
+        """
+        return self._bounds
+
+    def query(self, box: Box) -> list[_CelEntry]:
+        """ Get the layers that may cover a region (left, upper, right, lower), from background to foreground. """
+        entries = {id(entry): entry for entry in self._canvas_entries}
+        for bucket in self._bucket_keys(box):
+            for entry in self._buckets.get(bucket, ()):
+                if intersection(entry.box, box) is not None:
+                    entries[id(entry)] = entry
+
+        return sorted(entries.values(), key=lambda e: e.order)
+
+    def _bucket_keys(self, box: Box) -> list[tuple[int, int]]:
+        """ Get the keys of the buckets a box touches. """
+        size = self._bucket_size
+        return [
+            (x, y)
+            for y in range(box[1] // size, (box[3] - 1) // size + 1)
+            for x in range(box[0] // size, (box[2] - 1) // size + 1)
+        ]
+
+
+def render_region(
+        aseprite_file: AsepriteFile,
+        frame: Frame,
+        box: Box,
+        cel_index: Optional[CelIndex] = None
+) -> Image.Image:
+    """ Produce an image of a region (left, upper, right, lower) of a frame.
+    The result is the same as cropping the full frame image to the box: parts of the box outside of the canvas are
+    transparent. Only the cels that intersect the box are decoded, and only the rows of each cel that the box covers
+    are decompressed and converted.
+    If a cel index of the frame is given, it is used to find the cels; otherwise one is built.
+    """
+    if box[2] <= box[0] or box[3] <= box[1]:
+        raise RuntimeError(f"Invalid region: {box}")
+
+    with profiling.scope(aseprite_file, frame), profiling.stage(profiling.RENDER_FRAME):
+        return _render_region(aseprite_file, frame, box, cel_index)
+
+
+def _render_region(aseprite_file: AsepriteFile, frame: Frame, box: Box, cel_index: Optional[CelIndex]) -> Image.Image:
+    region_image = Image.new(mode="RGBA", size=(box[2] - box[0], box[3] - box[1]))
+
+    header = aseprite_file.header
+    visible_box = intersection(box, (0, 0, header.width, header.height))
+    if visible_box is None:
+        return region_image
+
+    if cel_index is None:
+        cel_index = CelIndex(aseprite_file, frame)
+
+    for entry in cel_index.query(visible_box):
+        opacity = render.layer_opacity(aseprite_file, entry.layer)
+
+        if entry.box is None:
+            # Render the whole layer, as a full render would
+            layer_image = render.layer_to_image(aseprite_file, frame, entry.layer)
+            if layer_image:
+                composite_into(region_image, layer_image.crop(box), (0, 0), entry.layer.blend_mode, opacity)
+            continue
+
+        cel = entry.cel
+        left, upper, right, lower = intersection(entry.box, visible_box)
+        band = render.decode_cel_rows(aseprite_file, cel, upper - cel.y_position, lower - cel.y_position,
+                                      render.palette_frame_number(aseprite_file, frame))
+        if left != cel.x_position or right != cel.x_position + cel.width:
+            band = band.crop((left - cel.x_position, 0, right - cel.x_position, band.height))
+
+        position = (left - box[0], upper - box[1])
+        composite_into(region_image, band, position, entry.layer.blend_mode, opacity)
+
+    return region_image
+
+
+def frame_bounds(aseprite_file: AsepriteFile, frame: Frame, cel_index: Optional[CelIndex] = None) -> Optional[Box]:
+    """ Get the bounding box (left, upper, right, lower) of the pixels of a frame that aren't transparent.
+    Only the union of the cel boxes is rendered and searched. None is returned if the frame is fully transparent.
+    """
+    return _trim(aseprite_file, frame, cel_index)[1]
+
+
+def trimmed_frame_to_image(
+        aseprite_file: AsepriteFile,
+        frame: Frame,
+        cel_index: Optional[CelIndex] = None
+) -> tuple[Image.Image, Box]:
+    """ Produce an image of the pixels of a frame that aren't transparent, and the box it was cropped to.
+    A fully transparent frame is cropped to its top left pixel, so an image is always produced.
+    """
+    image, bounds = _trim(aseprite_file, frame, cel_index)
+    if bounds is None:
+        return Image.new(mode="RGBA", size=(1, 1)), (0, 0, 1, 1)
+
+    return image, bounds
+
+
+def _trim(
+        aseprite_file: AsepriteFile,
+        frame: Frame,
+        cel_index: Optional[CelIndex]
+) -> tuple[Optional[Image.Image], Optional[Box]]:
+    """ Render the union of the cel boxes of a frame, and crop it to the pixels that aren't transparent. """
+    if cel_index is None:
+        cel_index = CelIndex(aseprite_file, frame)
+    if cel_index.bounds is None:
+        return None, None
+
+    cels_box = cel_index.bounds
+    image = render_region(aseprite_file, frame, cels_box, cel_index)
+    bbox = image.getchannel("A").getbbox()
+    if bbox is None:
+        return None, None
+
+    bounds = (cels_box[0] + bbox[0], cels_box[1] + bbox[1], cels_box[0] + bbox[2], cels_box[1] + bbox[3])
+    return image.crop(bbox), bounds
+
+
+def save_trimmed_image(image: Image.Image, trim_box: Box, output_file: Path) -> None:
+    """ Save a trimmed frame as a PNG image, recording the box it was cropped to in a text chunk. """
+    png_info = PngInfo()
+    png_info.add_text(TRIM_KEY, ",".join(str(i) for i in trim_box))
+    image.save(output_file, format="PNG", pnginfo=png_info)
+
+
+def read_trim_box(png_file: Path) -> Optional[Box]:
+    """ Read the box a trimmed frame was cropped to from a PNG image, or None if it isn't a trimmed frame. """
+    with Image.open(png_file) as image:
+        value = image.text.get(TRIM_KEY)
+
+    if value is None:
+        return None
+
+    return tuple(int(i) for i in value.split(","))
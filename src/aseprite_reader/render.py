@@ -1,10 +1,15 @@
 from __future__ import annotations
-from typing import Optional, TYPE_CHECKING
+import queue
+import threading
+import zlib
+from concurrent.futures import Executor, Future
+from typing import Any, Iterable, Iterator, Optional, TYPE_CHECKING
 
 from PIL import Image
 
+from aseprite_reader import profiling
 from aseprite_reader import utils
-from aseprite_reader.composite import composite
+from aseprite_reader.composite import composite_into
 
 if TYPE_CHECKING:
     from aseprite_reader import AsepriteFile
@@ -13,34 +18,293 @@ if TYPE_CHECKING:
     from aseprite_reader.frame import Frame
 
 
-def frame_to_image(aseprite_file: AsepriteFile, frame: Frame) -> Image.Image:
-    """ Produce an image from frame data. """
+DecodedCels = dict[Any, Future]
+
+# Marks the end of the frames produced by a prefetching iterator
+_END_OF_FRAMES = object()
+
+# Pixel formats for raw buffers (named like Pillow's raw modes; a lowercase 'a' means premultiplied alpha)
+PIXEL_FORMATS = ("RGBA", "BGRA", "RGBa", "BGRa")
+
+
+def frame_to_image(
+        aseprite_file: AsepriteFile,
+        frame: Frame,
+        executor: Optional[Executor] = None,
+        target: Optional[Image.Image] = None,
+        layers: Optional[list[LayerChunk]] = None
+) -> Image.Image:
+    """ Produce an image from frame data.
+    If an executor is given, the cels of the frame are decoded on it concurrently, then composited in layer order on
+    the calling thread. zlib releases the GIL while decompressing, so a thread pool works well.
+    If a target image is given, the frame is rendered into it (replacing its contents) and it is returned, so the same
+    image can be reused for every frame of a sequence.
+    If layers are given, only those layers are composited (in the order given), instead of the rendered layers.
+    """
+    decoded_cels = decode_cels(aseprite_file, [frame], executor, layers) if executor else None
+    return _composite_frame(aseprite_file, frame, decoded_cels, target, layers)
+
+
+def frames_to_images(
+        aseprite_file: AsepriteFile,
+        frames: Iterable[Frame],
+        executor: Optional[Executor] = None
+) -> list[Image.Image]:
+    """ Produce an image from each frame in a batch.
+    If an executor is given, the cels of every frame in the batch are decoded on it concurrently (cels that are
+    linked between frames are only decoded once), then each frame is composited in order on the calling thread.
+    """
+    frames = list(frames)
+    decoded_cels = decode_cels(aseprite_file, frames, executor) if executor else None
+    return [_composite_frame(aseprite_file, frame, decoded_cels) for frame in frames]
+
+
+def frame_to_buffer(
+        aseprite_file: AsepriteFile,
+        frame: Frame,
+        pixel_format: str = "RGBA",
+        row_alignment: int = 1,
+        out: Optional[Any] = None
+) -> bytes | memoryview:
+    """ Produce raw pixel data from frame data, e.g. for pygame.image.frombuffer or a texture upload.
+    See image_to_buffer for the layout of the data.
+    """
+    return image_to_buffer(frame_to_image(aseprite_file, frame), pixel_format, row_alignment, out)
+
+
+def image_to_buffer(
+        image: Image.Image,
+        pixel_format: str = "RGBA",
+        row_alignment: int = 1,
+        out: Optional[Any] = None
+) -> bytes | memoryview:
+    """ Get the raw pixel data of an RGBA image.
+    pixel_format: The order of the 4 bytes of each pixel (one of PIXEL_FORMATS). 'RGBa' and 'BGRa' have the color
+        channels premultiplied by alpha.
+    row_alignment: Each row starts at a multiple of this many bytes, with padding added at the end of rows as needed.
+    out: A writable buffer (e.g. a bytearray) to write the data into. A memoryview of the written part is returned.
+    If no buffer is given, bytes are returned, or a memoryview of a new buffer if rows needed padding.
+    """
+    if pixel_format not in PIXEL_FORMATS:
+        raise RuntimeError(f"Unsupported pixel format: {pixel_format} (expected one of {', '.join(PIXEL_FORMATS)})")
+    if row_alignment < 1:
+        raise RuntimeError(f"Invalid row alignment: {row_alignment}")
+
+    if pixel_format in ("RGBa", "BGRa"):
+        image = image.convert("RGBa")
+    data = image.tobytes("raw", pixel_format)
+
+    row_size = image.width * 4
+    stride = -(-row_size // row_alignment) * row_alignment
+    size = stride * image.height
+
+    if out is None:
+        if stride == row_size:
+            return data
+        out = bytearray(size)
+
+    view = memoryview(out).cast("B")
+    if len(view) < size:
+        raise RuntimeError(f"Buffer is too small for the pixel data ({len(view)} bytes, {size} needed).")
+
+    if stride == row_size:
+        view[:size] = data
+    else:
+        for y in range(image.height):
+            view[y * stride:y * stride + row_size] = data[y * row_size:(y + 1) * row_size]
+
+    return view[:size]
+
+
+def iter_frame_images(
+        aseprite_file: AsepriteFile,
+        frames: Iterable[Frame],
+        prefetch: int = 2,
+        executor: Optional[Executor] = None
+) -> Iterator[Image.Image]:
+    """ Produce an image from each frame in a sequence, rendering ahead on a background thread.
+    While the caller works with one frame (e.g. encoding or uploading it), up to 'prefetch' of the following frames
+    are rendered and kept waiting. Set 'prefetch' to 0 to render each frame on the calling thread when it's requested.
+    If an executor is given, the background thread uses it to decode cels (see frame_to_image).
+    """
+    if prefetch < 1:
+        for frame in frames:
+            yield frame_to_image(aseprite_file, frame, executor)
+        return
+
+    rendered = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+
+    def _produce() -> None:
+        try:
+            for f in frames:
+                if not _put(rendered, (frame_to_image(aseprite_file, f, executor), None), stop):
+                    return
+            _put(rendered, (_END_OF_FRAMES, None), stop)
+        except BaseException as e:
+            _put(rendered, (None, e), stop)
+
+    producer = threading.Thread(target=_produce, name="aseprite-reader-prefetch", daemon=True)
+    producer.start()
+    try:
+        while True:
+            image, exception = rendered.get()
+            if exception:
+                raise exception
+            if image is _END_OF_FRAMES:
+                return
+            yield image
+    finally:
+        # Stop the producer if the caller stops iterating early
+        stop.set()
+
+
+def _put(q: queue.Queue, item: Any, stop: threading.Event) -> bool:
+    """ Put an item on a bounded queue, waiting for space unless 'stop' is set.
+    Returns False if the item wasn't added because 'stop' was set.
+    """
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+
+    return False
+
+
+def decode_cels(
+        aseprite_file: AsepriteFile,
+        frames: Iterable[Frame],
+        executor: Executor,
+        layers: Optional[list[LayerChunk]] = None
+) -> DecodedCels:
+    """ Start decoding the compressed image cels of the rendered layers (or the given layers) on a set of frames.
+    A dict of {key: Future} is returned, with a future for each cel that holds image data (see decoded_cel_key).
+    """
+    layers = rendered_layers(aseprite_file, layers)
+    decoded_cels = {}
+    for frame in frames:
+        for layer in layers:
+            if layer.layer_type != 0:
+                continue
+
+            cel = aseprite_file.cel(frame, layer)
+            if not cel:
+                continue
+
+            cel = aseprite_file.resolve_cel(cel)
+            key = decoded_cel_key(aseprite_file, frame, cel)
+            if cel.cel_type == 2 and key not in decoded_cels:
+                frame_number = palette_frame_number(aseprite_file, frame)
+                decoded_cels[key] = executor.submit(decode_cel, aseprite_file, cel, frame_number)
+
+    return decoded_cels
+
+
+def decoded_cel_key(aseprite_file: AsepriteFile, frame: Frame, cel: CelChunk) -> Any:
+    """ Get a key for the decoded pixels of a cel on a frame.
+    Indexed cels are converted with the palette of the frame, so they are only shared by frames with the same palette.
+    """
+    if aseprite_file.header.color_depth != 8:
+        return cel
+
+    return cel, aseprite_file.palette_timeline.version(aseprite_file.frame_number(frame))
+
+
+def palette_frame_number(aseprite_file: AsepriteFile, frame: Frame) -> int:
+    """ Get the number of the frame whose palette the cels of a frame are converted with. """
+    if aseprite_file.header.color_depth != 8:
+        return 1
+
+    return aseprite_file.frame_number(frame)
+
+
+def rendered_layers(aseprite_file: AsepriteFile, layers: Optional[list[LayerChunk]] = None) -> list[LayerChunk]:
+    """ Get the layers that are rendered, from background to foreground.
+    If layers are given (a layer selection, as passed to frame_to_image), they are the layers that are rendered.
+    """
+    if layers is not None:
+        return list(layers)
+
+    # Only render visible layers with a "child level" of 0 (i.e. have no parents)
+    return [layer for layer in aseprite_file.layers if layer.visible and layer.layer_child_level == 0]
+
+
+def _composite_frame(
+        aseprite_file: AsepriteFile,
+        frame: Frame,
+        decoded_cels: Optional[DecodedCels],
+        target: Optional[Image.Image] = None,
+        layers: Optional[list[LayerChunk]] = None
+) -> Image.Image:
+    """ Composite the layers of a frame, using decoded cels where they are available.
+    Cels are composited within their bounds, so no full-size image is created for each layer.
+    """
+    with profiling.scope(aseprite_file, frame), profiling.stage(profiling.RENDER_FRAME):
+        return _composite_layers(aseprite_file, frame, decoded_cels, target, layers)
+
+
+def _composite_layers(
+        aseprite_file: AsepriteFile,
+        frame: Frame,
+        decoded_cels: Optional[DecodedCels],
+        target: Optional[Image.Image],
+        layers: Optional[list[LayerChunk]] = None
+) -> Image.Image:
+    """ Composite the layers of a frame into a new image, or into a target image. """
     # Initialize frame image
-    frame_image = Image.new(mode="RGBA", size=(aseprite_file.header.width, aseprite_file.header.height))
+    size = (aseprite_file.header.width, aseprite_file.header.height)
+    if target is None:
+        frame_image = Image.new(mode="RGBA", size=size)
+    elif target.mode != "RGBA" or target.size != size:
+        raise RuntimeError(f"Target image must be an RGBA image of size {size} (got {target.mode} {target.size}).")
+    else:
+        frame_image = target
+        frame_image.paste((0, 0, 0, 0), (0, 0) + size)
 
     # Render layers from background to foreground
-    for layer in aseprite_file.layers:
-        # Only render visible layers with a "child level" of 0 (i.e. have no parents)
-        if layer.visible and layer.layer_child_level == 0:
-            # Render image for layer
-            layer_image = layer_to_image(aseprite_file, frame, layer)
-
-            # An image may not have been created if there was no data in the cel
-            if not layer_image:
+    for layer in rendered_layers(aseprite_file, layers):
+        opacity = layer_opacity(aseprite_file, layer)
+
+        if layer.layer_type == 0:
+            cel = aseprite_file.cel(frame, layer)
+            if not cel:
                 continue
 
-            # Get layer opacity
-            if aseprite_file.header.layer_opacity_has_valid_value:
-                layer_opacity = layer.opacity
-            else:
-                layer_opacity = 255
+            # Composite compressed image cels directly from their pixels
+            source_cel = aseprite_file.resolve_cel(cel)
+            if source_cel.cel_type == 2:
+                key = decoded_cel_key(aseprite_file, frame, source_cel)
+                if decoded_cels is not None and key in decoded_cels:
+                    cel_pixels = decoded_cels[key].result()
+                else:
+                    cel_pixels = decode_cel(aseprite_file, source_cel, palette_frame_number(aseprite_file, frame))
+                position = (source_cel.x_position, source_cel.y_position)
+                composite_into(frame_image, cel_pixels, position, layer.blend_mode, opacity)
+                continue
+
+        # Render image for layer
+        layer_image = layer_to_image(aseprite_file, frame, layer)
+
+        # An image may not have been created if there was no data in the cel
+        if not layer_image:
+            continue
 
-            # Composite layer image onto frame image
-            frame_image = composite(frame_image, layer_image, layer.blend_mode, layer_opacity)
+        # Composite layer image onto frame image
+        composite_into(frame_image, layer_image, (0, 0), layer.blend_mode, opacity)
 
     return frame_image
 
 
+def layer_opacity(aseprite_file: AsepriteFile, layer: LayerChunk) -> int:
+    """ Get the opacity a layer is composited with. """
+    if aseprite_file.header.layer_opacity_has_valid_value:
+        return layer.opacity
+    else:
+        return 255
+
+
 def layer_to_image(aseprite_file: AsepriteFile, frame: Frame, layer: LayerChunk) -> Optional[Image.Image]:
     """ Produce an image from layer data. """
     match layer.layer_type:
@@ -94,32 +358,54 @@ def _raw_image_cel_to_image(aseprite_file: AsepriteFile, frame: Frame, layer: La
 
 def _linked_cel_to_image(aseprite_file: AsepriteFile, frame: Frame, layer: LayerChunk, cel: CelChunk) -> Image.Image:
     """ Produce an image from a linked cel. """
-    raise NotImplementedError("Linked cel rendering is not implemented.")
+    linked_cel = aseprite_file.resolve_cel(cel)
+    return cel_to_image(aseprite_file, frame, layer, linked_cel)
 
 
 def _image_cel_to_image(aseprite_file: AsepriteFile, frame: Frame, layer: LayerChunk, cel: CelChunk) -> Image.Image:
     """ Produce an image from a compressed image cel. """
-    # Create new image
+    cel_pixels = decode_cel(aseprite_file, cel, palette_frame_number(aseprite_file, frame))
+    return _place_cel_image(aseprite_file, cel, cel_pixels)
+
+
+def decode_cel(aseprite_file: AsepriteFile, cel: CelChunk, frame_number: int = 1) -> Image.Image:
+    """ Decompress a compressed image cel into an image the size of the cel.
+    Indexed cels are converted with the palette of the frame number (the first frame by default).
+    """
+    with profiling.stage(profiling.INFLATE) as stage:
+        image_data = zlib.decompress(cel.compressed_image_data)
+        stage.size = len(image_data)
+
+    with profiling.stage(profiling.PIXEL_CONVERSION):
+        return utils.image_data_to_image(aseprite_file, cel.width, cel.height, image_data, frame_number)
+
+
+def decode_cel_rows(
+        aseprite_file: AsepriteFile,
+        cel: CelChunk,
+        upper: int,
+        lower: int,
+        frame_number: int = 1
+) -> Image.Image:
+    """ Decompress rows 'upper' to 'lower' (not included) of a compressed image cel into an image the width of the cel.
+    Decompression stops after the last row that is needed, and only the needed rows are converted.
+    Indexed cels are converted with the palette of the frame number (the first frame by default).
+    """
+    row_size = cel.width * (aseprite_file.header.color_depth // 8)
+
+    with profiling.stage(profiling.INFLATE) as stage:
+        image_data = zlib.decompressobj().decompress(cel.compressed_image_data, lower * row_size)
+        stage.size = len(image_data)
+
+    with profiling.stage(profiling.PIXEL_CONVERSION):
+        return utils.image_data_to_image(aseprite_file, cel.width, lower - upper, image_data[upper * row_size:],
+                                         frame_number)
+
+
+def _place_cel_image(aseprite_file: AsepriteFile, cel: CelChunk, cel_pixels: Image.Image) -> Image.Image:
+    """ Produce a full-size image with the pixels of a cel written at the cel position. """
     cel_image = Image.new(mode="RGBA", size=(aseprite_file.header.width, aseprite_file.header.height))
-
-    # Decompress image data
-    image_data = utils.decompress_image_data(cel.compressed_image_data)
-    pixels = utils.image_data_to_pixels(aseprite_file, image_data)
-
-    # Write pixel data from cel to image
-    for index, pixel in enumerate(pixels):
-        # Convert position in 1D array to 2D grid
-        x = index % cel.width
-        y = int(index / cel.width)
-
-        # Apply cel position offset
-        i = x + cel.x_position
-        j = y + cel.y_position
-
-        # Write pixel
-        if 0 <= i < cel_image.width and 0 <= j < cel_image.height:
-            cel_image.putpixel((i, j), pixel)
-
+    cel_image.paste(cel_pixels, (cel.x_position, cel.y_position))
     return cel_image
 
 
@@ -0,0 +1,278 @@
+from __future__ import annotations
+import hashlib
+import os
+import shutil
+import struct
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, Optional, TYPE_CHECKING
+
+from PIL import Image
+
+from aseprite_reader import render
+from aseprite_reader import utils
+
+if TYPE_CHECKING:
+    from aseprite_reader import AsepriteFile
+    from aseprite_reader.frame import Frame
+
+
+# Change this whenever a change to the renderer would produce different images for the same file
+CACHE_VERSION = 3
+
+
+class RenderCacheStats:
+    """ Statistics for a render cache. """
+    def __init__(self, hits: int, misses: int, writes: int, evictions: int, entry_count: int, size: int) -> None:
+        self._hits = hits
+        self._misses = misses
+        self._writes = writes
+        self._evictions = evictions
+        self._entry_count = entry_count
+        self._size = size
+
+    def __str__(self) -> str:
+        return (f"RenderCacheStats(hits={self.hits}, misses={self.misses}, writes={self.writes}, "
+                f"evictions={self.evictions}, entry_count={self.entry_count}, size={self.size})")
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    @property
+    def hits(self) -> int:
+        """ Number of lookups that found a cached frame. """
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        """ Number of lookups that didn't find a cached frame. """
+        return self._misses
+
+    @property
+    def writes(self) -> int:
+        """ Number of frames added to the cache. """
+        return self._writes
+
+    @property
+    def evictions(self) -> int:
+        """ Number of frames removed from the cache to stay within its maximum size. """
+        return self._evictions
+
+    @property
+    def entry_count(self) -> int:
+        """ Number of frames in the cache. """
+        return self._entry_count
+
+    @property
+    def size(self) -> int:
+        """ Total size of the cached frames (in bytes). """
+        return self._size
+
+    @property
+    def hit_rate(self) -> float:
+        """ Fraction of lookups that found a cached frame. """
+        lookups = self.hits + self.misses
+        if lookups == 0:
+            return 0.0
+        else:
+            return self.hits / lookups
+
+
+class RenderCache:
+    """ A content-addressed cache of rendered frames, stored as PNG files in a directory.
+    Frames are keyed by a hash of everything that affects the rendered image (the header fields, palette, layer
+    settings and cel payloads of the rendered layers) plus the render options, so a frame stays cached when the file
+    is saved again without changing it, and frames shared between files are only rendered once.
+    When the cache grows beyond 'max_size' bytes, the least recently used frames are removed.
+    """
+    def __init__(self, directory: str | Path, max_size: int = 1024 ** 3) -> None:
+        if isinstance(directory, str):
+            directory = Path(directory)
+
+        self._directory = directory
+        self._max_size = max_size
+        self._hits = 0
+        self._misses = 0
+        self._writes = 0
+        self._evictions = 0
+        self._size = None
+
+        self._directory.mkdir(parents=True, exist_ok=True)
+
+    def __str__(self) -> str:
+        return f"RenderCache({self._directory.as_posix()})"
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    @property
+    def directory(self) -> Path:
+        """ The directory that cached frames are stored in. """
+        return self._directory
+
+    @property
+    def max_size(self) -> int:
+        """ Maximum total size of the cached frames (in bytes). """
+        return self._max_size
+
+    @property
+    def stats(self) -> RenderCacheStats:
+        """ Statistics for this cache.
+        Hits, misses, writes and evictions are counted for this instance; the entry count and size are read from disk.
+        """
+        entries = self._entries()
+        return RenderCacheStats(
+            hits=self._hits,
+            misses=self._misses,
+            writes=self._writes,
+            evictions=self._evictions,
+            entry_count=len(entries),
+            size=sum(size for _, _, size in entries),
+        )
+
+    def frame_key(self, aseprite_file: AsepriteFile, frame: Frame, options: Optional[dict[str, Any]] = None) -> str:
+        """ Get the cache key for a frame rendered with a set of render options. """
+        return frame_fingerprint(aseprite_file, frame, options)
+
+    def get(self, key: str) -> Optional[Path]:
+        """ Get the path to a cached frame, or None if the frame isn't cached. """
+        path = self._path(key)
+        try:
+            # Mark the frame as recently used
+            os.utime(path)
+        except FileNotFoundError:
+            self._misses += 1
+            return None
+
+        self._hits += 1
+        return path
+
+    def put(self, key: str, image: Image.Image) -> Path:
+        """ Add a rendered frame to the cache. """
+        return self._store(key, lambda temp_file: image.save(temp_file, format="PNG"))
+
+    def put_file(self, key: str, png_file: Path) -> Path:
+        """ Add a rendered frame that has already been saved as a PNG file to the cache. """
+        return self._store(key, lambda temp_file: shutil.copyfile(png_file, temp_file))
+
+    def render(self, aseprite_file: AsepriteFile, frame: Frame) -> Image.Image:
+        """ Produce an image from frame data, using the cache if the frame has been rendered before. """
+        key = self.frame_key(aseprite_file, frame)
+        path = self.get(key)
+        if path:
+            image = Image.open(path)
+            image.load()
+            return image
+
+        image = render.frame_to_image(aseprite_file, frame)
+        self.put(key, image)
+        return image
+
+    def clear(self) -> None:
+        """ Remove every frame from the cache. """
+        for path, _, _ in self._entries():
+            path.unlink(missing_ok=True)
+
+        self._size = 0
+
+    def _path(self, key: str) -> Path:
+        """ The path to a cached frame. """
+        return self._directory / key[:2] / f"{key}.png"
+
+    def _store(self, key: str, write: Callable[[str], Any]) -> Path:
+        """ Write a cache entry through a temporary file, so readers never see partially written frames. """
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+
+        fd, temp_file = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        os.close(fd)
+        try:
+            write(temp_file)
+
+            # The entry may already be cached (e.g. by a concurrent render), in which case it is replaced
+            try:
+                replaced_size = path.stat().st_size
+            except FileNotFoundError:
+                replaced_size = 0
+            os.replace(temp_file, path)
+        except BaseException:
+            Path(temp_file).unlink(missing_ok=True)
+            raise
+
+        self._writes += 1
+
+        # Keep a running total of the cache size, so the directory is only scanned when it might need evicting
+        if self._size is None:
+            self._size = sum(size for _, _, size in self._entries())
+        else:
+            self._size += path.stat().st_size - replaced_size
+        if self._size > self._max_size:
+            self._evict()
+
+        return path
+
+    def _entries(self) -> list[tuple[Path, float, int]]:
+        """ Get every cached frame.
+        A list of (path, last_used_time, size) is returned.
+        """
+        entries = []
+        for path in self._directory.glob("*/*.png"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((path, stat.st_mtime, stat.st_size))
+
+        return entries
+
+    def _evict(self) -> None:
+        """ Remove the least recently used frames until the cache is within its maximum size. """
+        entries = self._entries()
+        size = sum(size for _, _, size in entries)
+
+        entries.sort(key=lambda entry: entry[1])
+        for path, _, entry_size in entries:
+            if size <= self._max_size:
+                break
+            path.unlink(missing_ok=True)
+            size -= entry_size
+            self._evictions += 1
+
+        self._size = size
+
+
+def frame_fingerprint(aseprite_file: AsepriteFile, frame: Frame, options: Optional[dict[str, Any]] = None) -> str:
+    """ Hash everything that affects how a frame is rendered.
+    Frames with the same fingerprint produce the same image, even if they come from different files.
+    """
+    h = hashlib.sha256()
+    h.update(struct.pack('<I', CACHE_VERSION))
+
+    # Header fields that affect rendering
+    header = aseprite_file.header
+    h.update(struct.pack('<HHHIB', header.width, header.height, header.color_depth, header.flags,
+                         header.transparent_color_index))
+
+    # Palette of the frame (only used for indexed sprites)
+    if header.color_depth == 8:
+        h.update(utils.indexed_palette_data(aseprite_file, aseprite_file.frame_number(frame)))
+
+    # Layer settings and cel payloads of the rendered layers
+    for layer in render.rendered_layers(aseprite_file):
+        h.update(struct.pack('<HHB', layer.layer_type, layer.blend_mode, render.layer_opacity(aseprite_file, layer)))
+        cel = aseprite_file.cel(frame, layer)
+        if not cel:
+            h.update(b'\0')
+            continue
+
+        cel = aseprite_file.resolve_cel(cel)
+        h.update(struct.pack('<BHhhB', 1, cel.cel_type, cel.x_position, cel.y_position, cel.opacity_level))
+        for data in (cel.width, cel.height, cel.width_tiles, cel.height_tiles):
+            h.update(struct.pack('<i', -1 if data is None else data))
+        # The digest of the cel data is computed once per cel, so evicted data isn't read again on every frame
+        h.update(cel.payload_digest or b'')
+
+    # Render options
+    h.update(repr(sorted((options or {}).items())).encode("utf-8"))
+
+    return h.hexdigest()
@@ -0,0 +1,53 @@
+from __future__ import annotations
+from typing import Iterable, TYPE_CHECKING
+
+from PIL import Image
+
+from aseprite_reader import profiling
+
+if TYPE_CHECKING:
+    from aseprite_reader import AsepriteFile
+
+
+def scale_factors(aseprite_file: AsepriteFile, scale: int, correct_aspect: bool = False) -> tuple[int, int]:
+    """ Get the (x, y) factors that rendered frames are scaled by.
+    If 'correct_aspect' is set and the file has non-square pixels, each axis is also multiplied by its side of the
+    pixel ratio (e.g. a 2:1 pixel ratio doubles the width), as Aseprite shows them.
+    """
+    if scale < 1:
+        raise RuntimeError(f"Invalid scale: {scale}")
+
+    header = aseprite_file.header
+    if not correct_aspect or header.pixel_width == 0 or header.pixel_height == 0:
+        return scale, scale
+
+    return scale * header.pixel_width, scale * header.pixel_height
+
+
+def scale_image(
+        aseprite_file: AsepriteFile,
+        image: Image.Image,
+        scale: int,
+        correct_aspect: bool = False
+) -> Image.Image:
+    """ Scale a rendered image by a whole number, with nearest-neighbor sampling so pixels stay sharp.
+    The image is returned as it is if it doesn't need scaling.
+    """
+    factor_x, factor_y = scale_factors(aseprite_file, scale, correct_aspect)
+    if factor_x == 1 and factor_y == 1:
+        return image
+
+    with profiling.stage(profiling.SCALE):
+        return image.resize((image.width * factor_x, image.height * factor_y), Image.Resampling.NEAREST)
+
+
+def scale_images(
+        aseprite_file: AsepriteFile,
+        image: Image.Image,
+        scales: Iterable[int],
+        correct_aspect: bool = False
+) -> dict[int, Image.Image]:
+    """ Scale a rendered image by several whole numbers, so every size comes from the same composite.
+    A dict of {scale: Image} is returned.
+    """
+    return {scale: scale_image(aseprite_file, image, scale, correct_aspect) for scale in scales}
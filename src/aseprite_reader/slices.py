@@ -0,0 +1,193 @@
+from __future__ import annotations
+import json
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, TYPE_CHECKING
+
+from PIL import Image
+
+from aseprite_reader import profiling
+from aseprite_reader import region_render
+from aseprite_reader import utils
+from aseprite_reader.boxes import Box
+
+if TYPE_CHECKING:
+    from aseprite_reader import AsepriteFile
+    from aseprite_reader.chunks import SliceChunk
+
+
+SLICES_FILE_NAME = "slices.json"
+
+
+class SliceImage:
+    """ The pixels of a slice on one frame, with its bounds, 9-patch center and pivot. """
+    def __init__(
+            self,
+            slice_chunk: SliceChunk,
+            frame_number: int,
+            bounds: Box,
+            center: Optional[Box],
+            pivot: Optional[tuple[int, int]],
+            image: Image.Image
+    ) -> None:
+        self._slice_chunk = slice_chunk
+        self._frame_number = frame_number
+        self._bounds = bounds
+        self._center = center
+        self._pivot = pivot
+        self._image = image
+
+    def __str__(self) -> str:
+        return f"SliceImage({self.name}, frame {self.frame_number})"
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    @property
+    def slice_chunk(self) -> SliceChunk:
+        """ The slice. """
+        return self._slice_chunk
+
+    @property
+    def name(self) -> str:
+        """ The slice name. """
+        return self._slice_chunk.name
+
+    @property
+    def frame_number(self) -> int:
+        """ The frame number (starting from 1). """
+        return self._frame_number
+
+    @property
+    def bounds(self) -> Box:
+        """ The bounds (left, upper, right, lower) of the slice on the canvas. """
+        return self._bounds
+
+    @property
+    def center(self) -> Optional[Box]:
+        """ The center (left, upper, right, lower) of a 9-patches slice, relative to the slice image. """
+        return self._center
+
+    @property
+    def pivot(self) -> Optional[tuple[int, int]]:
+        """ The pivot (x, y) of the slice, relative to the slice image. """
+        return self._pivot
+
+    @property
+    def image(self) -> Image.Image:
+        """ The pixels of the slice. """
+        return self._image
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "frame": self.frame_number,
+            "bounds": list(self.bounds),
+            "center": list(self.center) if self.center else None,
+            "pivot": list(self.pivot) if self.pivot else None,
+        }
+
+
+def iter_slice_images(
+        aseprite_file: AsepriteFile,
+        frame_numbers: Optional[Iterable[int]] = None,
+        slices: Optional[Iterable[SliceChunk]] = None
+) -> Iterator[SliceImage]:
+    """ Crop every slice (all slices by default) from every frame (all frames by default).
+    Each frame is rendered once, and only the region covering the slices on it is composited, however many slices
+    there are. Slices that aren't on a frame, or are hidden on it, are skipped.
+    """
+    if frame_numbers is None:
+        frame_numbers = [frame_number for frame_number, _ in aseprite_file.iter_frames()]
+    if slices is None:
+        slices = aseprite_file.slices
+    slices = list(slices)
+
+    for frame_number in frame_numbers:
+        slice_bounds = []
+        for slice_chunk in slices:
+            bounds = slice_chunk.bounds(frame_number - 1)
+            if bounds is not None:
+                slice_bounds.append((slice_chunk, bounds))
+
+        if not slice_bounds:
+            continue
+
+        # Render the region covering every slice on the frame once, and crop each slice from it
+        region = (
+            min(bounds[0] for _, bounds in slice_bounds),
+            min(bounds[1] for _, bounds in slice_bounds),
+            max(bounds[2] for _, bounds in slice_bounds),
+            max(bounds[3] for _, bounds in slice_bounds),
+        )
+        frame = aseprite_file.frame(frame_number)
+        region_image = region_render.render_region(aseprite_file, frame, region)
+
+        for slice_chunk, bounds in slice_bounds:
+            slice_key = slice_chunk.key(frame_number - 1)
+            center = None
+            if slice_chunk.nine_patch:
+                center = (slice_key.center_x, slice_key.center_y, slice_key.center_x + slice_key.center_w,
+                          slice_key.center_y + slice_key.center_h)
+            pivot = (slice_key.pivot_x, slice_key.pivot_y) if slice_chunk.has_pivot else None
+
+            crop_box = (bounds[0] - region[0], bounds[1] - region[1], bounds[2] - region[0], bounds[3] - region[1])
+            yield SliceImage(slice_chunk, frame_number, bounds, center, pivot, region_image.crop(crop_box))
+
+
+def export_slices(
+        aseprite_file: AsepriteFile,
+        output_dir: Path,
+        frame_numbers: Optional[Iterable[int]] = None,
+        slices: Optional[Iterable[SliceChunk]] = None,
+        overwrite: bool = False
+) -> list[Path]:
+    """ Write every slice on every frame as a PNG image, with their bounds, 9-patch centers and pivots.
+    Each slice is written to '<output_dir>/<slice name>/<frame number>.png', and the metadata of every image is
+    written to '<output_dir>/slices.json'. Slice names are made safe to use as directory names (see utils.file_name).
+    Every output file is checked before anything is written. The paths of the images that were written are returned.
+    """
+    if frame_numbers is None:
+        frame_numbers = [frame_number for frame_number, _ in aseprite_file.iter_frames()]
+    frame_numbers = list(frame_numbers)
+    if slices is None:
+        slices = aseprite_file.slices
+    slices = list(slices)
+
+    output_files = [output_dir / SLICES_FILE_NAME]
+    for frame_number in frame_numbers:
+        for slice_chunk in slices:
+            if slice_chunk.bounds(frame_number - 1) is not None:
+                output_file = _slice_file(output_dir, slice_chunk, frame_number)
+                if output_file in output_files:
+                    raise RuntimeError(f"Slice '{slice_chunk.name}' has the same output file as another slice: "
+                                       f"{output_file.as_posix()}")
+                output_files.append(output_file)
+
+    for output_file in output_files:
+        if output_file.exists() and not overwrite:
+            raise FileExistsError(f"Can't overwrite existing file: {output_file.as_posix()}")
+
+    exported = []
+    entries = []
+    for slice_image in iter_slice_images(aseprite_file, frame_numbers, slices):
+        output_file = _slice_file(output_dir, slice_image.slice_chunk, slice_image.frame_number)
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        with profiling.scope(aseprite_file, frame_number=slice_image.frame_number):
+            with profiling.stage(profiling.PNG_ENCODE):
+                slice_image.image.save(output_file)
+
+        entry = slice_image.to_dict()
+        entry["file"] = output_file.relative_to(output_dir).as_posix()
+        entries.append(entry)
+        exported.append(output_file)
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with output_files[0].open('w') as f:
+        json.dump({"slices": entries}, f, indent=2)
+
+    return exported
+
+
+def _slice_file(output_dir: Path, slice_chunk: SliceChunk, frame_number: int) -> Path:
+    """ Get the path that the image of a slice on a frame is written to. """
+    return output_dir / utils.file_name(slice_chunk.name) / f"{frame_number}.png"
@@ -0,0 +1,127 @@
+from __future__ import annotations
+import bisect
+from typing import Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from aseprite_reader import AsepriteFile
+    from aseprite_reader.models import Tag
+
+
+class TagTimeline:
+    """ The playback sequence of a tag (or of every frame), with the time each step of the sequence ends at.
+    Frames are played according to the tag's loop animation direction and repeat count (see Tag.frame_sequence).
+    A timeline loops if its tag repeats forever (a repeat count of 0), and stops on its last frame otherwise.
+    """
+    def __init__(self, frame_numbers: list[int], durations: list[int], loop: bool) -> None:
+        self._frame_numbers = frame_numbers
+        self._end_times = []
+        self._loop = loop
+
+        # The time (in milliseconds) each step ends at, so the step playing at a time can be found with a binary search
+        end_time = 0
+        for duration in durations:
+            end_time += duration
+            self._end_times.append(end_time)
+
+    def __str__(self) -> str:
+        return f"TagTimeline({len(self.frame_numbers)} frames, {self.duration} ms)"
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    @property
+    def frame_numbers(self) -> list[int]:
+        """ The frame numbers (starting from 1) of the sequence, in the order they are played. """
+        return self._frame_numbers
+
+    @property
+    def end_times(self) -> list[int]:
+        """ The time (in milliseconds) each step of the sequence ends at. """
+        return self._end_times
+
+    @property
+    def duration(self) -> int:
+        """ The time (in milliseconds) the sequence takes to play once. """
+        return self._end_times[-1] if self._end_times else 0
+
+    @property
+    def loop(self) -> bool:
+        """ Whether the sequence starts again after it finishes. """
+        return self._loop
+
+    def step_at(self, time: int) -> int:
+        """ Get the position in the sequence that is playing at a time (in milliseconds from the start). """
+        if not self._end_times:
+            raise RuntimeError("The timeline has no frames.")
+        if time < 0:
+            raise RuntimeError(f"Invalid time: {time}")
+
+        if time >= self.duration:
+            if not self.loop or self.duration == 0:
+                return len(self._end_times) - 1
+            time %= self.duration
+
+        return bisect.bisect_right(self._end_times, time)
+
+    def frame_at(self, time: int) -> int:
+        """ Get the frame number (starting from 1) that is shown at a time (in milliseconds from the start). """
+        return self._frame_numbers[self.step_at(time)]
+
+    def finished(self, time: int) -> bool:
+        """ Whether a sequence that doesn't loop has finished playing at a time. """
+        return not self.loop and time >= self.duration
+
+
+class Timeline:
+    """ Precomputed playback timelines for the tags of a file, and an index of the tags that cover each frame.
+    Tag timelines are built the first time they are used, and kept. The frames of a tag are read if they were skipped
+    when the file was opened, because their durations are needed.
+    """
+    def __init__(self, aseprite_file: AsepriteFile) -> None:
+        self._aseprite_file = aseprite_file
+        self._tags = list(aseprite_file.tags)
+        self._tag_timelines = {}
+        self._file_timeline = None
+
+        # Split the frames into ranges where the same tags apply. Each range starts at a boundary, and holds the tags
+        # that cover it, so the tags on a frame are found with a binary search.
+        boundaries = sorted({tag.from_frame for tag in self._tags} | {tag.to_frame + 1 for tag in self._tags})
+        self._boundaries = boundaries
+        self._boundary_tags = [
+            tuple(tag for tag in self._tags if tag.from_frame <= boundary <= tag.to_frame)
+            for boundary in boundaries
+        ]
+
+    def tag_timeline(self, tag: Optional[Tag] = None) -> TagTimeline:
+        """ Get the timeline of a tag, or of every frame played forward (looping) if no tag is given. """
+        if tag is None:
+            if self._file_timeline is None:
+                frame_count = self._aseprite_file.header.frame_count
+                self._file_timeline = self._build_timeline(list(range(frame_count)), True)
+            return self._file_timeline
+
+        if tag not in self._tag_timelines:
+            self._tag_timelines[tag] = self._build_timeline(tag.frame_sequence(), tag.repeat == 0)
+        return self._tag_timelines[tag]
+
+    def frame_at(self, tag: Optional[Tag], time: int) -> int:
+        """ Get the frame number (starting from 1) that a tag (or every frame, if no tag is given) shows at a time
+        (in milliseconds from the start of the animation).
+        """
+        return self.tag_timeline(tag).frame_at(time)
+
+    def tags_at(self, frame_number: int) -> list[Tag]:
+        """ Get the tags that cover a frame number (starting from 1), in the order they are in the file. """
+        i = bisect.bisect_right(self._boundaries, frame_number - 1)
+        if i == 0:
+            return []
+
+        return list(self._boundary_tags[i - 1])
+
+    def _build_timeline(self, frame_indexes: list[int], loop: bool) -> TagTimeline:
+        durations = {frame_index: self._aseprite_file.frame(frame_index + 1).duration for frame_index in frame_indexes}
+        return TagTimeline(
+            [frame_index + 1 for frame_index in frame_indexes],
+            [durations[frame_index] for frame_index in frame_indexes],
+            loop
+        )
@@ -3,7 +3,7 @@ import struct
 import zlib
 from typing import IO, TYPE_CHECKING
 
-from aseprite_reader.chunks import PaletteChunk
+from PIL import Image
 
 if TYPE_CHECKING:
     from aseprite_reader import AsepriteFile
@@ -11,6 +11,9 @@ if TYPE_CHECKING:
 
 Color = tuple[int, int, int, int]
 
+# Characters that can't be used in file names (on every platform)
+INVALID_FILE_NAME_CHARACTERS = '<>:"/\\|?*'
+
 
 def read_byte(file: IO) -> int:
     """ Read a BYTE.
@@ -76,15 +79,21 @@ def decompress_image_data(compressed_data: bytes) -> tuple[int]:
     return tuple(decompressed_data)
 
 
-def image_data_to_pixels(aseprite_file: AsepriteFile, decompressed_data: tuple[int]) -> tuple[Color]:
-    """ Convert decompressed image data into an array of pixels. """
+def image_data_to_pixels(
+        aseprite_file: AsepriteFile,
+        decompressed_data: tuple[int],
+        frame_number: int = 1
+) -> tuple[Color]:
+    """ Convert decompressed image data into an array of pixels.
+    Indexed image data is converted with the palette of the frame number (the first frame by default).
+    """
     match aseprite_file.header.color_depth:
         case 32:
             return _image_data_to_pixels_rgba(decompressed_data)
         case 16:
             return _image_data_to_pixels_grayscale(decompressed_data)
         case 8:
-            return _image_data_to_pixels_indexed(aseprite_file, decompressed_data)
+            return _image_data_to_pixels_indexed(aseprite_file, decompressed_data, frame_number)
         case _:
             raise RuntimeError(f"Invalid color depth: {aseprite_file.header.color_depth}")
 
@@ -111,32 +120,69 @@ def _image_data_to_pixels_grayscale(decompressed_data: tuple[int]) -> tuple[Colo
     return tuple(pixels)  # noqa
 
 
-def _image_data_to_pixels_indexed(aseprite_file: AsepriteFile, decompressed_data: tuple[int]) -> tuple[Color]:
+def _image_data_to_pixels_indexed(
+        aseprite_file: AsepriteFile,
+        decompressed_data: tuple[int],
+        frame_number: int
+) -> tuple[Color]:
     """ Convert indexed image data to pixels. """
     pixels = []
 
-    # Get palette colors
-    palette = None
-    first_frame = aseprite_file.frame(1)
-    for chunk in first_frame.chunks:
-        if isinstance(chunk, PaletteChunk):
-            palette = chunk
-            break
-
-    # Make sure that we found a palette
-    if not palette:
-        raise RuntimeError("Error reading indexed colors: could not find palette chunk.")
+    # Get the palette colors of the frame, with palette changes in earlier frames applied
+    colors = aseprite_file.palette_timeline.colors(frame_number)
 
     for i in decompressed_data:
-        if i == aseprite_file.header.transparent_color_index:
+        if i == aseprite_file.header.transparent_color_index or i >= len(colors):
             pixels.append((0, 0, 0, 0))
         else:
-            color = palette.palette_colors[i]
-            pixels.append((color.r, color.g, color.b, color.a))
+            pixels.append(colors[i])
 
     return tuple(pixels)  # noqa
 
 
+def image_data_to_image(
+        aseprite_file: AsepriteFile,
+        width: int,
+        height: int,
+        decompressed_data: bytes,
+        frame_number: int = 1
+) -> Image.Image:
+    """ Convert decompressed image data into an RGBA image.
+    This produces the same pixels as image_data_to_pixels, but the conversion is done by Pillow.
+    Indexed image data is converted with the palette of the frame number (the first frame by default).
+    """
+    match aseprite_file.header.color_depth:
+        case 32:
+            return Image.frombytes("RGBA", (width, height), decompressed_data)
+        case 16:
+            return Image.frombytes("LA", (width, height), decompressed_data).convert("RGBA")
+        case 8:
+            image = Image.frombytes("P", (width, height), decompressed_data)
+            image.putpalette(indexed_palette_data(aseprite_file, frame_number), rawmode="RGBA")
+            return image.convert("RGBA")
+        case _:
+            raise RuntimeError(f"Invalid color depth: {aseprite_file.header.color_depth}")
+
+
+def indexed_palette_data(aseprite_file: AsepriteFile, frame_number: int = 1) -> bytes:
+    """ Get the palette of an indexed sprite on a frame number (the first frame by default) as 256 RGBA entries, with
+    the transparent color index cleared.
+    """
+    return aseprite_file.palette_timeline.palette_data(frame_number)
+
+
+def file_name(name: str) -> str:
+    """ Make a name (e.g. of a slice or tag) safe to use as a file or directory name.
+    Path separators and other characters that can't be used in file names are replaced with '_', as are the dots of a
+    name made only of dots (e.g. '..'), so the name can't point outside of the directory it is used in.
+    """
+    name = "".join("_" if c in INVALID_FILE_NAME_CHARACTERS or ord(c) < 32 else c for c in name)
+    if not name.strip("."):
+        name = "_" * max(len(name), 1)
+
+    return name
+
+
 def flag_is_set(flags: int, flag: int) -> bool:
     """ Check if a flag is set. """
     return flags & flag != 0
@@ -0,0 +1,172 @@
+from __future__ import annotations
+import struct
+from pathlib import Path
+from typing import IO, Optional, TYPE_CHECKING
+
+from aseprite_reader.chunks import CelChunk
+
+if TYPE_CHECKING:
+    from aseprite_reader import AsepriteFile
+    from aseprite_reader.chunk import Chunk
+    from aseprite_reader.header import Header
+
+
+ASEPRITE_MAGIC_NUMBER = 0xa5e0
+FRAME_MAGIC_NUMBER = 0xf1fa
+
+
+def write(aseprite_file: AsepriteFile, output_file: Path) -> None:
+    """ Write an Aseprite file.
+    Every frame is written, including frames that were skipped when the file was opened.
+    Cel chunks are written from their parsed fields; every other chunk is copied from the source file as it is.
+    """
+    check_output_file(aseprite_file, output_file)
+
+    with aseprite_file.file_path.open('rb') as source, output_file.open('wb') as f:
+        writer = AsepriteWriter(f, aseprite_file.header)
+        for frame_number in range(1, aseprite_file.header.frame_count + 1):
+            frame = aseprite_file.frame(frame_number)
+            chunks = [
+                encode_cel_chunk(chunk) if isinstance(chunk, CelChunk) else read_chunk(source, chunk)
+                for chunk in frame.chunks
+            ]
+            writer.add_frame(chunks, frame.duration)
+        writer.close()
+
+
+def check_output_file(aseprite_file: AsepriteFile, output_file: Path) -> None:
+    """ Make sure a file isn't written over its own source.
+    Chunks are copied from the source file while the output is written, and payloads that were evicted are read from
+    it again later, so the source file must be left as it is.
+    """
+    if output_file.resolve() == aseprite_file.file_path.resolve():
+        raise RuntimeError(f"Can't write {aseprite_file} over its own source file.")
+
+
+class AsepriteWriter:
+    """ Writes an Aseprite file one frame at a time.
+    The file must be seekable, because the file size and frame count are written in the header once every frame has
+    been added.
+    """
+    def __init__(self, file: IO, header: Header) -> None:
+        self._file = file
+        self._header = header
+        self._start = file.tell()
+        self._frame_count = 0
+
+        self._write_header()
+
+    def add_frame(self, chunks: list[bytes], duration: int) -> None:
+        """ Write a frame made of encoded chunks, that is displayed for a duration (in milliseconds). """
+        data = b"".join(chunks)
+        old_chunk_count = len(chunks) if len(chunks) < 0xffff else 0xffff
+        self._file.write(struct.pack('<IHHH2xI', len(data) + 16, FRAME_MAGIC_NUMBER, old_chunk_count, duration,
+                                     len(chunks)))
+        self._file.write(data)
+        self._frame_count += 1
+
+    def close(self) -> None:
+        """ Finish the file by writing its size and frame count into the header. """
+        end = self._file.tell()
+        self._file.seek(self._start)
+        self._file.write(struct.pack('<IHH', end - self._start, ASEPRITE_MAGIC_NUMBER, self._frame_count))
+        self._file.seek(end)
+
+    def _write_header(self) -> None:
+        """ Write the header, with the file size and frame count left as 0 until the file is closed. """
+        header = self._header
+        self._file.write(struct.pack(
+            '<IHHHHHIH8xB3xHBBhhHH84x',
+            0,
+            ASEPRITE_MAGIC_NUMBER,
+            0,
+            header.width,
+            header.height,
+            header.color_depth,
+            header.flags,
+            header.speed,
+            header.transparent_color_index,
+            header.colors,
+            header.pixel_width,
+            header.pixel_height,
+            header.grid_x,
+            header.grid_y,
+            header.grid_width,
+            header.grid_height,
+        ))
+
+
+def read_chunk(file: IO, chunk: Chunk) -> bytes:
+    """ Read the bytes of a chunk (including its header) from its source file. """
+    file.seek(chunk.offset)
+    return file.read(chunk.size)
+
+
+def encode_chunk(chunk_type: int, data: bytes) -> bytes:
+    """ Encode a chunk from its type and data. """
+    return struct.pack('<IH', len(data) + 6, chunk_type) + data
+
+
+def encode_cel_chunk(cel: CelChunk, layer_index: Optional[int] = None) -> bytes:
+    """ Encode a cel chunk from its fields.
+    The layer index can be replaced, e.g. when layers before it are removed.
+    """
+    header = CelHeader.from_cel(cel, layer_index)
+
+    match cel.cel_type:
+        case 0:
+            return encode_raw_cel_chunk(header, cel.width, cel.height, cel.raw_pixel_data)
+        case 1:
+            return encode_linked_cel_chunk(header, cel.linked_frame_position)
+        case 2:
+            return encode_image_cel_chunk(header, cel.width, cel.height, cel.compressed_image_data)
+        case 3:
+            return encode_tilemap_cel_chunk(header, cel, cel.compressed_tile_data)
+        case _:
+            raise RuntimeError(f"Invalid cel type: {cel.cel_type}")
+
+
+def encode_raw_cel_chunk(header: CelHeader, width: int, height: int, pixel_data: bytes) -> bytes:
+    """ Encode a cel chunk with raw (uncompressed) image data. """
+    return encode_chunk(0x2005, header.encode(0) + struct.pack('<HH', width, height) + pixel_data)
+
+
+def encode_linked_cel_chunk(header: CelHeader, frame_position: int) -> bytes:
+    """ Encode a cel chunk that links to the cel of the same layer in another frame (0 is the first frame). """
+    return encode_chunk(0x2005, header.encode(1) + struct.pack('<H', frame_position))
+
+
+def encode_image_cel_chunk(header: CelHeader, width: int, height: int, compressed_image_data: bytes) -> bytes:
+    """ Encode a cel chunk with ZLIB compressed image data. """
+    return encode_chunk(0x2005, header.encode(2) + struct.pack('<HH', width, height) + compressed_image_data)
+
+
+def encode_tilemap_cel_chunk(header: CelHeader, tilemap: CelChunk, compressed_tile_data: bytes) -> bytes:
+    """ Encode a cel chunk with ZLIB compressed tile data, using the size and bitmasks of an existing tilemap cel. """
+    data = struct.pack('<HHHIIII10x', tilemap.width_tiles, tilemap.height_tiles, tilemap.bits_per_tile,
+                       tilemap.bitmask_tile_id, tilemap.bitmask_x_flip, tilemap.bitmask_y_flip,
+                       tilemap.bitmask_90cw_rotation)
+    return encode_chunk(0x2005, header.encode(3) + data + compressed_tile_data)
+
+
+class CelHeader:
+    """ The fields that every cel type has. """
+    def __init__(self, layer_index: int, x_position: int, y_position: int, opacity_level: int, z_index: int) -> None:
+        self.layer_index = layer_index
+        self.x_position = x_position
+        self.y_position = y_position
+        self.opacity_level = opacity_level
+        self.z_index = z_index
+
+    @classmethod
+    def from_cel(cls, cel: CelChunk, layer_index: Optional[int] = None) -> CelHeader:
+        """ Get the header fields of a cel, optionally with a different layer index. """
+        if layer_index is None:
+            layer_index = cel.layer_index
+
+        return cls(layer_index, cel.x_position, cel.y_position, cel.opacity_level, cel.z_index)
+
+    def encode(self, cel_type: int) -> bytes:
+        """ Encode the header fields for a cel type. """
+        return struct.pack('<HhhBHh5x', self.layer_index, self.x_position, self.y_position, self.opacity_level,
+                           cel_type, self.z_index)
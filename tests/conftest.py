@@ -0,0 +1,19 @@
+from pathlib import Path
+
+import pytest
+
+import synthetic
+
+
+@pytest.fixture
+def rgba_file(tmp_path: Path) -> Path:
+    """ A small RGBA file with linked cels and tags. """
+    scenario = synthetic.Scenario("rgba", 32, 32, frame_count=4, layer_count=3, linked_cels=True)
+    return synthetic.generate(scenario, tmp_path / "rgba.aseprite")
+
+
+@pytest.fixture
+def indexed_file(tmp_path: Path) -> Path:
+    """ A small indexed file. """
+    scenario = synthetic.Scenario("indexed", 32, 32, color_depth=8, frame_count=3, layer_count=2)
+    return synthetic.generate(scenario, tmp_path / "indexed.aseprite")
@@ -0,0 +1,37 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from aseprite_reader import AsepriteFile, aio, render
+
+
+@pytest.fixture
+def executor():
+    max_concurrency = aio._max_concurrency
+    executor = ThreadPoolExecutor(max_workers=2)
+    yield executor
+    aio.configure(executor=None, max_concurrency=max_concurrency)
+    executor.shutdown()
+
+
+def test_configure_keeps_executor(executor: ThreadPoolExecutor) -> None:
+    aio.configure(executor=executor)
+    aio.configure(max_concurrency=4)
+    assert aio._executor is executor
+
+    aio.configure(executor=None)
+    assert aio._executor is None
+
+
+def test_aopen_and_arender(rgba_file: Path, executor: ThreadPoolExecutor) -> None:
+    aio.configure(executor=executor, max_concurrency=1)
+
+    async def main():
+        aseprite_file = await AsepriteFile.aopen(rgba_file)
+        frame = aseprite_file.frame(1)
+        return aseprite_file, frame, await aseprite_file.arender(frame)
+
+    aseprite_file, frame, image = asyncio.run(main())
+    assert image.tobytes() == render.frame_to_image(aseprite_file, frame).tobytes()
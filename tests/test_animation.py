@@ -0,0 +1,27 @@
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from aseprite_reader import AsepriteFile
+
+
+@pytest.mark.parametrize("loop, gif_loop", [(0, 0), (1, None), (3, 2)])
+def test_gif_loop_is_a_play_count(rgba_file: Path, tmp_path: Path, loop: int, gif_loop: int) -> None:
+    aseprite_file = AsepriteFile(rgba_file)
+    output_file = tmp_path / "animation.gif"
+    aseprite_file.export_animation(output_file, loop=loop)
+
+    with Image.open(output_file) as image:
+        assert image.n_frames > 1
+        assert image.info.get("loop") == gif_loop
+
+
+@pytest.mark.parametrize("loop", [0, 3])
+def test_apng_loop_is_a_play_count(rgba_file: Path, tmp_path: Path, loop: int) -> None:
+    aseprite_file = AsepriteFile(rgba_file)
+    output_file = tmp_path / "animation.png"
+    aseprite_file.export_animation(output_file, loop=loop)
+
+    with Image.open(output_file) as image:
+        assert image.info["loop"] == loop
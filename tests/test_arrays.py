@@ -0,0 +1,58 @@
+import random
+from pathlib import Path
+
+import pytest
+
+import synthetic
+from aseprite_reader import AsepriteFile, arrays, render
+
+np = pytest.importorskip("numpy")
+
+
+@pytest.fixture
+def group_file(tmp_path: Path) -> Path:
+    """ A file with a background layer, an empty group layer, and a layer above it. """
+    scenario = synthetic.Scenario("group", 24, 24, frame_count=2, layer_count=3)
+    rng = random.Random(0)
+    frames = []
+    for frame_index in range(scenario.frame_count):
+        chunks = []
+        if frame_index == 0:
+            chunks += [synthetic._layer_chunk("Background"), synthetic._layer_chunk("Group", layer_type=1),
+                       synthetic._layer_chunk("Layer")]
+        chunks += [synthetic._image_cel_chunk(scenario, 0, frame_index, rng),
+                   synthetic._image_cel_chunk(scenario, 2, frame_index, rng)]
+        frames.append(synthetic._frame(chunks, duration=100))
+
+    path = tmp_path / "group.aseprite"
+    path.write_bytes(synthetic._file(scenario, frames))
+    return path
+
+
+def test_frames_to_array_matches_render(rgba_file: Path) -> None:
+    aseprite_file = AsepriteFile(rgba_file)
+    array = arrays.frames_to_array(aseprite_file)
+
+    for frame_index, frame in enumerate(aseprite_file.frames):
+        assert array[frame_index].tobytes() == render.frame_to_image(aseprite_file, frame).tobytes()
+
+
+def test_frames_to_array_keeps_layer_selection(rgba_file: Path) -> None:
+    aseprite_file = AsepriteFile(rgba_file)
+    layers = [aseprite_file.layers[0], aseprite_file.layers[2]]
+    array = arrays.frames_to_array(aseprite_file, layers=layers)
+
+    for frame_index, frame in enumerate(aseprite_file.frames):
+        expected = render.frame_to_image(aseprite_file, frame, layers=layers).tobytes()
+        assert array[frame_index].tobytes() == expected
+        assert expected != render.frame_to_image(aseprite_file, frame).tobytes()
+
+
+def test_frames_to_array_skips_group_layers(group_file: Path) -> None:
+    aseprite_file = AsepriteFile(group_file)
+    background, group, layer = aseprite_file.layers
+    array = arrays.frames_to_array(aseprite_file, layers=[background, group, layer])
+
+    for frame_index, frame in enumerate(aseprite_file.frames):
+        expected = render.frame_to_image(aseprite_file, frame, layers=[background, layer]).tobytes()
+        assert array[frame_index].tobytes() == expected
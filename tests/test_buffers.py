@@ -0,0 +1,36 @@
+from pathlib import Path
+
+from aseprite_reader import AsepriteFile, render
+
+
+def test_render_to_buffer_formats(rgba_file: Path) -> None:
+    aseprite_file = AsepriteFile(rgba_file)
+    frame = aseprite_file.frame(1)
+    rgba = render.frame_to_image(aseprite_file, frame).tobytes()
+
+    assert bytes(aseprite_file.render_to_buffer(frame)) == rgba
+
+    bgra = bytes(aseprite_file.render_to_buffer(frame, pixel_format="BGRA"))
+    assert bgra[0::4] == rgba[2::4] and bgra[2::4] == rgba[0::4] and bgra[3::4] == rgba[3::4]
+
+
+def test_render_to_buffer_row_alignment(rgba_file: Path) -> None:
+    aseprite_file = AsepriteFile(rgba_file)
+    frame = aseprite_file.frame(1)
+    width, height = aseprite_file.header.width, aseprite_file.header.height
+    rgba = render.frame_to_image(aseprite_file, frame).tobytes()
+
+    # 32 pixel rows are 128 bytes, so aligning to 256 bytes pads each row
+    data = bytes(aseprite_file.render_to_buffer(frame, row_alignment=256))
+    assert len(data) == 256 * height
+    for y in range(height):
+        assert data[y * 256:y * 256 + width * 4] == rgba[y * width * 4:(y + 1) * width * 4]
+
+
+def test_render_to_buffer_into_out(rgba_file: Path) -> None:
+    aseprite_file = AsepriteFile(rgba_file)
+    frame = aseprite_file.frame(2)
+    out = bytearray(aseprite_file.header.width * aseprite_file.header.height * 4)
+
+    aseprite_file.render_to_buffer(frame, out=out)
+    assert bytes(out) == render.frame_to_image(aseprite_file, frame).tobytes()
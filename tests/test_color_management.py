@@ -0,0 +1,122 @@
+import random
+import struct
+from pathlib import Path
+from typing import Optional
+
+import pytest
+from PIL import Image, ImageCms
+
+import synthetic
+from aseprite_reader import AsepriteFile, color_management, render
+
+
+def _color_profile_chunk(profile_type: int, fixed_gamma: Optional[float] = None, icc_profile: bytes = b"") -> bytes:
+    flags = 1 if fixed_gamma is not None else 0
+    data = struct.pack('<HHI8x', profile_type, flags, round((fixed_gamma or 0) * 65536))
+    if profile_type == 2:
+        data += struct.pack('<I', len(icc_profile)) + icc_profile
+    return synthetic._chunk(0x2007, data)
+
+
+def _profile_file(path: Path, color_depth: int = 32, *profile_chunks: bytes) -> Path:
+    scenario = synthetic.Scenario("color_profile", 16, 16, color_depth=color_depth, frame_count=1, layer_count=1)
+    rng = random.Random(0)
+    chunks = [synthetic._layer_chunk("Background"), *profile_chunks]
+    if color_depth == 8:
+        chunks.append(synthetic._palette_chunk(rng))
+    chunks.append(synthetic._image_cel_chunk(scenario, 0, 0, rng))
+
+    path.write_bytes(synthetic._file(scenario, [synthetic._frame(chunks, duration=100)]))
+    return path
+
+
+def _srgb_icc_profile() -> bytes:
+    return ImageCms.ImageCmsProfile(ImageCms.createProfile("sRGB")).tobytes()
+
+
+def _gradient() -> Image.Image:
+    """ An RGBA image with every channel value, and every alpha value. """
+    ramp = Image.frombytes("L", (256, 1), bytes(range(256)))
+    return Image.merge("RGBA", (ramp, ramp, ramp.transpose(Image.Transpose.FLIP_LEFT_RIGHT), ramp))
+
+
+def test_no_color_profile(rgba_file: Path, tmp_path: Path) -> None:
+    aseprite_file = AsepriteFile(rgba_file)
+    assert aseprite_file.color_profile is None
+    assert color_management.color_transform(None) is None
+
+    image = render.frame_to_image(aseprite_file, aseprite_file.frame(1))
+    assert color_management.apply_color_profile(aseprite_file, image) is image
+
+    # A profile type of 0 (no color profile) and sRGB need no conversion either
+    for chunk in (_color_profile_chunk(0), _color_profile_chunk(1)):
+        profile_file = _profile_file(tmp_path / "profile.aseprite", 32, chunk)
+        assert color_management.color_transform(AsepriteFile(profile_file).color_profile) is None
+
+
+def test_gamma_lookup_table(tmp_path: Path) -> None:
+    aseprite_file = AsepriteFile(_profile_file(tmp_path / "linear.aseprite", 32, _color_profile_chunk(1, 1.0)))
+    transform = color_management.color_transform(aseprite_file.color_profile)
+
+    converted = transform(_gradient())
+    for x in range(256):
+        # Linear values are encoded with the sRGB curve, and alpha is left as it is
+        r, g, b, a = converted.getpixel((x, 0))
+        linear = x / 255
+        encoded = linear * 12.92 if linear <= 0.0031308 else 1.055 * linear ** (1 / 2.4) - 0.055
+        assert r == g == round(encoded * 255)
+        assert a == x
+
+    with pytest.raises(RuntimeError):
+        color_management._gamma_transform(0)
+
+
+def test_icc_transform_keeps_alpha(tmp_path: Path) -> None:
+    profile_chunk = _color_profile_chunk(2, icc_profile=_srgb_icc_profile())
+    aseprite_file = AsepriteFile(_profile_file(tmp_path / "icc.aseprite", 32, profile_chunk))
+    assert aseprite_file.color_profile.icc_profile_data == _srgb_icc_profile()
+
+    image = _gradient()
+    converted = color_management.apply_color_profile(aseprite_file, image)
+    assert converted.mode == "RGBA"
+    assert converted.getchannel("A").tobytes() == image.getchannel("A").tobytes()
+
+
+def test_palettized_image_converts_palette(tmp_path: Path) -> None:
+    aseprite_file = AsepriteFile(_profile_file(tmp_path / "indexed.aseprite", 8, _color_profile_chunk(1, 1.0)))
+    transform = color_management.color_transform(aseprite_file.color_profile)
+
+    image = Image.frombytes("P", (16, 1), bytes(range(16)))
+    image.putpalette(bytes(range(256)) * 4, rawmode="RGBA")
+    converted = color_management.apply_color_profile(aseprite_file, image)
+
+    # The pixels keep their indexes, and the palette is converted
+    assert converted.mode == "P"
+    assert converted.tobytes() == image.tobytes()
+    palette = Image.frombytes("RGBA", (256, 1), bytes(image.getpalette("RGBA")))
+    assert bytes(converted.getpalette("RGBA")) == transform(palette).tobytes()
+
+
+def test_transforms_are_cached(tmp_path: Path) -> None:
+    chunk = _color_profile_chunk(2, icc_profile=_srgb_icc_profile())
+    a = AsepriteFile(_profile_file(tmp_path / "a.aseprite", 32, chunk))
+    b = AsepriteFile(_profile_file(tmp_path / "b.aseprite", 32, chunk))
+
+    # Files with the same profile share a transform, which is only built once
+    color_management._build_transform.cache_clear()
+    transform = color_management.color_transform(a.color_profile)
+    assert color_management.color_transform(b.color_profile) is transform
+
+    cache_info = color_management._build_transform.cache_info()
+    assert (cache_info.misses, cache_info.hits) == (1, 1)
+
+
+def test_color_managed_render(tmp_path: Path) -> None:
+    aseprite_file = AsepriteFile(_profile_file(tmp_path / "linear.aseprite", 32, _color_profile_chunk(1, 1.0)))
+    frame = aseprite_file.frame(1)
+    output_file = tmp_path / "frame.png"
+    aseprite_file.render(frame, output_file, color_managed=True)
+
+    transform = color_management.color_transform(aseprite_file.color_profile)
+    with Image.open(output_file) as image:
+        assert image.tobytes() == transform(render.frame_to_image(aseprite_file, frame)).tobytes()
@@ -0,0 +1,41 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from aseprite_reader import AsepriteFile, render
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    """ A thread pool that counts the tasks submitted to it. """
+    def __init__(self) -> None:
+        super().__init__(max_workers=4)
+        self.submitted = 0
+
+    def submit(self, *args, **kwargs):
+        self.submitted += 1
+        return super().submit(*args, **kwargs)
+
+
+def test_executor_matches_serial(rgba_file: Path, indexed_file: Path) -> None:
+    for path in (rgba_file, indexed_file):
+        aseprite_file = AsepriteFile(path)
+        frames = aseprite_file.frames
+        serial = [render.frame_to_image(aseprite_file, frame).tobytes() for frame in frames]
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            assert [render.frame_to_image(aseprite_file, frame, executor).tobytes() for frame in frames] == serial
+            assert [image.tobytes() for image in render.frames_to_images(aseprite_file, frames, executor)] == serial
+
+
+def test_executor_with_layer_selection(rgba_file: Path) -> None:
+    aseprite_file = AsepriteFile(rgba_file)
+    layers = [aseprite_file.layers[2], aseprite_file.layers[0]]
+
+    for frame in aseprite_file.frames:
+        serial = render.frame_to_image(aseprite_file, frame, layers=layers)
+        with CountingExecutor() as executor:
+            image = render.frame_to_image(aseprite_file, frame, executor, layers=layers)
+
+        assert image.tobytes() == serial.tobytes()
+
+        # Only the cels of the selected layers are decoded
+        assert executor.submitted == sum(1 for layer in layers if aseprite_file.cel(frame, layer))
@@ -0,0 +1,72 @@
+import random
+import struct
+from pathlib import Path
+
+import pytest
+
+import synthetic
+from aseprite_reader import AsepriteFile
+from aseprite_reader.external_files import ExternalFilePool, ExternalFileResolver
+
+
+def _external_files_chunk(entries: list[tuple[int, int, str]]) -> bytes:
+    data = struct.pack('<I8x', len(entries))
+    for entry_id, entry_type, file_name in entries:
+        data += struct.pack('<IB7x', entry_id, entry_type) + synthetic._string(file_name)
+    return synthetic._chunk(0x2008, data)
+
+
+def _external_tileset_chunk(external_file_id: int) -> bytes:
+    data = struct.pack('<IIIHHh14x', 0, 1, synthetic.TILE_COUNT, synthetic.TILE_SIZE, synthetic.TILE_SIZE, 1)
+    data += synthetic._string("External") + struct.pack('<II', external_file_id, 0)
+    return synthetic._chunk(0x2023, data)
+
+
+@pytest.fixture
+def map_files(tmp_path: Path) -> list[Path]:
+    """ Two files that use the same tileset, stored in a third file. """
+    tileset_scenario = synthetic.Scenario("tiles", 32, 32, color_depth=8, frame_count=1, layer_count=2,
+                                          tilemap=True)
+    synthetic.generate(tileset_scenario, tmp_path / "tiles.aseprite")
+
+    scenario = synthetic.Scenario("map", 16, 16, frame_count=1, layer_count=1)
+    external_files = _external_files_chunk([(1, 1, "tiles.aseprite"), (2, 0, "tiles.aseprite"), (3, 2, "ext")])
+    paths = []
+    for name in ("a", "b"):
+        chunks = [synthetic._layer_chunk("Layer"), external_files, _external_tileset_chunk(1),
+                  synthetic._image_cel_chunk(scenario, 0, 0, random.Random(0))]
+        path = tmp_path / f"{name}.aseprite"
+        path.write_bytes(synthetic._file(scenario, [synthetic._frame(chunks, duration=100)]))
+        paths.append(path)
+
+    return paths
+
+
+def test_external_tileset_is_shared(map_files: list[Path]) -> None:
+    pool = ExternalFilePool()
+    a, b = (ExternalFileResolver(AsepriteFile(path), pool) for path in map_files)
+
+    assert [external_file.entry_type for external_file in a.external_files] == [1, 0, 2]
+    tileset = a.tileset(a.aseprite_file.tilesets[0])
+    assert tileset.tile_count == synthetic.TILE_COUNT
+
+    image = a.tileset_image(a.aseprite_file.tilesets[0])
+    assert image.size == (synthetic.TILE_SIZE, synthetic.TILE_SIZE * synthetic.TILE_COUNT)
+    assert b.tileset_image(b.aseprite_file.tilesets[0]) is image
+    assert len(pool) == 1
+    assert pool._path_locks == {}
+
+    pool.clear()
+    assert len(pool) == 0
+
+
+def test_entry_types_are_checked(map_files: list[Path]) -> None:
+    resolver = ExternalFileResolver(AsepriteFile(map_files[0]), ExternalFilePool())
+
+    assert len(resolver.palette(2)) == 256
+    with pytest.raises(RuntimeError):
+        resolver.palette(1)
+    with pytest.raises(RuntimeError):
+        resolver.path(3)
+    with pytest.raises(RuntimeError):
+        resolver.path(4)
@@ -0,0 +1,85 @@
+import random
+import shutil
+import struct
+from pathlib import Path
+
+import synthetic
+from aseprite_reader.incremental_build import build
+
+
+def test_second_build_is_unchanged(rgba_file: Path, tmp_path: Path) -> None:
+    output_dir = tmp_path / "output"
+    first = build(rgba_file.parent, output_dir)
+    second = build(rgba_file.parent, output_dir)
+
+    assert len(first.exported) == 4
+    assert second.exported == []
+    assert sorted(second.unchanged) == sorted(first.exported)
+
+
+def test_removed_frames_are_deleted(rgba_file: Path, indexed_file: Path, tmp_path: Path) -> None:
+    output_dir = tmp_path / "output"
+    build(tmp_path, output_dir)
+    indexed_file.unlink()
+    report = build(tmp_path, output_dir)
+
+    assert len(report.deleted) == 3
+    assert not (output_dir / "indexed").exists()
+
+
+def test_changing_layout_deletes_old_outputs(rgba_file: Path, tmp_path: Path) -> None:
+    source_dir = tmp_path / "source"
+    source_dir.mkdir()
+    shutil.copy(rgba_file, source_dir)
+    output_dir = tmp_path / "output"
+
+    by_frame = build(source_dir, output_dir)
+    by_tag = build(source_dir, output_dir, by_tag=True)
+
+    assert sorted(by_tag.deleted) == sorted(by_frame.exported)
+    outputs = sorted(path.relative_to(output_dir).as_posix() for path in output_dir.rglob("*.png"))
+    assert outputs == sorted(path.relative_to(output_dir).as_posix() for path in by_tag.exported)
+
+
+def _tags_file(path: Path, tag_names: list[str]) -> Path:
+    """ A file with a tag on each frame. """
+    scenario = synthetic.Scenario("tags", 16, 16, frame_count=len(tag_names), layer_count=1)
+    rng = random.Random(0)
+    tags_data = struct.pack('<H8x', len(tag_names))
+    for frame_index, name in enumerate(tag_names):
+        tags_data += struct.pack('<HHBH6x3Bx', frame_index, frame_index, 0, 0, 0, 0, 0) + synthetic._string(name)
+
+    frames = []
+    for frame_index in range(scenario.frame_count):
+        chunks = [synthetic._layer_chunk("Background"), synthetic._chunk(0x2018, tags_data)] if frame_index == 0 else []
+        chunks.append(synthetic._image_cel_chunk(scenario, 0, frame_index, rng))
+        frames.append(synthetic._frame(chunks, duration=100))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(synthetic._file(scenario, frames))
+    return path
+
+
+def test_tag_names_stay_inside_output_dir(tmp_path: Path) -> None:
+    _tags_file(tmp_path / "source" / "tags.aseprite", ["../x", "a/b", ".."])
+    output_dir = tmp_path / "output"
+    report = build(tmp_path / "source", output_dir, by_tag=True)
+
+    outputs = sorted(path.relative_to(output_dir).as_posix() for path in report.exported)
+    assert outputs == ["tags/.._x/1.png", "tags/__/1.png", "tags/a_b/1.png"]
+    assert {path.name for path in tmp_path.iterdir()} == {"source", "output"}
+
+
+def test_tags_with_the_same_name(tmp_path: Path) -> None:
+    _tags_file(tmp_path / "source" / "tags.aseprite", ["walk", "walk", "Walk", "a/b", "a_b"])
+    output_dir = tmp_path / "output"
+    first = build(tmp_path / "source", output_dir, by_tag=True)
+
+    # Each tag gets its own output, so the manifest has a fingerprint for each of them
+    outputs = sorted(path.relative_to(output_dir).as_posix() for path in first.exported)
+    assert outputs == ["tags/Walk_3/1.png", "tags/a_b/1.png", "tags/a_b_2/1.png", "tags/walk/1.png",
+                       "tags/walk_2/1.png"]
+
+    second = build(tmp_path / "source", output_dir, by_tag=True)
+    assert second.exported == []
+    assert sorted(second.unchanged) == sorted(first.exported)
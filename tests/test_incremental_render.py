@@ -0,0 +1,13 @@
+from pathlib import Path
+
+from aseprite_reader import AsepriteFile, render
+from aseprite_reader.incremental_render import IncrementalRenderer
+
+
+def test_incremental_render_matches_full_render(rgba_file: Path) -> None:
+    aseprite_file = AsepriteFile(rgba_file)
+    renderer = IncrementalRenderer(aseprite_file)
+    frames = aseprite_file.frames + aseprite_file.frames[::-1]
+
+    for frame, image in zip(frames, renderer.iter_images(frames)):
+        assert image.tobytes() == render.frame_to_image(aseprite_file, frame).tobytes()
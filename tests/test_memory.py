@@ -0,0 +1,71 @@
+from pathlib import Path
+
+import pytest
+
+from aseprite_reader import AsepriteFile, render
+from aseprite_reader.chunks import CelChunk
+from aseprite_reader.incremental_render import IncrementalRenderer
+from aseprite_reader.render_cache import frame_fingerprint
+
+
+@pytest.fixture
+def payload_reads(monkeypatch: pytest.MonkeyPatch) -> list[CelChunk]:
+    """ Record every cel whose evicted payload is read from the file. """
+    reads = []
+    read_payload = CelChunk._read_payload
+
+    def _read_payload(cel: CelChunk) -> bytes:
+        reads.append(cel)
+        return read_payload(cel)
+
+    monkeypatch.setattr(CelChunk, "_read_payload", _read_payload)
+    return reads
+
+
+def test_evicted_payloads_render_the_same(rgba_file: Path) -> None:
+    kept = AsepriteFile(rgba_file)
+    evicted = AsepriteFile(rgba_file, keep_payloads=False)
+
+    for frame_number in range(1, kept.header.frame_count + 1):
+        image = render.frame_to_image(evicted, evicted.frame(frame_number))
+        assert image.tobytes() == render.frame_to_image(kept, kept.frame(frame_number)).tobytes()
+        assert frame_fingerprint(evicted, evicted.frame(frame_number)) == \
+            frame_fingerprint(kept, kept.frame(frame_number))
+
+
+def test_fingerprint_reads_each_payload_once(rgba_file: Path, payload_reads: list[CelChunk]) -> None:
+    aseprite_file = AsepriteFile(rgba_file, keep_payloads=False)
+    for _ in range(2):
+        for frame in aseprite_file.frames:
+            frame_fingerprint(aseprite_file, frame)
+
+    assert len(payload_reads) == len(set(map(id, payload_reads)))
+
+
+def test_incremental_renderer_compares_cels_without_reading_them(
+        rgba_file: Path,
+        payload_reads: list[CelChunk]
+) -> None:
+    aseprite_file = AsepriteFile(rgba_file, keep_payloads=False)
+    renderer = IncrementalRenderer(aseprite_file)
+    for frame in aseprite_file.frames:
+        renderer.render(frame)
+    decoded = len(payload_reads)
+
+    # Rendering the last frame again finds every cel unchanged
+    renderer.render(aseprite_file.frames[-1])
+    assert len(payload_reads) == decoded
+
+
+def test_memory_report_includes_caches(rgba_file: Path) -> None:
+    aseprite_file = AsepriteFile(rgba_file)
+    report = aseprite_file.memory_report()
+    assert report.caches == {}
+    assert set(aseprite_file.caches()) == {"cel_indexes", "timeline", "palette_timeline", "external_files"}
+
+    aseprite_file.render_region(aseprite_file.frame(1), (0, 0, 8, 8))
+    aseprite_file.frame_at(None, 0)
+    report = aseprite_file.memory_report()
+    assert set(report.caches) == {"cel_indexes", "timeline"}
+    assert aseprite_file.caches()["timeline"] is aseprite_file.timeline
+    assert report.total == report.payloads + report.objects + sum(report.caches.values())
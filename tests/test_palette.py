@@ -0,0 +1,67 @@
+import zlib
+from pathlib import Path
+
+import pytest
+
+import synthetic
+from aseprite_reader import AsepriteFile, profiling, render, utils
+from aseprite_reader.chunks import PaletteChunk
+
+
+@pytest.fixture
+def palette_changes_file(tmp_path: Path) -> Path:
+    """ An indexed file with only a background layer, whose cel is linked to the first frame, and whose later frames
+    replace palette entries 1 to 64.
+    """
+    scenario = synthetic.Scenario("palette_changes", 16, 16, color_depth=8, frame_count=3, layer_count=1,
+                                  palette_changes=True)
+    return synthetic.generate(scenario, tmp_path / "palette_changes.aseprite")
+
+
+def test_palette_versions(palette_changes_file: Path) -> None:
+    aseprite_file = AsepriteFile(palette_changes_file)
+    timeline = aseprite_file.palette_timeline
+
+    assert [timeline.version(n) for n in (1, 2, 3)] == [0, 1, 2]
+    for frame_number in (2, 3):
+        palette = next(c for c in aseprite_file.frame(frame_number).chunks if isinstance(c, PaletteChunk))
+        assert palette.first_index_to_change == 1
+        expected = [(c.r, c.g, c.b, c.a) for c in palette.palette_colors]
+        assert timeline.colors(frame_number)[1:65] == expected
+
+    # Entries that weren't replaced keep the colors of the first palette
+    assert timeline.colors(3)[65:] == timeline.colors(1)[65:]
+
+
+def test_palette_change_render(palette_changes_file: Path) -> None:
+    aseprite_file = AsepriteFile(palette_changes_file)
+    cel = aseprite_file.frame(1).cels[0]
+    indexes = zlib.decompress(cel.compressed_image_data)
+
+    for frame_number in (1, 2, 3):
+        colors = aseprite_file.palette_timeline.colors(frame_number)
+        transparent_index = aseprite_file.header.transparent_color_index
+        expected = [(0, 0, 0, 0) if i == transparent_index else colors[i] for i in indexes]
+
+        # Cels linked to the first frame are shown with the palette of the frame they are shown on
+        frame = aseprite_file.frame(frame_number)
+        linked_cel = aseprite_file.resolve_cel(frame.cels[0])
+        image = render.decode_cel(aseprite_file, linked_cel, frame_number)
+        assert image.tobytes() == b"".join(bytes(color) for color in expected)
+
+        # The pixel by pixel conversion gives the same colors
+        pixels = utils.image_data_to_pixels(aseprite_file, tuple(indexes), frame_number)
+        assert list(pixels) == expected
+
+
+def test_skipped_frames_stay_unread(palette_changes_file: Path) -> None:
+    full = AsepriteFile(palette_changes_file)
+    with profiling.profile() as p:
+        aseprite_file = AsepriteFile(palette_changes_file, frames=[3])
+        image = render.frame_to_image(aseprite_file, aseprite_file.frames[0])
+
+    # The palette change in frame 2 is found without reading frame 2
+    parsed_frames = {frame_number for (_, frame_number), stages in p.frames.items() if profiling.PARSE_FRAME in stages}
+    assert parsed_frames == {1, 3}
+    assert aseprite_file.palette_timeline.colors(3) == full.palette_timeline.colors(3)
+    assert image.tobytes() == render.frame_to_image(full, full.frame(3)).tobytes()
@@ -0,0 +1,21 @@
+from pathlib import Path
+
+from aseprite_reader import AsepriteFile, render
+
+
+def test_read_selected_frames(rgba_file: Path) -> None:
+    full = AsepriteFile(rgba_file)
+    partial = AsepriteFile(rgba_file, frames=[3])
+
+    assert [frame_number for frame_number, _ in partial.iter_frames()] == [3]
+    for frame_number in (3, 4):
+        image = render.frame_to_image(partial, partial.frame(frame_number))
+        assert image.tobytes() == render.frame_to_image(full, full.frame(frame_number)).tobytes()
+
+
+def test_read_tag(rgba_file: Path) -> None:
+    aseprite_file = AsepriteFile(rgba_file, tag="second")
+    tag = next(tag for tag in aseprite_file.tags if tag.name == "second")
+
+    frame_numbers = [frame_number for frame_number, _ in aseprite_file.iter_frames()]
+    assert frame_numbers == list(range(tag.from_frame + 1, tag.to_frame + 2))
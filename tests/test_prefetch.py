@@ -0,0 +1,55 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from aseprite_reader import AsepriteFile, render
+
+
+def _prefetch_threads() -> list[threading.Thread]:
+    return [thread for thread in threading.enumerate() if thread.name == "aseprite-reader-prefetch"]
+
+
+def test_prefetch_order(rgba_file: Path) -> None:
+    aseprite_file = AsepriteFile(rgba_file)
+    frames = aseprite_file.frames * 3
+    serial = [render.frame_to_image(aseprite_file, frame).tobytes() for frame in frames]
+
+    for prefetch in (0, 1, 2, 8):
+        images = render.iter_frame_images(aseprite_file, frames, prefetch=prefetch)
+        assert [image.tobytes() for image in images] == serial
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        images = render.iter_frame_images(aseprite_file, frames, executor=executor)
+        assert [image.tobytes() for image in images] == serial
+
+
+def test_stopping_early_stops_the_thread(rgba_file: Path) -> None:
+    aseprite_file = AsepriteFile(rgba_file)
+    images = render.iter_frame_images(aseprite_file, aseprite_file.frames * 10, prefetch=1)
+    next(images)
+    assert len(_prefetch_threads()) == 1
+
+    images.close()
+    for thread in _prefetch_threads():
+        thread.join(timeout=5)
+    assert _prefetch_threads() == []
+
+
+def test_worker_exception_reaches_consumer(rgba_file: Path) -> None:
+    aseprite_file = AsepriteFile(rgba_file)
+
+    def frames():
+        yield aseprite_file.frame(1)
+        raise ValueError("No more frames")
+
+    images = render.iter_frame_images(aseprite_file, frames())
+    assert next(images).tobytes() == render.frame_to_image(aseprite_file, aseprite_file.frame(1)).tobytes()
+    with pytest.raises(ValueError, match="No more frames"):
+        next(images)
+
+    # The thread has finished
+    for thread in _prefetch_threads():
+        thread.join(timeout=5)
+    assert _prefetch_threads() == []
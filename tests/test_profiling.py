@@ -0,0 +1,100 @@
+import json
+import threading
+from pathlib import Path
+
+from aseprite_reader import AsepriteFile, profiling, render
+
+
+def test_parse_and_render_stages(rgba_file: Path) -> None:
+    events = []
+    profiling.add_callback(events.append)
+    try:
+        assert profiling.enabled()
+        aseprite_file = AsepriteFile(rgba_file)
+        parse_events = list(events)
+        events.clear()
+        render.frame_to_image(aseprite_file, aseprite_file.frame(2))
+        render_events = list(events)
+    finally:
+        profiling.remove_callback(events.append)
+
+    # Stages are reported when they finish, so nested stages come before the stage they are in
+    stages = [event.stage for event in parse_events]
+    assert stages[0] == profiling.PARSE_HEADER
+    assert stages[-1] == profiling.PARSE
+    assert stages.count(profiling.PARSE_FRAME) == 4
+    assert "chunk.LayerChunk" in stages
+    first_frame_chunks = stages[1:stages.index(profiling.PARSE_FRAME)]
+    assert first_frame_chunks
+    assert all(stage.startswith(f"{profiling.CHUNK}.") for stage in first_frame_chunks)
+
+    # Stages are counted for the file and frame of the innermost scope
+    assert all(event.file_path == aseprite_file.file_path for event in parse_events)
+    frame_numbers = [event.frame_number for event in parse_events if event.stage == profiling.PARSE_FRAME]
+    assert frame_numbers == [1, 2, 3, 4]
+    assert parse_events[-1].frame_number is None
+
+    assert render_events[-1].stage == profiling.RENDER_FRAME
+    assert {profiling.INFLATE, profiling.PIXEL_CONVERSION} <= {event.stage for event in render_events}
+    assert all(event.frame_number == 2 for event in render_events)
+    assert all(event.size > 0 for event in render_events if event.stage == profiling.INFLATE)
+
+
+def test_remove_callback_stops_events(rgba_file: Path) -> None:
+    events = []
+    profiling.add_callback(events.append)
+    AsepriteFile(rgba_file)
+    profiling.remove_callback(events.append)
+
+    count = len(events)
+    assert count > 0
+    assert not profiling.enabled()
+    AsepriteFile(rgba_file)
+    assert len(events) == count
+
+
+def test_scopes_are_per_thread(rgba_file: Path, indexed_file: Path) -> None:
+    files = [AsepriteFile(rgba_file), AsepriteFile(indexed_file)]
+    barrier = threading.Barrier(len(files))
+
+    def work(aseprite_file: AsepriteFile, frame_number: int) -> None:
+        with profiling.scope(aseprite_file, frame_number=frame_number):
+            # Both threads are inside their scope before either of them reports a stage
+            barrier.wait()
+            with profiling.stage(profiling.SCALE):
+                pass
+            barrier.wait()
+
+    with profiling.profile() as p:
+        threads = [threading.Thread(target=work, args=(f, n)) for n, f in enumerate(files, start=1)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert set(p.frames) == {(files[0].file_path, 1), (files[1].file_path, 2)}
+    for stats in p.frames.values():
+        assert stats[profiling.SCALE].count == 1
+
+
+def test_profile_totals(rgba_file: Path, indexed_file: Path) -> None:
+    with profiling.profile() as p:
+        for path in (rgba_file, indexed_file):
+            aseprite_file = AsepriteFile(path)
+            for _, frame in aseprite_file.iter_frames():
+                render.frame_to_image(aseprite_file, frame)
+
+    assert not profiling.enabled()
+    assert p.totals[profiling.PARSE].count == 2
+    assert p.totals[profiling.RENDER_FRAME].count == 4 + 3
+    assert set(p.files) == {rgba_file, indexed_file}
+    assert p.files[rgba_file][profiling.PARSE_FRAME].count == 4
+    assert p.frames[(indexed_file, 3)][profiling.RENDER_FRAME].count == 1
+
+    # The totals are the sums of the totals of each file
+    for stage, stats in p.totals.items():
+        assert stats.count == sum(file_stats[stage].count for file_stats in p.files.values() if stage in file_stats)
+
+    exported = json.loads(json.dumps(p.to_dict()))
+    assert exported["totals"][profiling.PARSE]["count"] == 2
+    assert {entry["file"] for entry in exported["frames"]} == {rgba_file.as_posix(), indexed_file.as_posix()}
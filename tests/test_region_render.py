@@ -0,0 +1,20 @@
+from pathlib import Path
+
+import pytest
+
+from aseprite_reader import AsepriteFile, render
+
+
+@pytest.mark.parametrize("box", [(0, 0, 32, 32), (5, 3, 20, 17), (-4, -4, 8, 8), (30, 30, 40, 40)])
+def test_region_matches_crop(rgba_file: Path, box: tuple[int, int, int, int]) -> None:
+    aseprite_file = AsepriteFile(rgba_file)
+    for frame in aseprite_file.frames:
+        region = aseprite_file.render_region(frame, box)
+        assert region.size == (box[2] - box[0], box[3] - box[1])
+        assert region.tobytes() == render.frame_to_image(aseprite_file, frame).crop(box).tobytes()
+
+
+def test_empty_region_is_rejected(rgba_file: Path) -> None:
+    aseprite_file = AsepriteFile(rgba_file)
+    with pytest.raises(RuntimeError):
+        aseprite_file.render_region(aseprite_file.frame(1), (4, 4, 4, 8))
@@ -0,0 +1,44 @@
+from pathlib import Path
+
+from aseprite_reader import AsepriteFile
+from aseprite_reader.render_cache import RenderCache
+
+
+def test_render_uses_cache(rgba_file: Path, tmp_path: Path) -> None:
+    aseprite_file = AsepriteFile(rgba_file)
+    cache = RenderCache(tmp_path / "cache")
+    frame = aseprite_file.frame(1)
+
+    first = cache.render(aseprite_file, frame)
+    second = cache.render(aseprite_file, frame)
+    assert first.tobytes() == second.tobytes()
+    assert (cache.stats.hits, cache.stats.misses, cache.stats.writes) == (1, 1, 1)
+
+
+def test_rewriting_an_entry_keeps_the_size(rgba_file: Path, tmp_path: Path) -> None:
+    aseprite_file = AsepriteFile(rgba_file)
+    cache = RenderCache(tmp_path / "cache")
+    frame = aseprite_file.frame(1)
+    key = cache.frame_key(aseprite_file, frame)
+    image = cache.render(aseprite_file, frame)
+
+    for _ in range(3):
+        cache.put(key, image)
+
+    assert cache._size == cache.stats.size
+    assert cache.stats.entry_count == 1
+
+
+def test_rewriting_an_entry_does_not_evict(rgba_file: Path, tmp_path: Path) -> None:
+    aseprite_file = AsepriteFile(rgba_file)
+    cache = RenderCache(tmp_path / "cache")
+    images = {cache.frame_key(aseprite_file, frame): cache.render(aseprite_file, frame)
+              for frame in aseprite_file.frames}
+
+    # Room for every frame, but not for any frame counted twice
+    cache = RenderCache(cache.directory, max_size=cache.stats.size)
+    for key, image in images.items():
+        cache.put(key, image)
+
+    assert cache.stats.evictions == 0
+    assert cache.stats.entry_count == len(images)
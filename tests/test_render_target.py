@@ -0,0 +1,44 @@
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from aseprite_reader import AsepriteFile, render
+
+
+def test_render_into_target(rgba_file: Path) -> None:
+    aseprite_file = AsepriteFile(rgba_file)
+    size = (aseprite_file.header.width, aseprite_file.header.height)
+    target = Image.new("RGBA", size, (255, 0, 0, 255))
+
+    # The same image is reused for every frame, and the previous frame is cleared
+    for frame in aseprite_file.frames:
+        image = render.frame_to_image(aseprite_file, frame, target=target)
+        assert image is target
+        assert image.tobytes() == render.frame_to_image(aseprite_file, frame).tobytes()
+
+
+@pytest.mark.parametrize("mode, size", [("RGBA", (16, 32)), ("RGB", (32, 32)), ("P", (32, 32))])
+def test_wrong_target(rgba_file: Path, mode: str, size: tuple[int, int]) -> None:
+    aseprite_file = AsepriteFile(rgba_file)
+    with pytest.raises(RuntimeError, match="Target image"):
+        render.frame_to_image(aseprite_file, aseprite_file.frame(1), target=Image.new(mode, size))
+
+
+def test_render_into_buffer(rgba_file: Path) -> None:
+    aseprite_file = AsepriteFile(rgba_file)
+    size = aseprite_file.header.width * aseprite_file.header.height * 4
+    out = bytearray(size + 16)
+
+    # A larger buffer is filled from the start, and a view of the written part is returned
+    for frame in aseprite_file.frames:
+        view = render.frame_to_buffer(aseprite_file, frame, out=out)
+        assert view.obj is out and len(view) == size
+        assert bytes(view) == render.frame_to_image(aseprite_file, frame).tobytes()
+
+
+def test_buffer_too_small(rgba_file: Path) -> None:
+    aseprite_file = AsepriteFile(rgba_file)
+    out = bytearray(aseprite_file.header.width * aseprite_file.header.height * 4 - 1)
+    with pytest.raises(RuntimeError, match="too small"):
+        render.frame_to_buffer(aseprite_file, aseprite_file.frame(1), out=out)
@@ -0,0 +1,27 @@
+from pathlib import Path
+
+from PIL import Image
+
+from aseprite_reader import AsepriteFile, render
+
+
+def test_render_scaled(rgba_file: Path) -> None:
+    aseprite_file = AsepriteFile(rgba_file)
+    frame = aseprite_file.frame(1)
+    image = render.frame_to_image(aseprite_file, frame)
+
+    scaled = aseprite_file.render_scaled(frame, [1, 2, 3])
+    assert scaled[1].tobytes() == image.tobytes()
+    for scale in (2, 3):
+        assert scaled[scale].size == (image.width * scale, image.height * scale)
+        nearest = image.resize(scaled[scale].size, Image.Resampling.NEAREST)
+        assert scaled[scale].tobytes() == nearest.tobytes()
+
+
+def test_render_scale(rgba_file: Path, tmp_path: Path) -> None:
+    aseprite_file = AsepriteFile(rgba_file)
+    output_file = tmp_path / "frame.png"
+    aseprite_file.render(aseprite_file.frame(1), output_file, scale=4)
+
+    with Image.open(output_file) as image:
+        assert image.size == (aseprite_file.header.width * 4, aseprite_file.header.height * 4)
@@ -0,0 +1,125 @@
+import json
+import random
+import struct
+from pathlib import Path
+
+import pytest
+
+import synthetic
+from aseprite_reader import AsepriteFile, render
+
+
+def _slice_chunk(name: str, flags: int, keys: list[tuple]) -> bytes:
+    data = struct.pack('<III', len(keys), flags, 0) + synthetic._string(name)
+    for key in keys:
+        frame_number, x, y, width, height, *extra = key
+        data += struct.pack('<IiiII', frame_number, x, y, width, height)
+        data += struct.pack(f'<{len(extra)}i', *extra)
+    return synthetic._chunk(0x2022, data)
+
+
+def _slices_file(path: Path, slice_chunks: list[bytes]) -> Path:
+    scenario = synthetic.Scenario("slices", 32, 32, frame_count=4, layer_count=2)
+    rng = random.Random(0)
+    frames = []
+    for frame_index in range(scenario.frame_count):
+        chunks = []
+        if frame_index == 0:
+            chunks += [synthetic._layer_chunk("Background"), synthetic._layer_chunk("Layer 1"), *slice_chunks]
+        chunks += [synthetic._image_cel_chunk(scenario, layer_index, frame_index, rng) for layer_index in range(2)]
+        frames.append(synthetic._frame(chunks, duration=100))
+
+    path.write_bytes(synthetic._file(scenario, frames))
+    return path
+
+
+@pytest.fixture
+def slices_file(tmp_path: Path) -> Path:
+    """ A file with a 9-patches slice with a pivot whose keys start on the second frame (and are stored out of order),
+    a slice that is hidden from the third frame on, and a slice whose name is a path.
+    """
+    return _slices_file(tmp_path / "slices.aseprite", [
+        _slice_chunk("button", 1 | 2, [(2, 8, 6, 12, 10, 3, 2, 6, 5, 6, 9), (1, 2, 3, 10, 8, 2, 2, 6, 4, 5, 4)]),
+        _slice_chunk("hidden", 0, [(0, 0, 0, 4, 4), (2, 0, 0, 0, 0)]),
+        _slice_chunk("../escape", 0, [(0, 20, 20, 16, 16)]),
+    ])
+
+
+def test_slice_keys(slices_file: Path) -> None:
+    button, hidden, _ = AsepriteFile(slices_file).slices
+
+    # Before the first key, the slice isn't on the frame
+    assert button.key(0) is None
+    assert button.bounds(0) is None
+
+    # Each key applies until the next one, and the last key applies to every frame after it
+    assert [button.key(frame_index).frame_number for frame_index in (1, 2, 3)] == [1, 2, 2]
+    assert button.bounds(1) == (2, 3, 12, 11)
+    assert button.bounds(3) == (8, 6, 20, 16)
+
+    # A key with a size of 0 hides the slice
+    assert hidden.bounds(1) == (0, 0, 4, 4)
+    assert hidden.bounds(2) is None
+    assert hidden.bounds(3) is None
+
+
+def test_iter_slice_images(slices_file: Path) -> None:
+    aseprite_file = AsepriteFile(slices_file)
+    slice_images = list(aseprite_file.iter_slice_images())
+
+    assert [(s.name, s.frame_number) for s in slice_images] == [
+        ("hidden", 1), ("../escape", 1),
+        ("button", 2), ("hidden", 2), ("../escape", 2),
+        ("button", 3), ("../escape", 3),
+        ("button", 4), ("../escape", 4),
+    ]
+
+    for slice_image in slice_images:
+        frame_image = render.frame_to_image(aseprite_file, aseprite_file.frame(slice_image.frame_number))
+        assert slice_image.image.tobytes() == frame_image.crop(slice_image.bounds).tobytes()
+
+    button = slice_images[2]
+    assert button.center == (2, 2, 8, 6)
+    assert button.pivot == (5, 4)
+    assert slice_images[0].center is None
+    assert slice_images[0].pivot is None
+
+
+def test_export_slices(slices_file: Path, tmp_path: Path) -> None:
+    output_dir = tmp_path / "output"
+    exported = AsepriteFile(slices_file).export_slices(output_dir, frame_numbers=[2])
+
+    # Slice names are made safe to use as directory names
+    assert exported == [output_dir / "button" / "2.png", output_dir / "hidden" / "2.png",
+                        output_dir / ".._escape" / "2.png"]
+    assert all(path.is_file() for path in exported)
+    assert {path.name for path in tmp_path.iterdir()} == {"slices.aseprite", "output"}
+
+    with (output_dir / "slices.json").open() as f:
+        entries = json.load(f)["slices"]
+    assert [entry["file"] for entry in entries] == ["button/2.png", "hidden/2.png", ".._escape/2.png"]
+    assert entries[0]["center"] == [2, 2, 8, 6]
+    assert entries[0]["pivot"] == [5, 4]
+
+
+def test_export_slices_checks_every_file_first(slices_file: Path, tmp_path: Path) -> None:
+    output_dir = tmp_path / "output"
+    (output_dir / "button").mkdir(parents=True)
+    (output_dir / "button" / "4.png").touch()
+
+    with pytest.raises(FileExistsError):
+        AsepriteFile(slices_file).export_slices(output_dir)
+
+    # Nothing was written
+    assert [path for path in output_dir.rglob("*") if path.is_file()] == [output_dir / "button" / "4.png"]
+
+
+def test_export_slices_with_the_same_file_name(tmp_path: Path) -> None:
+    slices_file = _slices_file(tmp_path / "slices.aseprite", [
+        _slice_chunk("a/b", 0, [(0, 0, 0, 4, 4)]),
+        _slice_chunk("a_b", 0, [(0, 4, 4, 4, 4)]),
+    ])
+
+    with pytest.raises(RuntimeError):
+        AsepriteFile(slices_file).export_slices(tmp_path / "output")
+    assert not (tmp_path / "output").exists()
@@ -0,0 +1,26 @@
+from pathlib import Path
+
+from aseprite_reader import AsepriteFile
+
+
+def test_frame_at_without_tag_loops(rgba_file: Path) -> None:
+    aseprite_file = AsepriteFile(rgba_file)
+
+    # Every synthetic frame lasts 100 ms
+    assert [aseprite_file.frame_at(None, time) for time in (0, 99, 100, 399, 400, 550)] == [1, 1, 2, 4, 1, 2]
+
+
+def test_frame_at_follows_tag_sequence(rgba_file: Path) -> None:
+    aseprite_file = AsepriteFile(rgba_file)
+    for tag in aseprite_file.tags:
+        timeline = aseprite_file.timeline.tag_timeline(tag)
+        sequence = [frame_index + 1 for frame_index in tag.frame_sequence()]
+        assert [aseprite_file.frame_at(tag, step * 100 + 50) for step in range(len(sequence))] == sequence
+        assert timeline.duration == 100 * len(sequence)
+
+
+def test_frame_tags(rgba_file: Path) -> None:
+    aseprite_file = AsepriteFile(rgba_file)
+    for frame_number in range(1, aseprite_file.header.frame_count + 1):
+        expected = [tag for tag in aseprite_file.tags if tag.from_frame <= frame_number - 1 <= tag.to_frame]
+        assert aseprite_file.frame_tags(frame_number) == expected
@@ -0,0 +1,25 @@
+from pathlib import Path
+
+from PIL import Image
+
+from aseprite_reader import AsepriteFile, render
+from aseprite_reader.region_render import read_trim_box
+
+
+def test_frame_bounds_match_bbox(rgba_file: Path) -> None:
+    aseprite_file = AsepriteFile(rgba_file)
+    for frame in aseprite_file.frames:
+        assert aseprite_file.frame_bounds(frame) == render.frame_to_image(aseprite_file, frame).getbbox()
+
+
+def test_trimmed_render(rgba_file: Path, tmp_path: Path) -> None:
+    aseprite_file = AsepriteFile(rgba_file)
+    frame = aseprite_file.frame(2)
+    output_file = tmp_path / "frame.png"
+
+    box = aseprite_file.render(frame, output_file, trim=True)
+    assert box == render.frame_to_image(aseprite_file, frame).getbbox()
+    assert read_trim_box(output_file) == box
+
+    with Image.open(output_file) as image:
+        assert image.tobytes() == render.frame_to_image(aseprite_file, frame).crop(box).tobytes()
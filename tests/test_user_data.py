@@ -0,0 +1,84 @@
+import random
+import struct
+from pathlib import Path
+
+import pytest
+
+import synthetic
+from aseprite_reader import AsepriteFile
+from aseprite_reader.optimize import optimize
+
+
+def _user_data_chunk(text: str) -> bytes:
+    return synthetic._chunk(0x2020, struct.pack('<I', 1) + synthetic._string(text))
+
+
+def _cel_extra_chunk() -> bytes:
+    return synthetic._chunk(0x2006, struct.pack('<I4i16x', 1, 65536, 65536, 65536 * 3, 65536 * 3))
+
+
+@pytest.fixture
+def user_data_file(tmp_path: Path) -> Path:
+    """ An indexed file with user data on a layer, the sprite, each tag, a tileset and its tiles, and each cel. """
+    scenario = synthetic.Scenario("user_data", 16, 16, color_depth=8, frame_count=2, layer_count=1, tilemap=True)
+    rng = random.Random(0)
+    frames = []
+    for frame_index in range(scenario.frame_count):
+        chunks = []
+        if frame_index == 0:
+            chunks += [
+                synthetic._layer_chunk("Layer"), _user_data_chunk("layer"),
+                synthetic._palette_chunk(rng), _user_data_chunk("sprite"),
+                synthetic._tags_chunk(scenario.frame_count), _user_data_chunk("tag 1"), _user_data_chunk("tag 2"),
+                synthetic._tileset_chunk(scenario, rng), _user_data_chunk("tileset"),
+                *[_user_data_chunk(f"tile {i}") for i in range(3)],
+            ]
+        chunks += [synthetic._image_cel_chunk(scenario, 0, frame_index, rng), _cel_extra_chunk(),
+                   _user_data_chunk(f"cel {frame_index}")]
+        frames.append(synthetic._frame(chunks, duration=100))
+
+    path = tmp_path / "user_data.aseprite"
+    path.write_bytes(synthetic._file(scenario, frames))
+    return path
+
+
+def test_user_data_links(user_data_file: Path) -> None:
+    aseprite_file = AsepriteFile(user_data_file)
+
+    assert aseprite_file.layers[0].user_data.text == "layer"
+    assert aseprite_file.user_data.text == "sprite"
+    assert [tag.user_data.text for tag in aseprite_file.tags] == ["tag 1", "tag 2"]
+
+    tileset = aseprite_file.tilesets[0]
+    assert tileset.user_data.text == "tileset"
+    assert [user_data.text for user_data in tileset.tile_user_data] == ["tile 0", "tile 1", "tile 2"]
+
+    for frame_number in (1, 2):
+        cel = aseprite_file.frame(frame_number).cels[0]
+        assert cel.user_data.text == f"cel {frame_number - 1}"
+        assert cel.cel_extra is not None
+        assert cel.cel_extra.precise_x_position == 1.0
+
+
+def test_optimize_keeps_cel_user_data(user_data_file: Path, tmp_path: Path) -> None:
+    output_file = tmp_path / "optimized.aseprite"
+    report = optimize(AsepriteFile(user_data_file), output_file)
+    assert report.linked_cels == 0
+
+    optimized = AsepriteFile(output_file)
+    for frame_number in (1, 2):
+        cel = optimized.frame(frame_number).cels[0]
+        assert cel.user_data.text == f"cel {frame_number - 1}"
+        assert cel.cel_extra is not None
+
+
+@pytest.mark.parametrize("chunk_type", [0x0004, 0x0011])
+def test_sprite_user_data_after_old_palette(tmp_path: Path, chunk_type: int) -> None:
+    scenario = synthetic.Scenario("old_palette", 16, 16, frame_count=1, layer_count=1)
+    old_palette = synthetic._chunk(chunk_type, struct.pack('<HBB6B', 1, 0, 2, 0, 0, 0, 63, 63, 63))
+    chunks = [synthetic._layer_chunk("Layer"), old_palette, _user_data_chunk("sprite"),
+              synthetic._image_cel_chunk(scenario, 0, 0, random.Random(0))]
+
+    path = tmp_path / "old_palette.aseprite"
+    path.write_bytes(synthetic._file(scenario, [synthetic._frame(chunks, duration=100)]))
+    assert AsepriteFile(path).user_data.text == "sprite"
@@ -0,0 +1,49 @@
+from pathlib import Path
+
+import pytest
+
+from aseprite_reader import AsepriteFile
+from aseprite_reader.optimize import main, optimize
+
+
+def _rendered_frames(aseprite_file: AsepriteFile) -> list[bytes]:
+    return [image.tobytes() for _, image in aseprite_file.iter_rendered_frames()]
+
+
+def test_save_round_trip(rgba_file: Path, tmp_path: Path) -> None:
+    aseprite_file = AsepriteFile(rgba_file)
+    output_file = tmp_path / "saved.aseprite"
+    aseprite_file.save(output_file)
+
+    saved = AsepriteFile(output_file)
+    assert saved.header.frame_count == aseprite_file.header.frame_count
+    assert [layer.layer_name for layer in saved.layers] == [layer.layer_name for layer in aseprite_file.layers]
+    assert _rendered_frames(saved) == _rendered_frames(aseprite_file)
+
+
+def test_optimize_round_trip(rgba_file: Path, tmp_path: Path) -> None:
+    aseprite_file = AsepriteFile(rgba_file)
+    output_file = tmp_path / "optimized.aseprite"
+    report = optimize(aseprite_file, output_file)
+
+    assert report.optimized_size == output_file.stat().st_size
+    assert _rendered_frames(AsepriteFile(output_file)) == _rendered_frames(aseprite_file)
+
+
+def test_save_over_source_is_rejected(rgba_file: Path) -> None:
+    original = rgba_file.read_bytes()
+    aseprite_file = AsepriteFile(rgba_file)
+
+    with pytest.raises(RuntimeError, match="own source file"):
+        aseprite_file.save(rgba_file, overwrite=True)
+    with pytest.raises(RuntimeError, match="own source file"):
+        optimize(aseprite_file, rgba_file)
+
+    # The command line gives the same errors as save()
+    with pytest.raises(FileExistsError):
+        main([str(rgba_file), str(rgba_file)])
+    with pytest.raises(RuntimeError, match="own source file"):
+        main([str(rgba_file), str(rgba_file), "--overwrite"])
+
+    assert rgba_file.read_bytes() == original
+    AsepriteFile(rgba_file)